@@ -0,0 +1,186 @@
+"""Cache of calculated properties keyed on atoms and parameters.
+
+Example::
+
+    calc = CachedCalculator(Vasp(...), 'results.db', maxsize=10**9)
+    atoms.calc = calc
+    e = atoms.get_potential_energy()  # 1st time: calculation
+    ...
+    e = atoms.get_potential_energy()  # same structure: read from cache
+
+The cache survives restarts of the script, and it is looked up for
+every configuration, not only the previous one.
+"""
+
+import hashlib
+import sqlite3
+import time
+
+import numpy as np
+
+from ase.calculators.calculator import Calculator, all_properties
+from ase.io.jsonio import MyEncoder, decode, encode
+
+
+def hash_atoms(atoms, parameters, tol=1e-8):
+    """Hash of atoms and calculator parameters.
+
+    Positions and cell are rounded to multiples of tol.  Two structures
+    with differences smaller than tol will therefore nearly always get
+    the same hash, but may get different ones if a coordinate is close
+    to a rounding boundary."""
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(atoms.numbers, np.int64).tobytes())
+    h.update(np.ascontiguousarray(atoms.pbc, bool).tobytes())
+    for array in [atoms.positions, atoms.cell.array]:
+        h.update(np.round(array / tol).astype(np.int64).tobytes())
+    for name in ['initial_magmoms', 'initial_charges']:
+        if name in atoms.arrays:
+            h.update(name.encode())
+            h.update(np.ascontiguousarray(atoms.arrays[name],
+                                          float).tobytes())
+    h.update(MyEncoder(sort_keys=True).encode(parameters).encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """SQLite store of results with least-recently-used eviction.
+
+    filename: str
+        Name of SQLite file.
+    maxsize: int or None
+        Maximum total size of the stored results in bytes.  When it is
+        exceeded, the least recently used results are deleted.  Default
+        is no limit.
+    """
+
+    def __init__(self, filename='results.db', maxsize=None):
+        self.filename = filename
+        self.maxsize = maxsize
+        self.connection = sqlite3.connect(filename, timeout=20)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, data TEXT, size INTEGER, '
+                'accessed REAL)')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS accessed_index '
+                'ON results(accessed)')
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT count(*) FROM results').fetchone()[0]
+
+    def get_size(self):
+        """Total size of stored results in bytes."""
+        return self.connection.execute(
+            'SELECT total(size) FROM results').fetchone()[0]
+
+    def get(self, key):
+        """Return results stored for key or None."""
+        with self.connection:
+            row = self.connection.execute(
+                'SELECT data FROM results WHERE key=?', (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                'UPDATE results SET accessed=? WHERE key=?',
+                (time.time(), key))
+        return decode(row[0])
+
+    def put(self, key, results):
+        data = encode(results)
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                (key, data, len(data), time.time()))
+            if self.maxsize is not None:
+                self._evict()
+
+    def _evict(self):
+        total = 0
+        old = []
+        for key, size in self.connection.execute(
+                'SELECT key, size FROM results ORDER BY accessed DESC'):
+            total += size
+            if total > self.maxsize:
+                old.append((key,))
+        self.connection.executemany('DELETE FROM results WHERE key=?', old)
+
+    def close(self):
+        self.connection.close()
+
+
+class CachedCalculator(Calculator):
+    """Calculator that looks up results in a cache before calculating.
+
+    Results are stored under a hash of the atomic numbers, positions,
+    cell, boundary conditions, initial magnetic moments and charges
+    and the parameters of the wrapped calculator (from its todict()
+    method).  If the requested properties are found, the wrapped
+    calculator is not used.
+
+    calc: Calculator
+        The calculator doing the actual work.
+    cache: str or ResultCache
+        Name of SQLite file or ResultCache object.
+    maxsize: int or None
+        Maximum size of the cache in bytes, see ResultCache.
+    tol: float
+        Positions and cell vectors are compared with this tolerance
+        (in Å), see hash_atoms().
+    log: file object or None
+        Write a line for each hit and miss to this file.
+
+    The number of hits and misses are in the hits and misses
+    attributes."""
+
+    implemented_properties = all_properties
+    name = 'CachedCalculator'
+
+    def __init__(self, calc, cache='results.db', maxsize=None, tol=1e-8,
+                 log=None):
+        Calculator.__init__(self)
+        self.calc = calc
+        if isinstance(cache, str):
+            cache = ResultCache(cache, maxsize)
+        self.cache = cache
+        self.tol = tol
+        self.log = log
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, atoms):
+        if hasattr(self.calc, 'todict'):
+            parameters = self.calc.todict()
+        else:
+            parameters = dict(getattr(self.calc, 'parameters', {}))
+        cls = type(self.calc)
+        parameters = {'calculator': cls.__module__ + '.' + cls.__name__,
+                      'parameters': parameters}
+        return hash_atoms(atoms, parameters, self.tol)
+
+    def calculate(self, atoms, properties, system_changes):
+        Calculator.calculate(self, atoms, properties, system_changes)
+        key = self.get_key(self.atoms)
+        results = self.cache.get(key) or {}
+        if all(name in results for name in properties):
+            self.hits += 1
+            if self.log:
+                print('Hit:', key, file=self.log)
+        else:
+            self.misses += 1
+            if self.log:
+                print('Miss:', key, file=self.log)
+            for name in properties:
+                self.calc.get_property(name, self.atoms)
+            results.update(self.calc.results)
+            self.cache.put(key, results)
+        self.results = results
+
+    def get_statistics(self):
+        """Return dict with number of hits and misses and hit rate."""
+        total = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0}
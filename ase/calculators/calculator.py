@@ -1,6 +1,9 @@
 import os
 import copy
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from math import pi, sqrt
 from pathlib import Path
 from typing import Union, Optional, List, Set, Dict, Any
@@ -128,8 +131,8 @@ all_changes = ['positions', 'numbers', 'cell', 'pbc',
 # Recognized names of calculators sorted alphabetically:
 names = ['abinit', 'ace', 'aims', 'amber', 'asap', 'castep', 'cp2k',
          'crystal', 'demon', 'demonnano', 'dftb', 'dftd3', 'dmol', 'eam',
-         'elk', 'emt', 'espresso', 'exciting', 'ff', 'fleur', 'gamess_us',
-         'gaussian', 'gpaw', 'gromacs', 'gulp', 'hotbit', 'kim',
+         'elk', 'emt', 'espresso', 'ewald', 'exciting', 'ff', 'fleur',
+         'gamess_us', 'gaussian', 'gpaw', 'gromacs', 'gulp', 'hotbit', 'kim',
          'lammpslib', 'lammpsrun', 'lj', 'mopac', 'morse', 'nwchem',
          'octopus', 'onetep', 'openmx', 'orca', 'plumed', 'psi4', 'qchem', 'siesta',
          'tip3p', 'tip4p', 'turbomole', 'vasp']
@@ -142,6 +145,7 @@ special = {'cp2k': 'CP2K',
            'eam': 'EAM',
            'elk': 'ELK',
            'emt': 'EMT',
+           'ewald': 'Ewald',
            'crystal': 'CRYSTAL',
            'ff': 'ForceField',
            'fleur': 'FLEUR',
@@ -837,17 +841,22 @@ class Calculator(BaseCalculator):
         if not os.path.isdir(self._directory):
             os.makedirs(self._directory)
 
-    def calculate_numerical_forces(self, atoms, d=0.001):
+    def calculate_numerical_forces(self, atoms, d=0.001, stencil=2,
+                                   executor=None):
         """Calculate numerical forces using finite difference.
 
-        All atoms will be displaced by +d and -d in all directions."""
+        All atoms will be displaced by +d and -d in all directions
+        (and +2d and -2d for stencil=4).  See
+        ase.calculators.test.numeric_forces()."""
         from ase.calculators.test import numeric_forces
-        return numeric_forces(atoms, d=d)
+        return numeric_forces(atoms, d=d, stencil=stencil, executor=executor)
 
-    def calculate_numerical_stress(self, atoms, d=1e-6, voigt=True):
+    def calculate_numerical_stress(self, atoms, d=1e-6, voigt=True,
+                                   stencil=2, executor=None):
         """Calculate numerical stress using finite difference."""
         from ase.calculators.test import numeric_stress
-        return numeric_stress(atoms, d=d, voigt=voigt)
+        return numeric_stress(atoms, d=d, voigt=voigt, stencil=stencil,
+                              executor=executor)
 
     def _deprecated_get_spin_polarized(self):
         msg = ('This calculator does not implement get_spin_polarized().  '
@@ -869,6 +878,23 @@ class Calculator(BaseCalculator):
         return get_band_structure(calc=self)
 
 
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+def get_default_executor():
+    """Thread pool used by FileIOCalculator.submit() by default.
+
+    It runs at most one job per CPU at the same time."""
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = ThreadPoolExecutor(
+                max_workers=os.cpu_count(),
+                thread_name_prefix='FileIOCalculator')
+        return _default_executor
+
+
 class FileIOCalculator(Calculator):
     """Base class for calculators that write/read input/output files."""
 
@@ -900,6 +926,52 @@ class FileIOCalculator(Calculator):
         self.execute()
         self.read_results()
 
+    def submit(self, atoms, properties=['energy'], directory=None,
+               executor=None):
+        """Start calculation in the background and return a Future.
+
+        The calculation is done by a copy of this calculator in a
+        directory of its own, so that several calculations can run at
+        the same time.  The result of the future is a copy of the atoms
+        with the calculator copy attached::
+
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [calc.submit(atoms, executor=executor)
+                           for atoms in images]
+                energies = [future.result().get_potential_energy()
+                            for future in futures]
+
+        Input files are written and output files are read in the
+        worker threads, while other jobs are running.
+
+        directory: str
+            Directory for the calculation.  Default is a new
+            subdirectory of the directory of this calculator.
+        executor: concurrent.futures.Executor
+            Runs the jobs.  The number of workers of a thread pool
+            limits how many calculations run at the same time.  Default
+            is a thread pool shared by all calculators with one worker
+            per CPU.
+        """
+        if directory is None:
+            os.makedirs(self.directory, exist_ok=True)
+            directory = tempfile.mkdtemp(prefix=self.name + '-',
+                                         dir=self.directory)
+        calc = copy.deepcopy(self)
+        calc.reset()
+        calc.directory = directory
+        atoms = atoms.copy()
+        atoms.calc = calc
+        if executor is None:
+            executor = get_default_executor()
+        return executor.submit(calc._run, atoms, list(properties))
+
+    def _run(self, atoms, properties):
+        self.calculate(atoms, properties, all_changes)
+        return atoms
+
     def execute(self):
         if self.command is None:
             raise CalculatorSetupError(
@@ -1,12 +1,26 @@
 import numpy as np
 from ase.calculators.calculator import Calculator
 from ase.calculators.qmmm import combine_lj_lorenz_berthelot
+from ase.neighborlist import CellList
 from ase import units
 import copy
 
 k_c = units.Hartree * units.Bohr
 
 
+def molecule_forces(m, F, nmol):
+    """Sum forces F[p, a] on atom a of molecule m[p] over all pairs p.
+
+    Returns the forces on the atoms of all nmol molecules."""
+    natoms = nmol * F.shape[1]
+    index = (m[:, np.newaxis] * F.shape[1] + np.arange(F.shape[1])).ravel()
+    F = F.reshape((-1, 3))
+    forces = np.zeros((natoms, 3))
+    for c in range(3):
+        forces[:, c] = np.bincount(index, F[:, c], natoms)
+    return forces
+
+
 class CombineMM(Calculator):
     implemented_properties = ['energy', 'forces']
 
@@ -107,9 +121,12 @@ class CombineMM(Calculator):
         xpos1 = xpos1.reshape((-1, spm1, 3))
         xpos2 = xpos2.reshape((-1, spm2, 3))
 
-        e_c, f_c = self.coulomb(xpos1, xpos2, xc1, xc2, spm1, spm2)
+        # the same pairs of molecules for both interactions
+        pairs = self.get_molecule_pairs(xpos1[:, 0], xpos2[:, 0])
 
-        e_lj, f1, f2 = self.lennard_jones(self.atoms1, self.atoms2)
+        e_c, f_c = self.coulomb(xpos1, xpos2, xc1, xc2, spm1, spm2, pairs)
+
+        e_lj, f1, f2 = self.lennard_jones(self.atoms1, self.atoms2, pairs)
 
         f_lj = np.zeros((len(atoms), 3))
         f_lj[self.mask] += f1
@@ -176,60 +193,76 @@ class CombineMM(Calculator):
 
         self.virtual_mask = np.array(virtual_mask)
 
-    def coulomb(self, xpos1, xpos2, xc1, xc2, spm1, spm2):
-        energy = 0.0
-        forces = np.zeros((len(xc1) + len(xc2), 3))
-
+    def get_molecule_pairs(self, pos1, pos2):
+        """Find all pairs of molecules from the two subsystems within rc.
+
+        pos1, pos2: positions of the first atom of every molecule in
+        each subsystem, which the cutoff refers to.  Returns the indices
+        of the molecules in subsystem 1 and 2 and the vectors to add to
+        the positions of the molecules in subsystem 2.  The molecules
+        are sorted into a cell list and only the neighbors of the
+        molecules in the smaller subsystem are searched, so the cost
+        grows linearly with the number of molecules."""
+        n1 = len(pos1)
+        n2 = len(pos2)
+        cell = self.cell.complete()
+        cl = CellList(self.pbc, cell, self.rc)
+        cl.update(np.concatenate([pos1, pos2]))
+        if n1 <= n2:
+            m1, m2, S = cl.neighbor_list('ijS', indices=np.arange(n1))
+            cross = m2 >= n1
+            m1, m2, S = m1[cross], m2[cross] - n1, S[cross]
+        else:
+            m2, m1, S = cl.neighbor_list('ijS',
+                                         indices=np.arange(n1, n1 + n2))
+            cross = m1 < n1
+            m1, m2, S = m1[cross], m2[cross] - n1, -S[cross]
+        return m1, m2, S @ cell
+
+    def cutoff_function(self, d):
+        """Return the cutoff function and its derivative at distances d."""
+        x12 = d > self.rc - self.width
+        y = (d[x12] - self.rc + self.width) / self.width
+        t = np.ones(len(d))
+        t[x12] -= y**2 * (3.0 - 2.0 * y)
+        dtdd = np.zeros(len(d))
+        dtdd[x12] -= 6.0 / self.width * y * (1.0 - y)
+        return t, dtdd
+
+    def coulomb(self, xpos1, xpos2, xc1, xc2, spm1, spm2, pairs=None):
         self.xpos1 = xpos1
         self.xpos2 = xpos2
 
         R1 = xpos1
         R2 = xpos2
-        F1 = np.zeros_like(R1)
-        F2 = np.zeros_like(R2)
-        C1 = xc1.reshape((-1, np.shape(xpos1)[1]))
-        C2 = xc2.reshape((-1, np.shape(xpos2)[1]))
-        # Vectorized evaluation is not as trivial when spm1 != spm2.
-        # This is pretty inefficient, but for ~1-5 counter ions as region 1
-        # it should not matter much ..
-        # There is definitely room for improvements here.
-        cell = self.cell.diagonal()
-        for m1, (r1, c1) in enumerate(zip(R1, C1)):
-            for m2, (r2, c2) in enumerate(zip(R2, C2)):
-                r00 = r2[0] - r1[0]
-                shift = np.zeros(3)
-                for i, periodic in enumerate(self.pbc):
-                    if periodic:
-                        L = cell[i]
-                        shift[i] = (r00[i] + L / 2.) % L - L / 2. - r00[i]
-                r00 += shift
-
-                d00 = (r00**2).sum()**0.5
-                t = 1
-                dtdd = 0
-                if d00 > self.rc:
-                    continue
-                elif d00 > self.rc - self.width:
-                    y = (d00 - self.rc + self.width) / self.width
-                    t -= y**2 * (3.0 - 2.0 * y)
-                    dtdd = r00 * 6 * y * (1.0 - y) / (self.width * d00)
-
-                for a1 in range(spm1):
-                    for a2 in range(spm2):
-                        r = r2[a2] - r1[a1] + shift
-                        d2 = (r**2).sum()
-                        d = d2**0.5
-                        e = k_c * c1[a1] * c2[a2] / d
-                        energy += t * e
-
-                        F1[m1, a1] -= t * (e / d2) * r
-                        F2[m2, a2] += t * (e / d2) * r
-
-                        F1[m1, 0] -= dtdd * e
-                        F2[m2, 0] += dtdd * e
-
-        F1 = F1.reshape((-1, 3))
-        F2 = F2.reshape((-1, 3))
+        C1 = xc1.reshape((-1, spm1))
+        C2 = xc2.reshape((-1, spm2))
+        if pairs is None:
+            pairs = self.get_molecule_pairs(R1[:, 0], R2[:, 0])
+        m1, m2, shift = pairs
+
+        # the cutoff function depends on the distance of the first sites
+        R00 = R2[m2, 0] + shift - R1[m1, 0]
+        d00 = ((R00**2).sum(1))**0.5
+        t, dtdd = self.cutoff_function(d00)
+
+        # all sites of a molecule in subsystem 1 against all sites of
+        # a molecule in subsystem 2
+        D = (R2[m2, np.newaxis, :] + shift[:, np.newaxis, np.newaxis] -
+             R1[m1, :, np.newaxis])
+        d2 = (D**2).sum(3)
+        e = k_c * C1[m1, :, np.newaxis] * C2[m2, np.newaxis, :] / d2**0.5
+        esum = e.sum(axis=(1, 2))
+        energy = np.dot(t, esum)
+
+        F = (e / d2 * t[:, np.newaxis, np.newaxis])[..., np.newaxis] * D
+        F00 = (esum * dtdd / d00)[:, np.newaxis] * R00
+        F1 = -F.sum(axis=2)
+        F2 = F.sum(axis=1)
+        F1[:, 0] += F00
+        F2[:, 0] -= F00
+        F1 = molecule_forces(m1, F1, len(R1))
+        F2 = molecule_forces(m2, F2, len(R2))
 
         # Redist forces but dont save forces in org calculators
         atoms1 = self.atoms1.copy()
@@ -246,56 +279,45 @@ class CombineMM(Calculator):
         forces[~self.mask] = F2
         return energy, forces
 
-    def lennard_jones(self, atoms1, atoms2):
+    def lennard_jones(self, atoms1, atoms2, pairs=None):
         pos1 = atoms1.get_positions().reshape((-1, self.apm1, 3))
         pos2 = atoms2.get_positions().reshape((-1, self.apm2, 3))
-
-        f1 = np.zeros_like(atoms1.positions)
-        f2 = np.zeros_like(atoms2.positions)
-        energy = 0.0
-
-        cell = self.cell.diagonal()
-        for q, p1 in enumerate(pos1):  # molwise loop
-            eps = self.epsilon
-            sig = self.sigma
-
-            R00 = pos2[:, 0] - p1[0, :]
-
-            # cutoff from first atom of each mol
-            shift = np.zeros_like(R00)
-            for i, periodic in enumerate(self.pbc):
-                if periodic:
-                    L = cell[i]
-                    shift[:, i] = (R00[:, i] + L / 2) % L - L / 2 - R00[:, i]
-            R00 += shift
-
-            d002 = (R00**2).sum(1)
-            d00 = d002**0.5
-            x1 = d00 > self.rc - self.width
-            x2 = d00 < self.rc
-            x12 = np.logical_and(x1, x2)
-            y = (d00[x12] - self.rc + self.width) / self.width
-            t = np.zeros(len(d00))
-            t[x2] = 1.0
-            t[x12] -= y**2 * (3.0 - 2.0 * y)
-            dt = np.zeros(len(d00))
-            dt[x12] -= 6.0 / self.width * y * (1.0 - y)
-            for qa in range(len(p1)):
-                if ~np.any(eps[qa, :]):
-                    continue
-                R = pos2 - p1[qa, :] + shift[:, None]
-                d2 = (R**2).sum(2)
-                c6 = (sig[qa, :]**2 / d2)**3
-                c12 = c6**2
-                e = 4 * eps[qa, :] * (c12 - c6)
-                energy += np.dot(e.sum(1), t)
-                f = t[:, None, None] * (24 * eps[qa, :] *
-                                        (2 * c12 - c6) / d2)[:, :, None] * R
-                f00 = - (e.sum(1) * dt / d00)[:, None] * R00
-                f2 += f.reshape((-1, 3))
-                f1[q * self.apm1 + qa, :] -= f.sum(0).sum(0)
-                f1[q * self.apm1, :] -= f00.sum(0)
-                f2[::self.apm2, :] += f00
+        if pairs is None:
+            pairs = self.get_molecule_pairs(pos1[:, 0], pos2[:, 0])
+        m1, m2, shift = pairs
+
+        # cutoff from first atom of each mol
+        R00 = pos2[m2, 0] + shift - pos1[m1, 0]
+        d00 = ((R00**2).sum(1))**0.5
+        t, dtdd = self.cutoff_function(d00)
+
+        # only atoms with Lennard-Jones parameters take part
+        a1 = np.flatnonzero(self.epsilon.any(axis=1))
+        a2 = np.flatnonzero(self.epsilon.any(axis=0))
+        eps = self.epsilon[np.ix_(a1, a2)]
+        sig = self.sigma[np.ix_(a1, a2)]
+
+        R = (pos2[m2][:, np.newaxis, a2] +
+             shift[:, np.newaxis, np.newaxis] -
+             pos1[m1][:, a1, np.newaxis])
+        d2 = (R**2).sum(3)
+        c6 = (sig**2 / d2)**3
+        c12 = c6**2
+        e = 4 * eps * (c12 - c6)
+        esum = e.sum(axis=(1, 2))
+        energy = np.dot(t, esum)
+
+        F = (t[:, np.newaxis, np.newaxis] *
+             24 * eps * (2 * c12 - c6) / d2)[..., np.newaxis] * R
+        f00 = (esum * dtdd / d00)[:, np.newaxis] * R00
+        F1 = np.zeros((len(m1), self.apm1, 3))
+        F2 = np.zeros((len(m2), self.apm2, 3))
+        F1[:, a1] -= F.sum(axis=2)
+        F2[:, a2] += F.sum(axis=1)
+        F1[:, 0] += f00
+        F2[:, 0] -= f00
+        f1 = molecule_forces(m1, F1, len(pos1))
+        f2 = molecule_forces(m2, F2, len(pos2))
 
         return energy, f1, f2
 
@@ -1,5 +1,6 @@
 import numpy as np
 from ase.calculators.calculator import Calculator
+from ase.neighborlist import primitive_neighbor_list
 from ase import units
 
 k_c = units.Hartree * units.Bohr
@@ -39,51 +40,35 @@ class AtomicCounterIon(Calculator):
 
         R = atoms.get_positions()
         charges = self.get_virtual_charges(atoms)
-        pbc = atoms.pbc
-
-        energy = 0.0
-        forces = np.zeros_like(atoms.get_positions())
-
-        for m in range(len(atoms)):
-            D = R[m + 1:] - R[m]
-            shift = np.zeros_like(D)
-            for i, periodic in enumerate(pbc):
-                if periodic:
-                    L = atoms.cell.diagonal()[i]
-                    shift[:, i] = (D[:, i] + L / 2) % L - L / 2 - D[:, i]
-            D += shift
-            d2 = (D**2).sum(1)
-            d = d2**0.5
-
-            x1 = d > self.rc - self.width
-            x2 = d < self.rc
-            x12 = np.logical_and(x1, x2)
-            y = (d[x12] - self.rc + self.width) / self.width
-            t = np.zeros(len(d))  # cutoff function
-            t[x2] = 1.0
-            t[x12] -= y**2 * (3.0 - 2.0 * y)
-            dtdd = np.zeros(len(d))
-            dtdd[x12] -= 6.0 / self.width * y * (1.0 - y)
-
-            c6 = (self.sigma**2 / d2)**3
-            c12 = c6**2
-            e_lj = 4 * self.epsilon * (c12 - c6)
-            e_c = k_c * charges[m + 1:] * charges[m] / d
-
-            energy += np.dot(t, e_lj)
-            energy += np.dot(t, e_c)
-
-            F = (24 * self.epsilon * (2 * c12 - c6) / d2 * t -
-                 e_lj * dtdd / d)[:, None] * D
-
-            forces[m] -= F.sum(0)
-            forces[m + 1:] += F
-
-            F = (e_c / d2 * t)[:, None] * D \
-                - (e_c * dtdd / d)[:, None] * D
-
-            forces[m] -= F.sum(0)
-            forces[m + 1:] += F
+
+        # each pair of ions within the cutoff once, found with a cell list
+        i, j, D = primitive_neighbor_list('ijD', atoms.pbc,
+                                          atoms.cell.complete(), R,
+                                          self.rc, bothways=False)
+        d2 = (D**2).sum(1)
+        d = d2**0.5
+
+        x12 = d > self.rc - self.width
+        y = (d[x12] - self.rc + self.width) / self.width
+        t = np.ones(len(d))  # cutoff function
+        t[x12] -= y**2 * (3.0 - 2.0 * y)
+        dtdd = np.zeros(len(d))
+        dtdd[x12] -= 6.0 / self.width * y * (1.0 - y)
+
+        c6 = (self.sigma**2 / d2)**3
+        c12 = c6**2
+        e_lj = 4 * self.epsilon * (c12 - c6)
+        e_c = k_c * charges[i] * charges[j] / d
+
+        energy = np.dot(t, e_lj) + np.dot(t, e_c)
+
+        F = ((24 * self.epsilon * (2 * c12 - c6) + e_c) / d2 * t -
+             (e_lj + e_c) * dtdd / d)[:, np.newaxis] * D
+
+        forces = np.zeros((len(atoms), 3))
+        for c in range(3):
+            forces[:, c] = (np.bincount(j, F[:, c], len(atoms)) -
+                            np.bincount(i, F[:, c], len(atoms)))
 
         self.results['energy'] = energy
         self.results['forces'] = forces
@@ -1,4 +1,5 @@
 import os
+import re
 import subprocess
 from warnings import warn
 from pathlib import Path
@@ -8,7 +9,9 @@ from ase.calculators.calculator import (BaseCalculator, FileIOCalculator,
                                         Calculator)
 from ase.io import write
 from ase.io.vasp import write_vasp
+from ase.neighborlist import neighbor_list
 from ase.parallel import world
+from ase.stress import full_3x3_to_voigt_6_stress
 from ase.units import Bohr, Hartree
 
 
@@ -40,6 +43,8 @@ class DFTD3(BaseCalculator):
                  command=None,  # Command for running dftd3
                  dft=None,  # DFT calculator
                  comm=world,
+                 backend='dftd3',  # 'dftd3' executable or 'numpy'
+                 reference=None,  # D3 reference data for numpy backend
                  **kwargs):
 
         # Convert from 'func' keyword to 'xc'. Internally, we only store
@@ -66,7 +71,13 @@ class DFTD3(BaseCalculator):
             if dft_xc is not None:
                 kwargs['xc'] = dft_xc
 
-        dftd3 = PureDFTD3(label=label, command=command, comm=comm, **kwargs)
+        if backend == 'dftd3':
+            dftd3 = PureDFTD3(label=label, command=command, comm=comm,
+                              **kwargs)
+        elif backend == 'numpy':
+            dftd3 = NumpyDFTD3(reference=reference, **kwargs)
+        else:
+            raise ValueError(f'Unknown DFTD3 backend: {backend}')
 
         # dftd3 only implements energy, forces, and stresses (for periodic
         # systems). But, if a DFT calculator is attached, and that calculator
@@ -353,6 +364,707 @@ class PureDFTD3(FileIOCalculator):
         self.results = results
 
 
+class D3Reference:
+    """Reference data for the in-process DFT-D3 implementation.
+
+    All arrays are indexed by atomic number (index 0 is not used) and
+    are in atomic units:
+
+    c6: (n, n, m, m) array
+        C6 coefficients of pairs of reference systems.  There are up to
+        m reference systems per element (five in dftd3 3.1, seven in
+        simple-dftd3).
+    cn: (n, m) array
+        Coordination numbers of the reference systems.  Missing reference
+        systems are marked with NaN.
+    r0ab: (n, n) array
+        Cutoff radii used for zero damping and for the three-body term.
+    r2r4: (n,) array
+        Square root of the <r^4>/<r^2> factors:
+        C8 = 3 * C6 * r2r4[Z1] * r2r4[Z2].
+    rcov: (n,) array
+        Covalent radii used for the coordination numbers (without the
+        4/3 scaling factor).
+
+    The tables belong to the dftd3 program and are not distributed with
+    ASE.  They are read from the source code of the program with
+    from_dftd3().  Store them with the write() method (or numpy.savez()
+    with the names above) and point the reference keyword or the
+    $ASE_DFTD3_REFERENCE environment variable to the file.
+    """
+
+    names = ['c6', 'cn', 'r0ab', 'r2r4', 'rcov']
+
+    def __init__(self, c6, cn, r0ab, r2r4, rcov):
+        self.c6 = np.nan_to_num(np.asarray(c6, float))
+        self.cn = np.asarray(cn, float)
+        self.r0ab = np.asarray(r0ab, float)
+        self.r2r4 = np.asarray(r2r4, float)
+        self.rcov = np.asarray(rcov, float)
+        self.valid = ~np.isnan(self.cn)
+        self._cn = np.nan_to_num(self.cn)
+
+    @classmethod
+    def read(cls, filename=None):
+        """Read the reference data.
+
+        filename is an .npz file written by write(), or the source
+        directory of the dftd3 program (see from_dftd3())."""
+        if filename is None:
+            filename = os.environ.get('ASE_DFTD3_REFERENCE')
+            if filename is None:
+                raise ValueError('No DFT-D3 reference data.  Use the '
+                                 'reference keyword or set the '
+                                 '$ASE_DFTD3_REFERENCE environment '
+                                 'variable.')
+        if Path(filename).is_dir():
+            return cls.from_dftd3(filename)
+        with np.load(filename) as data:
+            return cls(**{name: data[name] for name in cls.names})
+
+    @classmethod
+    def from_dftd3(cls, directory):
+        """Read the reference data from the source code of dftd3.
+
+        directory contains the source code of the dftd3 program, either
+        version 3.1 of the original program (with the files pars.f and
+        dftd3.f) or simple-dftd3 (with the mctc-lib subproject).
+
+        Parsing the source takes a second or so.  Use write() to store
+        the data in a file that is faster to read."""
+        directory = Path(directory)
+        if (directory / 'pars.f').is_file():
+            return cls._from_dftd3_program(directory)
+        return cls._from_simple_dftd3(directory)
+
+    @classmethod
+    def _from_dftd3_program(cls, directory):
+        # Every row of pars is C6, Z1, Z2, CN1, CN2, where the atomic
+        # numbers are increased by 100 for every further reference system:
+        pars, = _fortran_arrays(directory / 'pars.f', 'pars')
+        pars = pars.reshape((-1, 5))
+        r0ab, r2r4, rcov = _fortran_arrays(directory / 'dftd3.f',
+                                           'r0ab', 'r2r4', 'rcov')
+        r0ab /= Bohr  # from Angstrom
+        rcov *= 0.75  # scaled by 4/3 and in Bohr
+
+        nelements = len(rcov)
+        refs, numbers = np.divmod(pars[:, 1:3].astype(int) - 1, 100)
+        numbers += 1
+        nrefs = refs.max() + 1
+        c6 = np.zeros((nelements + 1, nelements + 1, nrefs, nrefs))
+        cn = np.empty((nelements + 1, nrefs))
+        cn[:] = np.nan
+        (Z1, Z2), (ref1, ref2) = numbers.T, refs.T
+        c6[Z1, Z2, ref1, ref2] = pars[:, 0]
+        c6[Z2, Z1, ref2, ref1] = pars[:, 0]
+        cn[Z1, ref1] = pars[:, 3]
+        cn[Z2, ref2] = pars[:, 4]
+        return cls(c6, cn, _lower_triangle(r0ab, nelements),
+                   np.append(0.0, r2r4), np.append(0.0, rcov))
+
+    @classmethod
+    def _from_simple_dftd3(cls, directory):
+        sources = {}
+        for name in ['dftd3/reference.f90', 'dftd3/data/r4r2.f90',
+                     'dftd3/data/vdwrad.f90', 'mctc/data/covrad.f90']:
+            found = sorted(directory.rglob(name))
+            if not found:
+                raise ValueError('No dftd3 source code in {}: {} or pars.f '
+                                 'not found'.format(directory, name))
+            sources[name.split('/')[-1]] = found[0]
+
+        # C6 of all pairs of references of all pairs of elements, as a
+        # (nrefs, nrefs, npairs) Fortran array, and the CN of the
+        # references, as (nrefs, nelements), with -1 for none:
+        c6ref, cnref = _fortran_arrays(sources['reference.f90'],
+                                       'c6ab_view', 'reference_cn')
+        nrefs = next(m for m in range(1, len(cnref) + 1)
+                     if len(cnref) % m == 0 and
+                     len(c6ref) == m * len(cnref) * (len(cnref) // m + 1) // 2)
+        nelements = len(cnref) // nrefs
+        cn = np.full((nelements + 1, nrefs), np.nan)
+        cn[1:] = cnref.reshape((nelements, nrefs))
+        cn[cn < 0] = np.nan
+
+        # The first reference index is that of the heavier element:
+        c6pairs = c6ref.reshape((-1, nrefs, nrefs))
+        Z1, Z2 = np.tril_indices(nelements)
+        c6 = np.zeros((nelements + 1, nelements + 1, nrefs, nrefs))
+        c6[Z2 + 1, Z1 + 1] = c6pairs
+        c6[Z1 + 1, Z2 + 1] = c6pairs.transpose((0, 2, 1))
+
+        r4r2, = _fortran_arrays(sources['r4r2.f90'], 'r4_over_r2')
+        Z = np.arange(1, nelements + 1)
+        r2r4 = np.sqrt(0.5 * r4r2[:nelements] * np.sqrt(Z))
+        # Radii in Angstrom:
+        r0ab, = _fortran_arrays(sources['vdwrad.f90'], 'vdwrad')
+        rcov, = _fortran_arrays(sources['covrad.f90'], 'covalent_rad_2009')
+        r0ab /= Bohr
+        rcov = rcov[:nelements] / Bohr
+        return cls(c6, cn, _lower_triangle(r0ab, nelements),
+                   np.append(0.0, r2r4), np.append(0.0, rcov))
+
+    def write(self, filename):
+        np.savez(filename, **{name: getattr(self, name)
+                              for name in self.names})
+
+    def check(self, numbers):
+        missing = numbers >= len(self.cn)
+        missing[~missing] = ~self.valid[numbers[~missing]].any(axis=1)
+        if missing.any():
+            raise ValueError('No DFT-D3 reference data for Z={}'
+                             .format(sorted(set(numbers[missing]))))
+
+    def get_c6(self, Z1, Z2, cn1, cn2):
+        """Interpolate C6 coefficients between the reference systems.
+
+        Returns C6 and its derivatives with respect to cn1 and cn2."""
+        dcn1 = cn1[:, None] - self._cn[Z1]
+        dcn2 = cn2[:, None] - self._cn[Z2]
+        x = -4 * (dcn1[:, :, None]**2 + dcn2[:, None, :]**2)
+        x[~(self.valid[Z1][:, :, None] & self.valid[Z2][:, None, :])] = (
+            -np.inf)
+        # Shift exponents so that the largest weight is 1:
+        weights = np.exp(x - x.max(axis=(1, 2))[:, None, None])
+        norm = weights.sum(axis=(1, 2))
+        c6ref = self.c6[Z1, Z2]
+        c6 = (c6ref * weights).sum(axis=(1, 2)) / norm
+        dc6 = (c6ref - c6[:, None, None]) * weights
+        dc6dcn1 = -8 * (dc6 * dcn1[:, :, None]).sum(axis=(1, 2)) / norm
+        dc6dcn2 = -8 * (dc6 * dcn2[:, None, :]).sum(axis=(1, 2)) / norm
+        return c6, dc6dcn1, dc6dcn2
+
+    def get_c6_matrix(self, numbers, cn, chunksize=2**16):
+        """C6 and derivatives for all pairs of atoms as (n, n) arrays."""
+        n = len(numbers)
+        c6, dc6dcn1, dc6dcn2 = np.empty((3, n, n))
+        rows = max(1, chunksize // n)
+        for a in range(0, n, rows):
+            b = min(a + rows, n)
+            Z1 = np.repeat(numbers[a:b], n)
+            cn1 = np.repeat(cn[a:b], n)
+            Z2 = np.tile(numbers, b - a)
+            cn2 = np.tile(cn, b - a)
+            for out, x in zip([c6, dc6dcn1, dc6dcn2],
+                              self.get_c6(Z1, Z2, cn1, cn2)):
+                out[a:b] = x.reshape((b - a, n))
+        return c6, dc6dcn1, dc6dcn2
+
+
+def _fortran_statements(filename):
+    """Yield the statements of a Fortran source file without comments."""
+    fixed = Path(filename).suffix.lower() in ['.f', '.for']
+    statement = ''
+    with open(filename) as fd:
+        for line in fd:
+            if fixed and line[:1] in 'cC*':
+                continue
+            line = line.rstrip('\n').split('!')[0]
+            if fixed:
+                if len(line) > 5 and not line[:5].strip() and \
+                   line[5] not in ' 0':
+                    statement += line[6:]
+                    continue
+            elif statement.endswith('&'):
+                statement = statement[:-1] + line.strip().lstrip('&')
+                continue
+            else:
+                line = line.strip()
+            if statement.strip():
+                yield statement
+            statement = line
+    if statement.strip():
+        yield statement
+
+
+_fortran_data = re.compile(r'\bdata\s+(\w+)\s*/([^/]*)/', re.I)
+# Array constructor, (/ ... /) or [ ... ], assigned to name or to a
+# section name(start:stop), maybe scaled or reshaped:
+_fortran_assignment = re.compile(
+    r'\b(\w+)\s*(\((?:[^()]|\([^()]*\))*\))?\s*=\s*'
+    r'(?:\w+\s*\*\s*)?(?:reshape\s*\(\s*)?(\(/|\[)', re.I)
+_fortran_section = re.compile(r'\(\s*(\d+)\s*:\s*\d+\s*\)')
+
+
+def _fortran_values(text):
+    values = []
+    for token in text.split(','):
+        token = re.sub(r'_\w+$', '', token.strip()).lower().replace('d', 'e')
+        if '*' in token:
+            count, token = token.split('*')
+            values += [float(token)] * int(count)
+        elif token:
+            values.append(float(token))
+    return values
+
+
+def _fortran_arrays(filename, *names):
+    """Read the values of the named arrays from Fortran source code.
+
+    The values are given in DATA statements or with array constructors,
+    possibly for sections of the array at a time."""
+    sections = {name: [] for name in names}
+    for statement in _fortran_statements(filename):
+        match = _fortran_data.search(statement)
+        if match and match.group(1).lower() in sections:
+            sections[match.group(1).lower()].append(
+                (1, _fortran_values(match.group(2))))
+            continue
+        match = _fortran_assignment.search(statement)
+        if match and match.group(1).lower() in sections:
+            end = '/)' if match.group(3) == '(/' else ']'
+            text = statement[match.end():statement.index(end, match.end())]
+            section = _fortran_section.fullmatch(match.group(2) or '')
+            start = int(section.group(1)) if section else 1
+            sections[match.group(1).lower()].append(
+                (start, _fortran_values(text)))
+
+    arrays = []
+    for name in names:
+        if not sections[name]:
+            raise ValueError('No values for {} in {}'.format(name, filename))
+        array = np.zeros(max(start - 1 + len(values)
+                             for start, values in sections[name]))
+        for start, values in sections[name]:
+            array[start - 1:start - 1 + len(values)] = values
+        arrays.append(array)
+    return arrays
+
+
+def _lower_triangle(values, n):
+    """(n + 1, n + 1) symmetric array from values for Z1 >= Z2 > 0.
+
+    The values are in the order (1, 1), (2, 1), (2, 2), (3, 1), ..."""
+    Z1, Z2 = np.tril_indices(n)
+    array = np.zeros((n + 1, n + 1))
+    array[Z1 + 1, Z2 + 1] = values[:len(Z1)]
+    array[Z2 + 1, Z1 + 1] = values[:len(Z1)]
+    return array
+
+
+def _pairs(atoms, cutoff, bothways=True):
+    # Neighbor list in atomic units:
+    i, j, D = neighbor_list('ijD', atoms, cutoff, bothways=bothways)
+    D /= Bohr
+    return i, j, D, np.sqrt((D**2).sum(1))
+
+
+def _triangles(first, chunksize):
+    """Yield (a, p, q) for pairs p < q of neighbors of atom a.
+
+    first[a]:first[a + 1] are the neighbors of atom a.  Pairs come in
+    chunks of about chunksize."""
+    for a in range(len(first) - 1):
+        m = first[a + 1] - first[a]
+        # Number of pairs with p < row:
+        npairs = np.arange(m + 1) * (2 * m - 1 - np.arange(m + 1)) // 2
+        rows = np.searchsorted(npairs,
+                               np.arange(0, npairs[-1], chunksize))
+        for row1, row2 in zip(rows, list(rows[1:]) + [m]):
+            p = np.repeat(np.arange(row1, row2), m - 1 - np.arange(row1, row2))
+            q = np.arange(len(p)) + npairs[row1] - npairs[p] + p + 1
+            yield a, p, q
+
+
+class _Gradient:
+    """Accumulate forces and virial from derivatives dE/dr of distances."""
+
+    def __init__(self, natoms):
+        self.forces = np.zeros((natoms, 3))
+        self.virial = np.zeros((3, 3))
+
+    def add(self, i, j, D, r, dEdr):
+        # D = position of j minus position of i:
+        v = (dEdr / r)[:, None] * D
+        n = len(self.forces)
+        for c in range(3):
+            self.forces[:, c] += (np.bincount(i, v[:, c], n) -
+                                  np.bincount(j, v[:, c], n))
+        self.virial += v.T @ D
+
+
+# Damping parameters of the dftd3 program for zero damping:
+# (s6, sr6, s8, sr8) with alpha6 = 14.
+_zero_damping = {
+    'b1b95': (1.0, 1.613, 1.868, 1.0),
+    'b1lyp': (1.0, 1.3725, 1.9467, 1.0),
+    'b1p': (1.0, 1.1815, 1.1209, 1.0),
+    'b2gpplyp': (0.56, 1.586, 0.76, 1.0),
+    'b2plyp': (0.64, 1.427, 1.022, 1.0),
+    'b3lyp': (1.0, 1.261, 1.703, 1.0),
+    'b3lypg': (1.0, 1.261, 1.703, 1.0),
+    'b3p': (1.0, 1.1897, 1.1961, 1.0),
+    'b3pw91': (1.0, 1.176, 1.775, 1.0),
+    'b971': (1.0, 3.7924, 1.6418, 1.0),
+    'b972': (1.0, 1.7066, 1.6418, 1.0),
+    'b973c': (1.0, 1.06, 1.5, 1.0),
+    'b97d': (1.0, 0.892, 0.909, 1.0),
+    'b98': (1.0, 2.6895, 1.9078, 1.0),
+    'bhlyp': (1.0, 1.37, 1.442, 1.0),
+    'blyp': (1.0, 1.094, 1.682, 1.0),
+    'bmk': (1.0, 1.931, 2.168, 1.0),
+    'bop': (1.0, 0.929, 1.975, 1.0),
+    'bp': (1.0, 1.139, 1.683, 1.0),
+    'bpbe': (1.0, 1.087, 2.033, 1.0),
+    'camb3lyp': (1.0, 1.378, 1.217, 1.0),
+    'hcth120': (1.0, 1.221, 1.206, 1.0),
+    'hcth407': (1.0, 4.0426, 2.7694, 1.0),
+    'hf': (1.0, 1.158, 1.746, 1.0),
+    'hiss': (1.0, 1.3338, 0.7615, 1.0),
+    'hse03': (1.0, 1.3944, 1.0156, 1.0),
+    'hse06': (1.0, 1.129, 0.109, 1.0),
+    'lcwpbe': (1.0, 1.355, 1.279, 1.0),
+    'm05': (1.0, 1.373, 0.595, 1.0),
+    'm052x': (1.0, 1.417, 0.0, 1.0),
+    'm06': (1.0, 1.325, 0.0, 1.0),
+    'm062x': (1.0, 1.619, 0.0, 1.0),
+    'm06hf': (1.0, 1.446, 0.0, 1.0),
+    'm06l': (1.0, 1.581, 0.0, 1.0),
+    'm08hx': (1.0, 1.6247, 0.0, 1.0),
+    'm11l': (1.0, 2.3933, 1.1129, 1.0),
+    'mn15l': (1.0, 3.3388, 0.0, 1.0),
+    'mpw1b95': (1.0, 1.605, 1.118, 1.0),
+    'mpw1kcis': (1.0, 1.7231, 2.2917, 1.0),
+    'mpw1lyp': (1.0, 2.0512, 1.9529, 1.0),
+    'mpw1pw': (1.0, 1.2892, 1.4758, 1.0),
+    'mpw2plyp': (0.66, 1.5527, 0.7529, 1.0),
+    'mpwb1k': (1.0, 1.671, 1.061, 1.0),
+    'mpwkcis1k': (1.0, 1.4853, 1.7553, 1.0),
+    'mpwlyp': (1.0, 1.239, 1.098, 1.0),
+    'mpwpw': (1.0, 1.3725, 1.9467, 1.0),
+    'n12': (1.0, 1.3493, 2.3916, 1.0),
+    'o3lyp': (1.0, 1.406, 1.8058, 1.0),
+    'olyp': (1.0, 0.806, 1.764, 1.0),
+    'opbe': (1.0, 0.837, 2.055, 1.0),
+    'otpss': (1.0, 1.128, 1.494, 1.0),
+    'pbe': (1.0, 1.217, 0.722, 1.0),
+    'pbe0': (1.0, 1.287, 0.928, 1.0),
+    'pbe1kcis': (1.0, 3.6355, 1.7934, 1.0),
+    'pbe38': (1.0, 1.333, 0.998, 1.0),
+    'pbeh1pbe': (1.0, 1.3719, 1.043, 1.0),
+    'pbehpbe': (1.0, 1.5703, 1.401, 1.0),
+    'pbesol': (1.0, 1.345, 0.612, 1.0),
+    'pkzb': (1.0, 0.6327, 0.0, 1.0),
+    'ptpss': (0.75, 1.541, 0.879, 1.0),
+    'pw1pw': (1.0, 1.4968, 1.1786, 1.0),
+    'pw6b95': (1.0, 1.532, 0.862, 1.0),
+    'pwb6k': (1.0, 1.66, 0.55, 1.0),
+    'pwp': (1.0, 2.104, 0.8747, 1.0),
+    'pwpb95': (0.82, 1.557, 0.705, 1.0),
+    'revpbe': (1.0, 0.923, 1.01, 1.0),
+    'revpbe0': (1.0, 0.949, 0.792, 1.0),
+    'revpbe38': (1.0, 1.021, 0.862, 1.0),
+    'revssb': (1.0, 1.221, 0.56, 1.0),
+    'revtpss': (1.0, 1.3491, 1.3666, 1.0),
+    'revtpss0': (1.0, 1.2881, 1.0649, 1.0),
+    'revtpssh': (1.0, 1.3224, 1.2504, 1.0),
+    'rpbe': (1.0, 0.872, 0.514, 1.0),
+    'rpw86pbe': (1.0, 1.224, 0.901, 1.0),
+    'scan': (1.0, 1.324, 0.0, 1.0),
+    'slaterdiracexchange': (1.0, 0.999, -1.957, 0.697),
+    'ssb': (1.0, 1.215, 0.663, 1.0),
+    'tauhcth': (1.0, 0.932, 0.5662, 1.0),
+    'tauhcthhyb': (1.0, 1.5001, 1.6302, 1.0),
+    'tpss': (1.0, 1.166, 1.105, 1.0),
+    'tpss0': (1.0, 1.252, 1.242, 1.0),
+    'tpss1kcis': (1.0, 1.7729, 2.0902, 1.0),
+    'tpssh': (1.0, 1.223, 1.219, 1.0),
+    'wb97x': (1.0, 1.281, 1.0, 1.094),
+    'x3lyp': (1.0, 1.0, 0.299, 1.0),
+    'xlyp': (1.0, 0.9384, 0.7447, 1.0)}
+
+# Becke-Johnson damping: (s6, a1, s8, a2).
+_bj_damping = {
+    'b1b95': (1.0, 0.2092, 1.4507, 5.5545),
+    'b1lyp': (1.0, 0.1986, 2.1167, 5.3875),
+    'b1p': (1.0, 0.4724, 3.5681, 4.9858),
+    'b2gpplyp': (0.56, 0.0, 0.2597, 6.3332),
+    'b2plyp': (0.64, 0.3065, 0.9147, 5.057),
+    'b3lyp': (1.0, 0.3981, 1.9889, 4.4211),
+    'b3lypg': (1.0, 0.3981, 1.9889, 4.4211),
+    'b3p': (1.0, 0.4601, 3.3211, 4.9294),
+    'b3pw91': (1.0, 0.4312, 2.8524, 4.4693),
+    'b971': (1.0, 0.0, 0.4814, 6.2279),
+    'b972': (1.0, 0.0, 0.9448, 5.4603),
+    'b973c': (1.0, 0.37, 1.5, 4.1),
+    'b97d': (1.0, 0.5545, 2.2609, 3.2297),
+    'b98': (1.0, 0.0, 0.7086, 6.0672),
+    'bhlyp': (1.0, 0.2793, 1.0354, 4.9615),
+    'blyp': (1.0, 0.4298, 2.6996, 4.2359),
+    'bmk': (1.0, 0.194, 2.086, 5.9197),
+    'bop': (1.0, 0.487, 3.295, 3.5043),
+    'bp': (1.0, 0.3946, 3.2822, 4.8516),
+    'bpbe': (1.0, 0.4567, 4.0728, 4.3908),
+    'camb3lyp': (1.0, 0.3708, 2.0674, 5.4743),
+    'hcth120': (1.0, 0.3563, 1.0821, 4.3359),
+    'hcth407': (1.0, 0.0, 0.649, 4.8162),
+    'hf': (1.0, 0.3385, 0.9171, 2.883),
+    'hiss': (1.0, 0.0, 1.6112, 7.3539),
+    'hse03': (1.0, 0.0, 1.1243, 6.8889),
+    'hse06': (1.0, 0.383, 2.31, 5.685),
+    'lcwpbe': (1.0, 0.3919, 1.8541, 5.0897),
+    'mpw1b95': (1.0, 0.1955, 1.0508, 6.4177),
+    'mpw1kcis': (1.0, 0.0576, 1.0893, 5.5314),
+    'mpw1pw': (1.0, 0.3342, 1.8744, 4.9819),
+    'mpw2plyp': (0.66, 0.4105, 0.6223, 5.0136),
+    'mpwb1k': (1.0, 0.1474, 0.9499, 6.6223),
+    'mpwkcis1k': (1.0, 0.0855, 1.2875, 5.8961),
+    'mpwlyp': (1.0, 0.4831, 2.0077, 4.5323),
+    'mpwpw': (1.0, 0.3168, 1.7974, 4.7732),
+    'o3lyp': (1.0, 0.0963, 1.8171, 5.994),
+    'olyp': (1.0, 0.5299, 2.6205, 2.8065),
+    'opbe': (1.0, 0.5512, 3.3816, 2.9444),
+    'otpss': (1.0, 0.4634, 2.7495, 4.3153),
+    'pbe': (1.0, 0.4289, 0.7875, 4.4407),
+    'pbe0': (1.0, 0.4145, 1.2177, 4.8593),
+    'pbe1kcis': (1.0, 0.0, 0.7688, 6.2794),
+    'pbeh1pbe': (1.0, 0.0, 1.4877, 7.0385),
+    'pbehpbe': (1.0, 0.0, 1.1152, 6.7184),
+    'pbesol': (1.0, 0.4466, 2.9491, 6.1742),
+    'ptpss': (0.75, 0.0, 0.2804, 6.5745),
+    'pw1pw': (1.0, 0.3807, 2.3363, 5.8844),
+    'pw6b95': (1.0, 0.2076, 0.7257, 6.375),
+    'pwb6k': (1.0, 0.1805, 0.9383, 7.7627),
+    'pwpb95': (0.82, 0.0, 0.2904, 7.3141),
+    'revpbe': (1.0, 0.5238, 2.355, 3.5016),
+    'revpbe0': (1.0, 0.4679, 1.7588, 3.7619),
+    'revpbe38': (1.0, 0.4309, 1.476, 3.9446),
+    'revssb': (1.0, 0.472, 0.4389, 4.0986),
+    'revtpss': (1.0, 0.4426, 1.4023, 4.4723),
+    'revtpss0': (1.0, 0.2218, 1.6151, 5.7985),
+    'revtpssh': (1.0, 0.266, 1.4076, 5.3761),
+    'rpbe': (1.0, 0.182, 0.8318, 4.0094),
+    'rpw86pbe': (1.0, 0.4613, 1.3845, 4.5062),
+    'scan': (1.0, 0.538, 0.0, 5.42),
+    'ssb': (1.0, -0.0952, -0.1744, 5.217),
+    'tauhcth': (1.0, 0.0, 1.2626, 5.6162),
+    'tauhcthhyb': (1.0, 0.0, 0.9585, 10.1389),
+    'tpss': (1.0, 0.4535, 1.9435, 4.4752),
+    'tpss0': (1.0, 0.3768, 1.2576, 4.5865),
+    'tpss1kcis': (1.0, 0.0, 1.0542, 6.0201),
+    'tpssh': (1.0, 0.4529, 2.2382, 4.655),
+    'wb97x': (1.0, 0.0, 0.2641, 5.4959),
+    'x3lyp': (1.0, 0.2022, 1.5744, 5.4184),
+    'xlyp': (1.0, 0.0809, 1.5669, 5.3166)}
+
+# Modified Becke-Johnson damping: (s6, a1, s8, a2).
+_bjm_damping = {
+    'b2plyp': (0.64, 0.486434, 0.67282, 3.656466),
+    'b3lyp': (1.0, 0.278672, 1.466677, 4.606311),
+    'b3lypg': (1.0, 0.278672, 1.466677, 4.606311),
+    'b97d': (1.0, 0.240184, 1.206988, 3.864426),
+    'blyp': (1.0, 0.448486, 1.875007, 3.610679),
+    'bp': (1.0, 0.82185, 3.140281, 2.728151),
+    'lcwpbe': (1.0, 0.563761, 0.906564, 3.59368),
+    'pbe': (1.0, 0.012092, 0.35894, 5.938951),
+    'pbe0': (1.0, 0.007912, 0.528823, 6.162326)}
+
+
+class NumpyDFTD3(PureDFTD3):
+    """In-process DFT-D3 implementation using NumPy.
+
+    Same parameters as PureDFTD3.  Zero and Becke-Johnson (bj and bjm)
+    damping and the three-body term are implemented.  Without custom
+    damping parameters, the parameters for xc (default PBE) are taken
+    from the tables of the dftd3 program; the 'triple zeta' parameters
+    (tz=True) are not included.  The reference data is described in
+    D3Reference.
+
+    Unlike the dftd3 program, systems with 1D or 2D periodic boundary
+    conditions are handled correctly."""
+
+    name = 'numpydftd3'
+
+    damppars = {'zero': ['s6', 'sr6', 's8', 'sr8', 'alpha6'],
+                'bj': ['s6', 'a1', 's8', 'a2'],
+                'bjm': ['s6', 'a1', 's8', 'a2']}
+
+    damping_parameters = {'zero': _zero_damping,
+                          'bj': _bj_damping,
+                          'bjm': _bjm_damping}
+
+    def __init__(self, *, reference=None, **kwargs):
+        if not isinstance(reference, D3Reference):
+            reference = D3Reference.read(reference)
+        self.reference = reference
+        super().__init__(**kwargs)
+
+    def set(self, **kwargs):
+        changed_parameters = PureDFTD3.set(self, **kwargs)
+        if self.parameters['old']:
+            raise NotImplementedError('DFT-D2 is not implemented')
+        if self.parameters['damping'] not in self.damppars:
+            raise NotImplementedError('{} damping is not implemented'
+                                      .format(self.parameters['damping']))
+        return changed_parameters
+
+    def _get_damping_parameters(self):
+        par = self.parameters
+        names = self.damppars[par['damping']]
+        missing = [name for name in names if par[name] is None]
+        if not missing:
+            return {name: par[name] for name in names}
+        if len(missing) < len(names):
+            raise ValueError('Incomplete set of custom damping parameters.  '
+                             'Missing: ' + ', '.join(missing))
+        if par['tz']:
+            raise NotImplementedError('The tz damping parameters are not '
+                                      'tabulated')
+        xc = par['xc'] or 'pbe'
+        table = self.damping_parameters[par['damping']]
+        values = table.get(xc.lower().replace('-', ''))
+        if values is None:
+            raise ValueError('No {} damping parameters for {}.  Give custom '
+                             'damping parameters.'
+                             .format(par['damping'], xc))
+        damp = dict(zip(names, values))
+        if par['damping'] == 'zero':
+            damp['alpha6'] = 14.0
+        return damp
+
+    def calculate(self, atoms, properties, system_changes):
+        Calculator.calculate(self, atoms, properties, system_changes)
+        par = self.parameters
+        damp = self._get_damping_parameters()
+
+        ref = self.reference
+        atoms = self.atoms
+        numbers = atoms.numbers
+        natoms = len(atoms)
+        ref.check(numbers)
+        grad = bool(par['grad'])
+        gradient = _Gradient(natoms)
+
+        # Coordination numbers:
+        i, j, D, r = _pairs(atoms, par['cnthr'])
+        x = 4 / 3 * (ref.rcov[numbers[i]] + ref.rcov[numbers[j]]) / r
+        cnfunc = 1 / (1 + np.exp(-16 * (x - 1)))
+        cn = np.bincount(i, cnfunc, natoms)
+        c6, dc6dcn1, dc6dcn2 = ref.get_c6_matrix(numbers, cn)
+        dEdcn = np.zeros(natoms)
+
+        # Two-body terms:
+        i2, j2, D2, r2 = _pairs(atoms, par['cutoff'], bothways=False)
+        Z1 = numbers[i2]
+        Z2 = numbers[j2]
+        q = 3 * ref.r2r4[Z1] * ref.r2r4[Z2]  # C8 / C6
+        if par['damping'] == 'zero':
+            r0 = ref.r0ab[Z1, Z2]
+            alpha6 = damp['alpha6']
+            t6 = (r2 / (damp['sr6'] * r0))**-alpha6
+            t8 = (r2 / (damp['sr8'] * r0))**-(alpha6 + 2)
+            f6 = 1 / (1 + 6 * t6)
+            f8 = 1 / (1 + 6 * t8)
+            e6 = f6 / r2**6
+            e8 = f8 / r2**8
+            de6 = (6 * alpha6 * t6 * f6 - 6) * e6 / r2
+            de8 = (6 * (alpha6 + 2) * t8 * f8 - 8) * e8 / r2
+        else:
+            r0 = damp['a1'] * np.sqrt(q) + damp['a2']
+            e6 = 1 / (r2**6 + r0**6)
+            e8 = 1 / (r2**8 + r0**8)
+            de6 = -6 * r2**5 * e6**2
+            de8 = -8 * r2**7 * e8**2
+        dEdc6 = -(damp['s6'] * e6 + damp['s8'] * q * e8)
+        c6ij = c6[i2, j2]
+        energy = (c6ij * dEdc6).sum()
+        if grad:
+            gradient.add(i2, j2, D2, r2,
+                         -c6ij * (damp['s6'] * de6 + damp['s8'] * q * de8))
+            dEdcn += np.bincount(i2, dEdc6 * dc6dcn1[i2, j2], natoms)
+            dEdcn += np.bincount(j2, dEdc6 * dc6dcn2[i2, j2], natoms)
+
+        if par['abc']:
+            energy += self._three_body(numbers, c6, dc6dcn1, dc6dcn2,
+                                       i, j, D, r, par['cnthr'] / Bohr,
+                                       dEdcn, gradient if grad else None)
+
+        if grad:
+            dcndr = -16 * cnfunc * (1 - cnfunc) * x / r
+            gradient.add(i, j, D, r, dEdcn[i] * dcndr)
+
+        self.results['energy'] = energy * Hartree
+        self.results['free_energy'] = energy * Hartree
+        if grad:
+            self.results['forces'] = gradient.forces * (Hartree / Bohr)
+            if any(atoms.pbc):
+                stress = gradient.virial * Hartree / atoms.get_volume()
+                self.results['stress'] = full_3x3_to_voigt_6_stress(stress)
+
+    def _three_body(self, numbers, c6, dc6dcn1, dc6dcn2, i, j, D, r, cutoff,
+                    dEdcn, gradient, chunksize=2**17):
+        """Axilrod-Teller-Muto term for all triangles with sides < cutoff.
+
+        Every triangle is found once from each of its corners."""
+        r0ab = self.reference.r0ab
+        natoms = len(numbers)
+        first = np.searchsorted(i, np.arange(natoms + 1))
+        energy = 0.0
+        for a, p, q in _triangles(first, chunksize):
+            n1 = first[a]
+            n2 = first[a + 1]
+            Dij = D[n1:n2][p]
+            Dik = D[n1:n2][q]
+            Djk = Dik - Dij
+            rjk = np.sqrt((Djk**2).sum(1))
+            mask = rjk < cutoff
+            p = p[mask]
+            q = q[mask]
+            Dij = Dij[mask]
+            Dik = Dik[mask]
+            Djk = Djk[mask]
+            rjk = rjk[mask]
+            b = j[n1:n2][p]
+            c = j[n1:n2][q]
+            rij = r[n1:n2][p]
+            rik = r[n1:n2][q]
+
+            c6ab = c6[a, b]
+            c6ac = c6[a, c]
+            c6bc = c6[b, c]
+            c9 = np.sqrt(c6ab * c6ac * c6bc)
+            s1 = rij**2
+            s2 = rjk**2
+            s3 = rik**2
+            A = s1 + s2 - s3
+            B = s1 - s2 + s3
+            C = -s1 + s2 + s3
+            R = rij * rjk * rik
+            # 3 cos(alpha) cos(beta) cos(gamma) + 1 divided by R^3:
+            ang = 0.375 * A * B * C / R**5 + 1 / R**3
+            Z1 = numbers[a]
+            Z2 = numbers[b]
+            Z3 = numbers[c]
+            R0 = r0ab[Z1, Z2] * r0ab[Z1, Z3] * r0ab[Z2, Z3]
+            t = (0.75 * np.cbrt(R / R0))**-16
+            f = 1 / (1 + 6 * t)
+            e = c9 * ang * f / 3
+            energy += e.sum()
+
+            if gradient is None:
+                continue
+
+            dEdc6 = e / 2
+            dEdcn[a] += (dEdc6 * (dc6dcn1[a, b] / c6ab +
+                                  dc6dcn1[a, c] / c6ac)).sum()
+            dEdcn += np.bincount(b, dEdc6 * (dc6dcn2[a, b] / c6ab +
+                                             dc6dcn1[b, c] / c6bc), natoms)
+            dEdcn += np.bincount(c, dEdc6 * (dc6dcn2[a, c] / c6ac +
+                                             dc6dcn2[b, c] / c6bc), natoms)
+
+            x = 1.875 * A * B * C / R**5 + 3 / R**3
+            for rx, dPds, i1, i2, Dx in [
+                    (rij, B * C + A * C - A * B, a, b, Dij),
+                    (rjk, B * C - A * C + A * B, b, c, Djk),
+                    (rik, -B * C + A * C + A * B, a, c, Dik)]:
+                dangdr = 0.75 * rx * dPds / R**5 - x / rx
+                dEdr = c9 / 3 * (dangdr * f + ang * 32 * t * f**2 / rx)
+                gradient.add(np.broadcast_to(i1, rx.shape),
+                             np.broadcast_to(i2, rx.shape), Dx, rx, dEdr)
+        return energy
+
+
 class DFTD3Inputs:
     dftd3_flags = {'grad', 'pbc', 'abc', 'old', 'tz'}
 
@@ -8,14 +8,86 @@
 # License: See accompanying license files for details
 
 import os
+import warnings
+
 import numpy as np
 
-from ase.neighborlist import NeighborList
+from ase.neighborlist import NeighborList, NewPrimitiveNeighborList
 from ase.calculators.calculator import Calculator, all_changes
 from scipy.interpolate import InterpolatedUnivariateSpline as spline
 from ase.units import Bohr, Hartree
 
 
+def _accumulate(index, values, n):
+    """Sum the rows of values with the same index into n rows."""
+    return np.array([np.bincount(index, column, n)
+                     for column in values.T]).reshape(-1, n).T
+
+
+def _angular_terms(mu, lam, r, rvec, d, d_d, q, d_q):
+    """Extra adp force of every pair.
+
+    mu and lam are the differences of the dipoles and the sums of the
+    quadrupoles of the two atoms, d, d_d, q and d_q are the dipole and
+    quadrupole functions and their derivatives at r, as columns."""
+    r = r[:, np.newaxis]
+    term1 = mu * d
+    term2 = (np.sum(mu * rvec, axis=1)[:, np.newaxis] * d_d *
+             rvec / r)
+    term3 = 2 * np.einsum('nab,na->nb', lam, rvec) * q
+    term4 = (np.einsum('nab,na,nb->n', lam, rvec, rvec)[:, np.newaxis] *
+             d_q * rvec / r)
+    term5 = (lam.trace(axis1=1, axis2=2)[:, np.newaxis] *
+             (d_q * r + 2 * q) * rvec) / 3.
+
+    # the minus for term5 is a correction on the adp
+    # formulation given in the 2005 Mishin Paper and is posted
+    # on the NIST website with the AlH potential
+    return term1 + term2 + term3 + term4 - term5
+
+
+class SplineTable:
+    """Cubic spline through points on an equidistant grid.
+
+    The spline is the same as scipy's InterpolatedUnivariateSpline with
+    k=3, but the polynomial coefficients of every grid interval are
+    stored in a table.  Evaluation is then a lookup of the interval
+    instead of a search, which is much faster for long arrays.  Like the
+    scipy spline it extrapolates with the first and last polynomial."""
+
+    def __init__(self, x, y):
+        x = np.asarray(x, dtype=float)
+        interpolation = spline(x, y, k=3)
+        self.x0 = x[0]
+        self.dx = x[1] - x[0]
+
+        # The knots of the spline are a subset of the grid points, so the
+        # third derivative is constant within every grid interval.
+        left = x[:-1]
+        self.coefficients = np.array([
+            interpolation(left),
+            interpolation(left, 1),
+            interpolation(left, 2) / 2,
+            interpolation(left + 0.5 * self.dx, 3) / 6]).T
+
+    def __call__(self, x, nu=0):
+        """Evaluate the spline or its nu'th derivative at x."""
+        x = np.asarray(x, dtype=float)
+        k = np.clip(np.floor((x - self.x0) / self.dx),
+                    0, len(self.coefficients) - 1).astype(int)
+        t = x - (self.x0 + k * self.dx)
+        c0, c1, c2, c3 = np.moveaxis(self.coefficients[k], -1, 0)
+        if nu == 0:
+            return ((c3 * t + c2) * t + c1) * t + c0
+        elif nu == 1:
+            return (3 * c3 * t + 2 * c2) * t + c1
+        elif nu == 2:
+            return 6 * c3 * t + 2 * c2
+        elif nu == 3:
+            return 6 * c3 + 0 * t
+        return np.zeros_like(t)
+
+
 class EAM(Calculator):
     r"""
 
@@ -196,8 +268,11 @@ Special features
 Notes/Issues
 =============
 
-* Although currently not fast, this calculator can be good for trying
-  small calculations or for creating new potentials by matching baseline
+* The potential functions read from a file are tabulated splines
+  (:class:`SplineTable`) and all pairs of atoms are evaluated at once,
+  grouped by the elements of the two atoms.  This calculator is good
+  for trying calculations on up to some ten thousand atoms or for
+  creating new potentials by matching baseline
   data such as from DFT results. The format for these potentials is
   compatible with LAMMPS_ and so can be used either directly by LAMMPS or
   with the ASE LAMMPS calculator interface.
@@ -338,7 +413,7 @@ End EAM Interface Documentation
             self.density_data = np.array(
                 [np.float_(data[n + self.nr:n + 2 * self.nr])])
 
-        elif self.form in ['alloy', 'adq']:
+        elif self.form in ['alloy', 'adp']:
             self.header = lines[:3]
             i = 3
 
@@ -458,10 +533,10 @@ End EAM Interface Documentation
         self.d_electron_density = np.empty(self.Nelements, object)
 
         for i in range(self.Nelements):
-            self.embedded_energy[i] = spline(self.rho,
-                                             self.embedded_data[i], k=3)
-            self.electron_density[i] = spline(self.r,
-                                              self.density_data[i], k=3)
+            self.embedded_energy[i] = SplineTable(self.rho,
+                                                  self.embedded_data[i])
+            self.electron_density[i] = SplineTable(self.r,
+                                                   self.density_data[i])
             self.d_embedded_energy[i] = self.deriv(self.embedded_energy[i])
             self.d_electron_density[i] = self.deriv(self.electron_density[i])
 
@@ -472,9 +547,9 @@ End EAM Interface Documentation
         # to go through zero due to the r*phi format in alloy and adp
         for i in range(self.Nelements):
             for j in range(i, self.Nelements):
-                self.phi[i, j] = spline(
+                self.phi[i, j] = SplineTable(
                     self.r[1:],
-                    self.rphi_data[i, j][1:] / self.r[1:], k=3)
+                    self.rphi_data[i, j][1:] / self.r[1:])
 
                 self.d_phi[i, j] = self.deriv(self.phi[i, j])
 
@@ -491,12 +566,12 @@ End EAM Interface Documentation
             [self.Nelements, self.Nelements], object)
 
         for i in range(self.Nelements):
-            self.embedded_energy[i] = spline(self.rho,
-                                             self.embedded_data[i], k=3)
+            self.embedded_energy[i] = SplineTable(self.rho,
+                                                  self.embedded_data[i])
             self.d_embedded_energy[i] = self.deriv(self.embedded_energy[i])
             for j in range(self.Nelements):
-                self.electron_density[i, j] = spline(
-                    self.r, self.density_data[i, j], k=3)
+                self.electron_density[i, j] = SplineTable(
+                    self.r, self.density_data[i, j])
                 self.d_electron_density[i, j] = self.deriv(
                     self.electron_density[i, j])
 
@@ -505,9 +580,9 @@ End EAM Interface Documentation
 
         for i in range(self.Nelements):
             for j in range(i, self.Nelements):
-                self.phi[i, j] = spline(
+                self.phi[i, j] = SplineTable(
                     self.r[1:],
-                    self.rphi_data[i, j][1:] / self.r[1:], k=3)
+                    self.rphi_data[i, j][1:] / self.r[1:])
 
                 self.d_phi[i, j] = self.deriv(self.phi[i, j])
 
@@ -523,9 +598,9 @@ End EAM Interface Documentation
 
         for i in range(self.Nelements):
             for j in range(i, self.Nelements):
-                self.d[i, j] = spline(self.r[1:], self.d_data[i, j][1:], k=3)
+                self.d[i, j] = SplineTable(self.r[1:], self.d_data[i, j][1:])
                 self.d_d[i, j] = self.deriv(self.d[i, j])
-                self.q[i, j] = spline(self.r[1:], self.q_data[i, j][1:], k=3)
+                self.q[i, j] = SplineTable(self.r[1:], self.q_data[i, j][1:])
                 self.d_q[i, j] = self.deriv(self.q[i, j])
 
                 # make symmetrical
@@ -625,7 +700,8 @@ End EAM Interface Documentation
     def update(self, atoms):
         # check all the elements are available in the potential
         self.Nelements = len(self.elements)
-        elements = np.unique(atoms.get_chemical_symbols())
+        symbols = np.array(atoms.get_chemical_symbols())
+        elements = np.unique(symbols)
         unavailable = np.logical_not(
             np.array([item in self.elements for item in elements]))
 
@@ -633,22 +709,28 @@ End EAM Interface Documentation
             raise RuntimeError('These elements are not in the potential: %s' %
                                elements[unavailable])
 
-        # cutoffs need to be a vector for NeighborList
-        cutoffs = self.cutoff * np.ones(len(atoms))
-
         # convert the elements to an index of the position
         # in the eam format
-        self.index = np.array([self.elements.index(el)
-                               for el in atoms.get_chemical_symbols()])
+        self.index = np.empty(len(atoms), dtype=int)
+        for element in elements:
+            self.index[symbols == element] = self.elements.index(element)
         self.pbc = atoms.get_pbc()
 
-        # since we need the contribution of all neighbors to the
-        # local electron density we cannot just calculate and use
-        # one way neighbors
-        self.neighbors = NeighborList(cutoffs,
-                                      skin=self.parameters.skin,
-                                      self_interaction=False,
-                                      bothways=True)
+        # every pair is evaluated once and its contributions are added
+        # to both atoms, so a one way neighbor list is enough.  The list
+        # is kept between calls and only rebuilt when atoms have moved
+        # more than the skin distance, or when the number of atoms, the
+        # cutoff or the skin changes.
+        cutoffs = 0.5 * self.cutoff * np.ones(len(atoms))
+        skin = self.parameters.skin
+        neighbors = getattr(self, 'neighbors', None)
+        if (neighbors is None or neighbors.nl.skin != skin or
+                not np.array_equal(neighbors.nl.cutoffs, cutoffs + skin)):
+            self.neighbors = NeighborList(cutoffs,
+                                          skin=skin,
+                                          self_interaction=False,
+                                          bothways=False,
+                                          primitive=NewPrimitiveNeighborList)
         self.neighbors.update(atoms)
 
     def calculate(self, atoms=None, properties=['energy'],
@@ -689,6 +771,72 @@ End EAM Interface Documentation
 #        if 'potential' in parameter_changes and potential != None:
 #                self.read_potential(potential)
 
+    def get_pairs(self, atoms):
+        """Return all pairs of atoms within the cutoff.
+
+        Every pair is returned once as the indices i and j of the two
+        atoms, the vectors rvec from atom i to atom j and their lengths
+        r."""
+        nl = self.neighbors.nl
+        i = nl.pair_first
+        j = nl.pair_second
+        rvec = (atoms.positions[j] - atoms.positions[i] +
+                nl.offset_vec @ atoms.cell.complete())
+        r = np.sqrt(np.sum(np.square(rvec), axis=1))
+        mask = r < self.cutoff
+        return i[mask], j[mask], rvec[mask], r[mask]
+
+    def pair_groups(self, i, j):
+        """Group pairs by the elements of their atoms.
+
+        Returns a list of tuples (a, b, pairs) where pairs are the
+        indices of all pairs whose first atom is of element a and whose
+        second atom is of element b."""
+        code = self.index[i] * self.Nelements + self.index[j]
+        order = np.argsort(code, kind='stable')
+        bounds = np.searchsorted(code[order],
+                                 np.arange(self.Nelements**2 + 1))
+        groups = []
+        for a in range(self.Nelements):
+            for b in range(self.Nelements):
+                c = a * self.Nelements + b
+                if bounds[c] < bounds[c + 1]:
+                    groups.append((a, b, order[bounds[c]:bounds[c + 1]]))
+        return groups
+
+    def evaluate_pairs(self, functions, groups, r):
+        """Evaluate functions[a, b] for the pairs of every group."""
+        values = np.empty(len(r))
+        for a, b, pairs in groups:
+            values[pairs] = functions[a, b](r[pairs])
+        return values
+
+    def evaluate_atoms(self, functions, x):
+        """Evaluate functions[a] for the atoms of every element a."""
+        values = np.empty(len(x))
+        for a in range(self.Nelements):
+            mask = self.index == a
+            if mask.any():
+                values[mask] = functions[a](x[mask])
+        return values
+
+    def density_functions(self, functions):
+        """Arrange the electron density functions by pairs of elements.
+
+        Returns the functions giving the density at the first and at the
+        second atom of a pair of elements a and b."""
+        first = np.empty([self.Nelements, self.Nelements], object)
+        second = np.empty([self.Nelements, self.Nelements], object)
+        for a in range(self.Nelements):
+            for b in range(self.Nelements):
+                if self.form == 'fs':
+                    first[a, b] = functions[b, a]
+                    second[a, b] = functions[a, b]
+                else:
+                    first[a, b] = functions[b]
+                    second[a, b] = functions[a]
+        return first, second
+
     def calculate_energy(self, atoms):
         """Calculate the energy
         the energy is made up of the ionic or pair interaction and
@@ -696,67 +844,41 @@ End EAM Interface Documentation
         generated by its neighbors
         """
 
-        pair_energy = 0.0
-        embedding_energy = 0.0
-        mu_energy = 0.0
-        lam_energy = 0.0
-        trace_energy = 0.0
-
-        self.total_density = np.zeros(len(atoms))
-        if (self.form == 'adp'):
-            self.mu = np.zeros([len(atoms), 3])
-            self.lam = np.zeros([len(atoms), 3, 3])
-
-        for i in range(len(atoms)):  # this is the atom to be embedded
-            neighbors, offsets = self.neighbors.get_neighbors(i)
-            offset = np.dot(offsets, atoms.get_cell())
-
-            rvec = (atoms.positions[neighbors] + offset -
-                    atoms.positions[i])
-
-            # calculate the distance to the nearest neighbors
-            r = np.sqrt(np.sum(np.square(rvec), axis=1))  # fast
-#            r = np.apply_along_axis(np.linalg.norm, 1, rvec)  # sloow
-
-            nearest = np.arange(len(r))[r <= self.cutoff]
-            for j_index in range(self.Nelements):
-                use = self.index[neighbors[nearest]] == j_index
-                if not use.any():
-                    continue
-                pair_energy += np.sum(self.phi[self.index[i], j_index](
-                    r[nearest][use])) / 2.
-
-                if self.form == 'fs':
-                    density = np.sum(
-                        self.electron_density[j_index, self.index[i]](r[nearest][use]))
-                else:
-                    density = np.sum(
-                        self.electron_density[j_index](r[nearest][use]))
-                self.total_density[i] += density
+        natoms = len(atoms)
+        i, j, rvec, r = self.get_pairs(atoms)
+        groups = self.pair_groups(i, j)
 
-                if self.form == 'adp':
-                    self.mu[i] += self.adp_dipole(
-                        r[nearest][use],
-                        rvec[nearest][use],
-                        self.d[self.index[i], j_index])
+        pair_energy = np.sum(self.evaluate_pairs(self.phi, groups, r))
 
-                    self.lam[i] += self.adp_quadrupole(
-                        r[nearest][use],
-                        rvec[nearest][use],
-                        self.q[self.index[i], j_index])
+        first, second = self.density_functions(self.electron_density)
+        self.total_density = (
+            np.bincount(i, self.evaluate_pairs(first, groups, r), natoms) +
+            np.bincount(j, self.evaluate_pairs(second, groups, r), natoms))
 
-            # add in the electron embedding energy
-            embedding_energy += self.embedded_energy[self.index[i]](
-                self.total_density[i])
+        # add in the electron embedding energy
+        embedding_energy = np.sum(self.evaluate_atoms(self.embedded_energy,
+                                                      self.total_density))
 
         components = dict(pair=pair_energy, embedding=embedding_energy)
 
         if self.form == 'adp':
-            mu_energy += np.sum(self.mu ** 2) / 2.
-            lam_energy += np.sum(self.lam ** 2) / 2.
-
-            for i in range(len(atoms)):  # this is the atom to be embedded
-                trace_energy -= np.sum(self.lam[i].trace() ** 2) / 6.
+            # the dipole and quadrupole functions are symmetric, the
+            # vector from atom j to atom i is -rvec
+            d = self.evaluate_pairs(self.d, groups, r)[:, np.newaxis] * rvec
+            self.mu = (_accumulate(i, d, natoms) -
+                       _accumulate(j, d, natoms))
+
+            q = (self.evaluate_pairs(self.q, groups, r)[:, np.newaxis,
+                                                          np.newaxis] *
+                 rvec[:, :, np.newaxis] * rvec[:, np.newaxis, :])
+            self.lam = (_accumulate(i, q.reshape(-1, 9), natoms) +
+                        _accumulate(j, q.reshape(-1, 9), natoms)).reshape(-1,
+                                                                        3, 3)
+
+            mu_energy = np.sum(self.mu ** 2) / 2.
+            lam_energy = np.sum(self.lam ** 2) / 2.
+            trace_energy = -np.sum(
+                self.lam.trace(axis1=1, axis2=2) ** 2) / 6.
 
             adp_result = dict(adp_mu=mu_energy,
                               adp_lam=lam_energy,
@@ -780,107 +902,68 @@ End EAM Interface Documentation
         # calculate the forces based on derivatives of the three EAM functions
 
         self.update(atoms)
-        self.results['forces'] = np.zeros((len(atoms), 3))
-
-        for i in range(len(atoms)):  # this is the atom to be embedded
-            neighbors, offsets = self.neighbors.get_neighbors(i)
-            offset = np.dot(offsets, atoms.get_cell())
-            # create a vector of relative positions of neighbors
-            rvec = atoms.positions[neighbors] + offset - atoms.positions[i]
-            r = np.sqrt(np.sum(np.square(rvec), axis=1))
-            nearest = np.arange(len(r))[r < self.cutoff]
-
-            d_embedded_energy_i = self.d_embedded_energy[
-                self.index[i]](self.total_density[i])
-            urvec = rvec.copy()  # unit directional vector
-
-            for j in np.arange(len(neighbors)):
-                urvec[j] = urvec[j] / r[j]
-
-            for j_index in range(self.Nelements):
-                use = self.index[neighbors[nearest]] == j_index
-                if not use.any():
-                    continue
-                rnuse = r[nearest][use]
-                density_j = self.total_density[neighbors[nearest][use]]
-                if self.form == 'fs':
-                    scale = (self.d_phi[self.index[i], j_index](rnuse) +
-                             (d_embedded_energy_i *
-                              self.d_electron_density[j_index, self.index[i]](rnuse)) +
-                             (self.d_embedded_energy[j_index](density_j) *
-                              self.d_electron_density[self.index[i], j_index](rnuse)))
-                else:
-                    scale = (self.d_phi[self.index[i], j_index](rnuse) +
-                             (d_embedded_energy_i *
-                              self.d_electron_density[j_index](rnuse)) +
-                             (self.d_embedded_energy[j_index](density_j) *
-                              self.d_electron_density[self.index[i]](rnuse)))
-
-                self.results['forces'][i] += np.dot(scale, urvec[nearest][use])
-
-                if (self.form == 'adp'):
-                    adp_forces = self.angular_forces(
-                        self.mu[i],
-                        self.mu[neighbors[nearest][use]],
-                        self.lam[i],
-                        self.lam[neighbors[nearest][use]],
-                        rnuse,
-                        rvec[nearest][use],
-                        self.index[i],
-                        j_index)
-
-                    self.results['forces'][i] += adp_forces
+
+        natoms = len(atoms)
+        i, j, rvec, r = self.get_pairs(atoms)
+        groups = self.pair_groups(i, j)
+
+        d_embedded_energy = self.evaluate_atoms(self.d_embedded_energy,
+                                                self.total_density)
+        first, second = self.density_functions(self.d_electron_density)
+        scale = (self.evaluate_pairs(self.d_phi, groups, r) +
+                 d_embedded_energy[i] *
+                 self.evaluate_pairs(first, groups, r) +
+                 d_embedded_energy[j] *
+                 self.evaluate_pairs(second, groups, r))
+
+        # force on atom i from the pair, atom j gets the opposite force
+        forces = (scale / r)[:, np.newaxis] * rvec
+
+        if (self.form == 'adp'):
+            forces += self.pair_angular_forces(i, j, r, rvec, groups)
+
+        self.results['forces'] = (_accumulate(i, forces, natoms) -
+                                  _accumulate(j, forces, natoms))
+
+    def pair_angular_forces(self, i, j, r, rvec, groups):
+        """Calculate the extra components for the adp forces.
+
+        Returns the force on atom i of every pair, rvec are the relative
+        positions of atom j to atom i."""
+        d = self.evaluate_pairs(self.d, groups, r)[:, np.newaxis]
+        d_d = self.evaluate_pairs(self.d_d, groups, r)[:, np.newaxis]
+        q = self.evaluate_pairs(self.q, groups, r)[:, np.newaxis]
+        d_q = self.evaluate_pairs(self.d_q, groups, r)[:, np.newaxis]
+        return _angular_terms(self.mu[i] - self.mu[j],
+                              self.lam[i] + self.lam[j],
+                              r, rvec, d, d_d, q, d_q)
 
     def angular_forces(self, mu_i, mu, lam_i, lam, r, rvec, form1, form2):
-        # calculate the extra components for the adp forces
-        # rvec are the relative positions to atom i
-        psi = np.zeros(mu.shape)
-        for gamma in range(3):
-            term1 = (mu_i[gamma] - mu[:, gamma]) * self.d[form1][form2](r)
-
-            term2 = np.sum((mu_i - mu) *
-                           self.d_d[form1][form2](r)[:, np.newaxis] *
-                           (rvec * rvec[:, gamma][:, np.newaxis] /
-                            r[:, np.newaxis]), axis=1)
-
-            term3 = 2 * np.sum((lam_i[:, gamma] + lam[:, :, gamma]) *
-                               rvec * self.q[form1][form2](r)[:, np.newaxis],
-                               axis=1)
-            term4 = 0.0
-            for alpha in range(3):
-                for beta in range(3):
-                    rs = rvec[:, alpha] * rvec[:, beta] * rvec[:, gamma]
-                    term4 += ((lam_i[alpha, beta] + lam[:, alpha, beta]) *
-                              self.d_q[form1][form2](r) * rs) / r
-
-            term5 = ((lam_i.trace() + lam.trace(axis1=1, axis2=2)) *
-                     (self.d_q[form1][form2](r) * r +
-                      2 * self.q[form1][form2](r)) * rvec[:, gamma]) / 3.
-
-            # the minus for term5 is a correction on the adp
-            # formulation given in the 2005 Mishin Paper and is posted
-            # on the NIST website with the AlH potential
-            psi[:, gamma] = term1 + term2 + term3 + term4 - term5
-
-        return np.sum(psi, axis=0)
+        """Extra adp force on one atom from its neighbors (deprecated).
+
+        Use pair_angular_forces() instead."""
+        warnings.warn('EAM.angular_forces() is deprecated and will be '
+                      'removed, use pair_angular_forces()', FutureWarning)
+        d = self.d[form1][form2](r)[:, np.newaxis]
+        d_d = self.d_d[form1][form2](r)[:, np.newaxis]
+        q = self.q[form1][form2](r)[:, np.newaxis]
+        d_q = self.d_q[form1][form2](r)[:, np.newaxis]
+        return np.sum(_angular_terms(mu_i - mu, lam_i + lam, r, rvec,
+                                     d, d_d, q, d_q), axis=0)
 
     def adp_dipole(self, r, rvec, d):
-        # calculate the dipole contribution
-        mu = np.sum((rvec * d(r)[:, np.newaxis]), axis=0)
-
-        return mu  # sign to agree with lammps
+        """Dipole contribution of the neighbors of one atom (deprecated)."""
+        warnings.warn('EAM.adp_dipole() is deprecated and will be removed',
+                      FutureWarning)
+        return np.sum(rvec * d(r)[:, np.newaxis], axis=0)
 
     def adp_quadrupole(self, r, rvec, q):
-        # slow way of calculating the quadrupole contribution
+        """Quadrupole contribution of the neighbors of one atom
+        (deprecated)."""
+        warnings.warn('EAM.adp_quadrupole() is deprecated and will be '
+                      'removed', FutureWarning)
         r = np.sqrt(np.sum(rvec ** 2, axis=1))
-
-        lam = np.zeros([rvec.shape[0], 3, 3])
-        qr = q(r)
-        for alpha in range(3):
-            for beta in range(3):
-                lam[:, alpha, beta] += qr * rvec[:, alpha] * rvec[:, beta]
-
-        return np.sum(lam, axis=0)
+        return np.einsum('n,na,nb->ab', q(r), rvec, rvec)
 
     def deriv(self, spline):
         """Wrapper for extracting the derivative from a spline"""
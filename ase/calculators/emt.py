@@ -1,12 +1,12 @@
 """Effective medium theory potential."""
 
-from math import sqrt, exp, log
+from math import sqrt, exp
 
 import numpy as np
 
 from ase.data import chemical_symbols, atomic_numbers
 from ase.units import Bohr
-from ase.neighborlist import NeighborList
+from ase.neighborlist import CellList, NeighborList, NewPrimitiveNeighborList
 from ase.calculators.calculator import (Calculator, all_changes,
                                         PropertyNotImplementedError)
 
@@ -115,86 +115,142 @@ class EMT(Calculator):
             for s2, p2 in self.par.items():
                 self.ksi[s1][s2] = p2['n0'] / p1['n0']
 
+        # Parameter tables indexed by atomic number for the vectorised
+        # evaluation.
+        self.par_Z = {}
+        for key in ['E0', 's0', 'V0', 'eta2', 'kappa', 'lambda', 'n0',
+                    'gamma1', 'gamma2']:
+            self.par_Z[key] = np.zeros(max(self.par, default=0) + 1)
+            for Z, p in self.par.items():
+                self.par_Z[key][Z] = p[key]
+
         self.energies = np.empty(len(atoms))
         self.forces = np.empty((len(atoms), 3))
         self.stress = np.empty((3, 3))
         self.sigma1 = np.empty(len(atoms))
         self.deds = np.empty(len(atoms))
+        self.embedding_energies = np.empty(len(atoms))
+        self.cell_list = None
 
         self.nl = NeighborList([0.5 * self.rc_list] * len(atoms),
-                               self_interaction=False)
+                               self_interaction=False,
+                               primitive=NewPrimitiveNeighborList)
+
+    def get_pairs(self):
+        """Return atom indices, distance vectors and distances of all pairs.
+
+        Every pair of atoms within the cutoff is returned once."""
+        self.nl.update(self.atoms)
+        i = self.nl.nl.pair_first
+        j = self.nl.nl.pair_second
+        positions = self.atoms.positions
+        d = (positions[j] - positions[i] +
+             self.nl.nl.offset_vec @ self.atoms.cell.complete())
+        r = np.sqrt((d * d).sum(axis=1))
+        mask = r < self.rc_list
+        return i[mask], j[mask], d[mask], r[mask]
+
+    def pair_terms(self, Z1, Z2, r):
+        """Evaluate the pair terms for pairs of atoms.
+
+        Z1, Z2: arrays of atomic numbers of the two atoms of each pair.
+        r: array of distances.
+
+        Returns the cutoff function theta and the exponential x that
+        enters its derivative, the pair energies y1 and y2 (with respect
+        to the first and second atom) and the contributions s1 and s2 of
+        the pair to sigma1 of the first and second atom."""
+        p = self.par_Z
+        x = np.exp(self.acut * (r - self.rc))
+        theta = 1.0 / (1.0 + x)
+        ksi = p['n0'][Z2] / p['n0'][Z1]
+        y1 = (0.5 * p['V0'][Z1] * np.exp(-p['kappa'][Z2] *
+                                         (r / beta - p['s0'][Z2])) *
+              ksi / p['gamma2'][Z1] * theta)
+        y2 = (0.5 * p['V0'][Z2] * np.exp(-p['kappa'][Z1] *
+                                         (r / beta - p['s0'][Z1])) /
+              ksi / p['gamma2'][Z2] * theta)
+        s1 = (np.exp(-p['eta2'][Z2] * (r - beta * p['s0'][Z2])) *
+              ksi * theta / p['gamma1'][Z1])
+        s2 = (np.exp(-p['eta2'][Z1] * (r - beta * p['s0'][Z1])) /
+              ksi * theta / p['gamma1'][Z2])
+        return theta, x, y1, y2, s1, s2
+
+    def embedding(self, Z, sigma1):
+        """Return embedding energies and their derivatives dE/dsigma1."""
+        p = self.par_Z
+        E = -p['E0'][Z]
+        deds = np.zeros(len(Z))
+        ok = sigma1 > 0
+        Z = Z[ok]
+        sigma1 = sigma1[ok]
+        ds = -np.log(sigma1 / 12) / (beta * p['eta2'][Z])
+        x = p['lambda'][Z] * ds
+        y = np.exp(-x)
+        z = 6 * p['V0'][Z] * np.exp(-p['kappa'][Z] * ds)
+        deds[ok] = ((x * y * p['E0'][Z] * p['lambda'][Z] + p['kappa'][Z] * z) /
+                    (sigma1 * beta * p['eta2'][Z]))
+        E[ok] += p['E0'][Z] * (1 + x) * y + z
+        return E, deds
 
     def calculate(self, atoms=None, properties=['energy'],
                   system_changes=all_changes):
         Calculator.calculate(self, atoms, properties, system_changes)
 
+        changed = self._find_small_change(properties, system_changes)
+        if changed is not None:
+            self._update_energy(changed, self.atoms.positions[changed],
+                                self.atoms.numbers[changed], commit=True)
+            self.results['energy'] = self.energy
+            self.results['energies'] = self.energies
+            self.results['free_energy'] = self.energy
+            return
+
         if 'numbers' in system_changes:
             self.initialize(self.atoms)
 
-        positions = self.atoms.positions
-        numbers = self.atoms.numbers
-        cell = self.atoms.cell
-
-        self.nl.update(self.atoms)
-
-        self.energy = 0.0
-        self.energies[:] = 0
-        self.sigma1[:] = 0.0
-        self.forces[:] = 0.0
-        self.stress[:] = 0.0
-
         natoms = len(self.atoms)
-
-        for a1 in range(natoms):
-            Z1 = numbers[a1]
-            p1 = self.par[Z1]
-            ksi = self.ksi[Z1]
-            neighbors, offsets = self.nl.get_neighbors(a1)
-            offsets = np.dot(offsets, cell)
-            for a2, offset in zip(neighbors, offsets):
-                d = positions[a2] + offset - positions[a1]
-                r = sqrt(np.dot(d, d))
-                if r < self.rc_list:
-                    Z2 = numbers[a2]
-                    p2 = self.par[Z2]
-                    self.interact1(a1, a2, d, r, p1, p2, ksi[Z2])
-
-        for a in range(natoms):
-            Z = numbers[a]
-            p = self.par[Z]
-            try:
-                ds = -log(self.sigma1[a] / 12) / (beta * p['eta2'])
-            except (OverflowError, ValueError):
-                self.deds[a] = 0.0
-                self.energy -= p['E0']
-                self.energies[a] -= p['E0']
-                continue
-            x = p['lambda'] * ds
-            y = exp(-x)
-            z = 6 * p['V0'] * exp(-p['kappa'] * ds)
-            self.deds[a] = ((x * y * p['E0'] * p['lambda'] + p['kappa'] * z) /
-                            (self.sigma1[a] * beta * p['eta2']))
-            E = p['E0'] * ((1 + x) * y - 1) + z
-            self.energy += E
-            self.energies[a] += E
-
-        for a1 in range(natoms):
-            Z1 = numbers[a1]
-            p1 = self.par[Z1]
-            ksi = self.ksi[Z1]
-            neighbors, offsets = self.nl.get_neighbors(a1)
-            offsets = np.dot(offsets, cell)
-            for a2, offset in zip(neighbors, offsets):
-                d = positions[a2] + offset - positions[a1]
-                r = sqrt(np.dot(d, d))
-                if r < self.rc_list:
-                    Z2 = numbers[a2]
-                    p2 = self.par[Z2]
-                    self.interact2(a1, a2, d, r, p1, p2, ksi[Z2])
+        numbers = self.atoms.numbers
+        self.numbers = numbers.copy()
+        self.positions = self.atoms.positions.copy()
+        self.cell_list = None
+        i, j, d, r = self.get_pairs()
+
+        # First pass over all pairs: the pair energies and the neutral
+        # sphere densities sigma1.
+        theta, x, y1, y2, s1, s2 = self.pair_terms(numbers[i], numbers[j], r)
+        e = 0.5 * (y1 + y2)
+        self.sigma1[:] = np.bincount(i, s1, natoms) + np.bincount(j, s2, natoms)
+
+        # Embedding energy of every atom and its derivative with respect
+        # to sigma1.
+        self.embedding_energies[:], self.deds[:] = \
+            self.embedding(numbers, self.sigma1)
+        self.energies[:] = self.embedding_energies - (
+            np.bincount(i, e, natoms) + np.bincount(j, e, natoms))
+        self.energy = self.energies.sum()
 
         self.results['energy'] = self.energy
         self.results['energies'] = self.energies
         self.results['free_energy'] = self.energy
+
+        # Second pass over all pairs: forces from the pair energies and
+        # the embedding energies.
+        p = self.par_Z
+        Z1 = numbers[i]
+        Z2 = numbers[j]
+        f = (((y1 * p['kappa'][Z2] + y2 * p['kappa'][Z1]) / beta +
+              (y1 + y2) * self.acut * theta * x) / r)[:, np.newaxis] * d
+        y1 = s1 * self.deds[i]
+        y2 = s2 * self.deds[j]
+        f -= (((y1 * p['eta2'][Z2] + y2 * p['eta2'][Z1]) +
+               (y1 + y2) * self.acut * theta * x) / r)[:, np.newaxis] * d
+
+        for c in range(3):
+            self.forces[:, c] = (np.bincount(i, f[:, c], natoms) -
+                                 np.bincount(j, f[:, c], natoms))
+        self.stress[:] = -f.T @ d
+
         self.results['forces'] = self.forces
 
         if 'stress' in properties:
@@ -205,38 +261,146 @@ class EMT(Calculator):
             else:
                 raise PropertyNotImplementedError
 
-    def interact1(self, a1, a2, d, r, p1, p2, ksi):
-        x = exp(self.acut * (r - self.rc))
-        theta = 1.0 / (1.0 + x)
-        y1 = (0.5 * p1['V0'] * exp(-p2['kappa'] * (r / beta - p2['s0'])) *
-              ksi / p1['gamma2'] * theta)
-        y2 = (0.5 * p2['V0'] * exp(-p1['kappa'] * (r / beta - p1['s0'])) /
-              ksi / p2['gamma2'] * theta)
-        self.energy -= y1 + y2
-        self.energies[a1] -= (y1 + y2) / 2
-        self.energies[a2] -= (y1 + y2) / 2
-        f = ((y1 * p2['kappa'] + y2 * p1['kappa']) / beta +
-             (y1 + y2) * self.acut * theta * x) * d / r
-        self.forces[a1] += f
-        self.forces[a2] -= f
-        self.stress -= np.outer(f, d)
-        self.sigma1[a1] += (exp(-p2['eta2'] * (r - beta * p2['s0'])) *
-                            ksi * theta / p1['gamma1'])
-        self.sigma1[a2] += (exp(-p1['eta2'] * (r - beta * p1['s0'])) /
-                            ksi * theta / p2['gamma1'])
-
-    def interact2(self, a1, a2, d, r, p1, p2, ksi):
-        x = exp(self.acut * (r - self.rc))
-        theta = 1.0 / (1.0 + x)
-        y1 = (exp(-p2['eta2'] * (r - beta * p2['s0'])) *
-              ksi / p1['gamma1'] * theta * self.deds[a1])
-        y2 = (exp(-p1['eta2'] * (r - beta * p1['s0'])) /
-              ksi / p2['gamma1'] * theta * self.deds[a2])
-        f = ((y1 * p2['eta2'] + y2 * p1['eta2']) +
-             (y1 + y2) * self.acut * theta * x) * d / r
-        self.forces[a1] -= f
-        self.forces[a2] += f
-        self.stress += np.outer(f, d)
+    def get_energy_change(self, atoms, indices, positions=None,
+                          numbers=None):
+        """Energy change when a few atoms are moved or changed.
+
+        Only the pair terms of the atoms in *indices* and the embedding
+        energies of them and their neighbors are evaluated, so the cost
+        does not grow with the size of the system.  *atoms* is not
+        modified.
+
+        atoms: Atoms object
+            The configuration before the change.
+        indices: list of int
+            The atoms that are changed.
+        positions: array
+            New positions of the atoms in *indices*.
+        numbers: list of int
+            New atomic numbers of the atoms in *indices*.  Two atoms are
+            swapped with ``indices=[a, b], numbers=atoms.numbers[[b, a]]``.
+
+        Example (Metropolis Monte Carlo)::
+
+            dE = calc.get_energy_change(atoms, [a], positions=[new])
+            if dE < 0 or np.random.random() < np.exp(-dE / kT):
+                atoms.positions[a] = new
+        """
+        self.get_potential_energy(atoms)
+        indices = np.asarray(indices, dtype=int).reshape(-1)
+        if positions is None:
+            positions = self.positions[indices]
+        if numbers is None:
+            numbers = self.numbers[indices]
+        else:
+            new_numbers = self.numbers.copy()
+            new_numbers[indices] = numbers
+            if (not set(new_numbers) <= set(self.par) or
+                (self.parameters.asap_cutoff and
+                 set(new_numbers) != set(self.numbers))):
+                # Parameters change, do a full calculation.
+                new_atoms = atoms.copy()
+                new_atoms.numbers = new_numbers
+                new_atoms.positions[indices] = positions
+                return EMT(**self.parameters).get_potential_energy(
+                    new_atoms) - self.energy
+
+        return self._update_energy(indices, positions, numbers, commit=False)
+
+    def _find_small_change(self, properties, system_changes):
+        """Return the atoms that changed if the energy can be updated.
+
+        The energy can be updated incrementally if only the energy is
+        wanted, only positions or numbers of a few atoms have changed, and
+        no new element parameters are needed."""
+        if (not hasattr(self, 'positions') or
+            not set(system_changes) <= {'positions', 'numbers'} or
+            not set(properties) <= {'energy', 'free_energy', 'energies'} or
+                len(self.atoms) != len(self.positions)):
+            return None
+        numbers = self.atoms.numbers
+        if 'numbers' in system_changes:
+            if (not set(numbers) <= set(self.par) or
+                (self.parameters.asap_cutoff and
+                 set(numbers) != set(self.numbers))):
+                return None
+        changed = np.flatnonzero(
+            (self.atoms.positions != self.positions).any(axis=1) |
+            (numbers != self.numbers))
+        if len(changed) > len(self.atoms) // 10:
+            return None
+        return changed
+
+    def _changed_pairs(self, indices):
+        """Return pairs involving the atoms in *indices*.
+
+        Every pair is returned once, as in :meth:`get_pairs`."""
+        i, j, r, S = self.cell_list.neighbor_list('ijdS', indices=indices)
+        # Pairs between two changed atoms are found from both sides.
+        nonzero = S != 0
+        positive = S[np.arange(len(S)), np.argmax(nonzero, axis=1)] > 0
+        mask = (~np.isin(j, indices) | (i < j) |
+                ((i == j) & positive))
+        return i[mask], j[mask], r[mask]
+
+    def _update_energy(self, indices, positions, numbers, commit):
+        """Energy change from moving or changing the atoms in *indices*.
+
+        The atoms in *indices* get new *positions* and *numbers*.  Only if
+        *commit* is true is the new configuration stored, otherwise the
+        calculator is left in its old state."""
+        if self.cell_list is None:
+            self.cell_list = CellList(self.atoms.pbc,
+                                      self.atoms.cell.complete(),
+                                      self.rc_list)
+            self.cell_list.update(self.positions)
+
+        # Remove the old pairs of the changed atoms and add the new ones.
+        cell_list = self.cell_list
+        i0, j0, r0 = self._changed_pairs(indices)
+        old_numbers = self.numbers
+        _, _, y1, y2, s1, s2 = self.pair_terms(old_numbers[i0],
+                                               old_numbers[j0], r0)
+        e0 = 0.5 * (y1 + y2)
+        new_positions = self.positions.copy()
+        new_positions[indices] = positions
+        cell_list.update(new_positions, moved=indices)
+        new_numbers = self.numbers.copy()
+        new_numbers[indices] = numbers
+        i1, j1, r1 = self._changed_pairs(indices)
+        _, _, y1, y2, t1, t2 = self.pair_terms(new_numbers[i1],
+                                               new_numbers[j1], r1)
+        e1 = 0.5 * (y1 + y2)
+
+        # Work on the affected atoms only.
+        affected, inverse = np.unique(
+            np.concatenate([indices, i0, j0, i1, j1]), return_inverse=True)
+        n = len(affected)
+        k = len(indices)
+        i0, j0, i1, j1 = np.split(inverse[k:], np.cumsum(
+            [len(i0), len(j0), len(i1)]))
+
+        sigma1 = (self.sigma1[affected] -
+                  np.bincount(i0, s1, n) - np.bincount(j0, s2, n) +
+                  np.bincount(i1, t1, n) + np.bincount(j1, t2, n))
+        embedding_energies, _ = self.embedding(new_numbers[affected],
+                                               sigma1)
+        energies = (self.energies[affected] +
+                    embedding_energies - self.embedding_energies[affected] +
+                    np.bincount(i0, e0, n) + np.bincount(j0, e0, n) -
+                    np.bincount(i1, e1, n) - np.bincount(j1, e1, n))
+        de = energies.sum() - self.energies[affected].sum()
+
+        if commit:
+            self.sigma1[affected] = sigma1
+            self.embedding_energies[affected] = embedding_energies
+            self.energies[affected] = energies
+            self.energy += de
+            self.positions = new_positions
+            self.numbers = new_numbers
+        else:
+            cell_list.update(self.positions, moved=indices)
+        return de
 
 
 def main():
@@ -0,0 +1,333 @@
+"""Ewald and smooth particle-mesh Ewald electrostatics."""
+
+import numpy as np
+from scipy.special import erfc, erfcinv
+
+from ase import units
+from ase.calculators.calculator import Calculator, all_changes
+from ase.neighborlist import primitive_neighbor_list
+from ase.stress import full_3x3_to_voigt_6_stress
+
+k_c = units.Hartree * units.Bohr
+
+
+class Ewald(Calculator):
+    """Coulomb interaction of point charges in a periodic cell.
+
+    The charges are taken from ``atoms.get_initial_charges()`` (in units
+    of the elementary charge).  The Coulomb sum is split into a
+    short-ranged real-space part, which is summed over all pairs of
+    atoms within the cutoff ``rc``, and a smooth long-ranged part, which
+    is summed in reciprocal space.  The splitting parameter ``alpha`` is
+    chosen such that ``erfc(alpha * rc)`` equals ``tolerance``.
+
+    With ``method='pme'`` (the default) the reciprocal part is computed
+    with the smooth particle-mesh Ewald method: the charges are spread
+    onto a grid with cardinal B-splines of the given ``order`` and the
+    sum is done with fast Fourier transforms.  The cost then grows as
+    N log N with the number of atoms N.  With ``method='ewald'`` the
+    reciprocal part is summed directly over all reciprocal lattice
+    vectors that contribute more than ``tolerance``, which is exact but
+    scales as N**2 for a fixed accuracy.
+
+    A net charge is compensated by a uniform background charge.  All
+    pairs of atoms interact, so intramolecular interactions are not
+    excluded.
+
+    The calculator can be combined with short-ranged potentials with
+    :class:`~ase.calculators.mixing.SumCalculator`, and it can be used as
+    the MM calculator of :class:`~ase.calculators.qmmm.EIQMMM`.
+    """
+
+    implemented_properties = ['energy', 'free_energy', 'forces', 'stress']
+    default_parameters = {'rc': 9.0,
+                          'tolerance': 1e-5,
+                          'alpha': None,
+                          'method': 'pme',
+                          'grid_spacing': 1.0,
+                          'grid': None,
+                          'order': 6}
+    nolabel = True
+
+    def __init__(self, **kwargs):
+        """
+        Parameters
+        ----------
+        rc: float
+            Cutoff radius of the real-space sum.  Default 9.0 Å.
+        tolerance: float
+            Relative size of the neglected terms, which sets ``alpha``
+            and the reciprocal lattice vectors included with
+            ``method='ewald'``.  Default 1e-5.
+        alpha: float
+            Ewald splitting parameter in 1/Å.  Default is
+            ``erfcinv(tolerance) / rc``.
+        method: str
+            Either 'pme' (default) or 'ewald'.
+        grid_spacing: float
+            Largest grid spacing in Å for the 'pme' method, default 1.0.
+        grid: tuple of 3 int
+            Number of grid points along the three cell vectors.  Overrides
+            ``grid_spacing``.
+        order: int
+            Order of the B-splines used to spread the charges onto the
+            grid with the 'pme' method.  Default 6.
+        """
+        Calculator.__init__(self, **kwargs)
+        if self.parameters.method not in ['pme', 'ewald']:
+            raise ValueError('Unknown method: {}'.format(
+                self.parameters.method))
+
+    @property
+    def alpha(self):
+        alpha = self.parameters.alpha
+        if alpha is None:
+            alpha = erfcinv(self.parameters.tolerance) / self.parameters.rc
+        return alpha
+
+    def get_grid(self, cell):
+        """Number of PME grid points along each of the cell vectors."""
+        if self.parameters.grid is not None:
+            return np.array(self.parameters.grid, dtype=int)
+        lengths = cell.lengths() / self.parameters.grid_spacing
+        return np.array([fft_size(max(n, self.parameters.order))
+                         for n in np.ceil(lengths).astype(int)])
+
+    def calculate(self, atoms=None, properties=['energy'],
+                  system_changes=all_changes):
+        Calculator.calculate(self, atoms, properties, system_changes)
+
+        if not self.atoms.pbc.all():
+            raise ValueError('Ewald summation needs periodic boundary '
+                             'conditions in all directions')
+        cell = self.atoms.cell
+        positions = self.atoms.positions
+        charges = self.get_virtual_charges(self.atoms)
+        stress = 'stress' in properties
+
+        energy, forces, virial = self.real_space(positions, charges)
+
+        if self.parameters.method == 'pme':
+            e, f, v = self.pme(positions, charges, stress)
+        else:
+            e, f, v = self.reciprocal_space(positions, charges, stress)
+        energy += e
+        forces += f
+        virial += v
+
+        # the self interaction of the screening charges and the
+        # background that neutralises a net charge
+        alpha = self.alpha
+        volume = cell.volume
+        energy -= k_c * alpha / np.sqrt(np.pi) * (charges**2).sum()
+        background = -k_c * np.pi * charges.sum()**2 / (2 * volume * alpha**2)
+        energy += background
+        virial -= background * np.eye(3)
+
+        self.results['energy'] = energy
+        self.results['free_energy'] = energy
+        self.results['forces'] = forces
+        if stress:
+            self.results['stress'] = full_3x3_to_voigt_6_stress(
+                virial / volume)
+
+    def real_space(self, positions, charges):
+        """Energy, forces and virial of the short-ranged part."""
+        alpha = self.alpha
+        i, j, d, D = primitive_neighbor_list('ijdD', self.atoms.pbc,
+                                             self.atoms.cell, positions,
+                                             self.parameters.rc,
+                                             bothways=False)
+        qq = k_c * charges[i] * charges[j]
+        e = qq * erfc(alpha * d) / d
+        dedd = -(e + qq * 2 * alpha / np.sqrt(np.pi) *
+                 np.exp(-(alpha * d)**2)) / d
+
+        F = (dedd / d)[:, np.newaxis] * D
+        forces = np.zeros((len(positions), 3))
+        for c in range(3):
+            forces[:, c] = (np.bincount(i, F[:, c], len(positions)) -
+                            np.bincount(j, F[:, c], len(positions)))
+        virial = F.T @ D
+        return e.sum(), forces, virial
+
+    def pme(self, positions, charges, stress=False):
+        """Energy, forces and virial of the long-ranged part.
+
+        Smooth particle-mesh Ewald, U. Essmann et al., J. Chem. Phys.
+        103, 8577 (1995)."""
+        alpha = self.alpha
+        order = self.parameters.order
+        cell = self.atoms.cell
+        volume = cell.volume
+        grid = self.get_grid(cell)
+        reciprocal = cell.reciprocal()
+
+        # scaled positions on the grid, and the B-spline weights and
+        # their derivatives along each of the three directions
+        u = (positions @ reciprocal.T % 1.0) * grid
+        base = np.floor(u).astype(int)
+        theta, dtheta = bspline(u - base, order)
+        points = (base[:, :, np.newaxis] - np.arange(order)) % grid[:, None]
+
+        # flat index into the grid for all order**3 points of each atom
+        index = ((points[:, 0, :, None, None] * grid[1] +
+                  points[:, 1, None, :, None]) * grid[2] +
+                 points[:, 2, None, None, :]).reshape((len(u), -1))
+        weights = (theta[:, 0, :, None, None] * theta[:, 1, None, :, None] *
+                   theta[:, 2, None, None, :]).reshape((len(u), -1))
+        Q = np.bincount(index.ravel(), (charges[:, None] * weights).ravel(),
+                        grid.prod()).reshape(grid)
+
+        # m-vectors of the half-grid of the real-to-complex transform
+        m = [np.fft.fftfreq(n, 1.0 / n) for n in grid[:2]]
+        m.append(np.arange(grid[2] // 2 + 1))
+        m_vectors = np.stack(np.meshgrid(*m, indexing='ij'), axis=-1)
+        m_vectors = m_vectors @ reciprocal
+        m2 = (m_vectors**2).sum(axis=-1)
+        m2[0, 0, 0] = 1.0
+        C = np.exp(-np.pi**2 * m2 / alpha**2) / m2
+        C[0, 0, 0] = 0.0
+        B = np.ones(m2.shape)
+        for c in range(3):
+            b = bspline_moduli(grid[c], order)
+            if c < 2:
+                shape = [1, 1, 1]
+                shape[c] = -1
+                B *= b.reshape(shape)
+            else:
+                B *= b[:grid[2] // 2 + 1]
+        G = k_c / (np.pi * volume) * B * C
+
+        FQ = np.fft.rfftn(Q)
+        # E(m), with the columns of the half-grid that stand for two
+        # columns of the full grid counted twice
+        Em = 0.5 * G * (FQ.real**2 + FQ.imag**2)
+        Em[:, :, 1:(grid[2] + 1) // 2] *= 2.0
+        energy = Em.sum()
+
+        # the convolution of the charges with the reciprocal-space
+        # potential, and its gradient at the atoms
+        phi = np.fft.irfftn(FQ * G, s=grid) * grid.prod()
+        phi = phi.ravel()[index]
+        dE = np.empty((len(u), 3))
+        for c in range(3):
+            t = [theta[:, 0, :, None, None], theta[:, 1, None, :, None],
+                 theta[:, 2, None, None, :]]
+            t[c] = [dtheta[:, 0, :, None, None], dtheta[:, 1, None, :, None],
+                    dtheta[:, 2, None, None, :]][c]
+            dw = (t[0] * t[1] * t[2]).reshape((len(u), -1))
+            dE[:, c] = charges * (dw * phi).sum(axis=1) * grid[c]
+        forces = -dE @ reciprocal
+
+        virial = np.zeros((3, 3))
+        if stress:
+            factor = 2.0 * (1.0 + np.pi**2 * m2 / alpha**2) / m2
+            virial = -energy * np.eye(3) + np.einsum(
+                'xyz,xyza,xyzb->ab', Em * factor, m_vectors, m_vectors)
+        return energy, forces, virial
+
+    def reciprocal_space(self, positions, charges, stress=False,
+                         chunk_size=2**20):
+        """Energy, forces and virial of the long-ranged part.
+
+        Summed directly over half of the reciprocal lattice vectors
+        within the cutoff."""
+        alpha = self.alpha
+        cell = self.atoms.cell
+        volume = cell.volume
+        reciprocal = 2 * np.pi * cell.reciprocal()
+        kcut = 2 * alpha * np.sqrt(-np.log(self.parameters.tolerance))
+
+        # integer vectors within the cutoff, one of each pair n, -n
+        nmax = np.ceil(kcut * cell.lengths() / (2 * np.pi)).astype(int)
+        n = np.indices(2 * nmax + 1).reshape((3, -1)).T - nmax
+        n = n[(n[:, 0] > 0) |
+              ((n[:, 0] == 0) & (n[:, 1] > 0)) |
+              ((n[:, 0] == 0) & (n[:, 1] == 0) & (n[:, 2] > 0))]
+        k = n @ reciprocal
+        k2 = (k**2).sum(axis=1)
+        k = k[k2 <= kcut**2]
+        k2 = k2[k2 <= kcut**2]
+        A = 4 * np.pi / k2 * np.exp(-k2 / (4 * alpha**2))
+
+        energy = 0.0
+        forces = np.zeros((len(positions), 3))
+        virial = np.zeros((3, 3))
+        step = max(1, chunk_size // max(1, len(positions)))
+        for start in range(0, len(k), step):
+            kc = k[start:start + step]
+            Ac = A[start:start + step]
+            kr = positions @ kc.T
+            cos = np.cos(kr)
+            sin = np.sin(kr)
+            S_re = charges @ cos
+            S_im = charges @ sin
+            Ek = k_c / volume * Ac * (S_re**2 + S_im**2)
+            energy += Ek.sum()
+            # Im(conj(S) exp(i k r)) for each atom and k
+            im = cos * S_im - sin * S_re
+            forces -= (2 * k_c / volume * charges[:, np.newaxis] *
+                       (im * Ac) @ kc)
+            if stress:
+                k2c = k2[start:start + step]
+                factor = 2.0 * (1.0 + k2c / (4 * alpha**2)) / k2c
+                virial += (-Ek.sum() * np.eye(3) +
+                           (Ek * factor * kc.T) @ kc)
+        return energy, forces, virial
+
+    def get_virtual_charges(self, atoms):
+        return atoms.get_initial_charges()
+
+    def add_virtual_sites(self, positions):
+        return positions  # no virtual sites
+
+    def redistribute_forces(self, forces):
+        return forces
+
+
+def fft_size(n):
+    """Smallest number not below n with no prime factors above 5."""
+    while True:
+        m = n
+        for p in [2, 3, 5]:
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
+def bspline(w, order):
+    """Cardinal B-splines M_order(w + j) and derivatives, j < order.
+
+    w is an array of fractional parts of the scaled positions.  Returns
+    two arrays with a new last axis for j."""
+    M = np.stack([w, 1.0 - w], axis=-1)  # order 2
+    for n in range(3, order + 1):
+        if n == order:
+            dM = np.zeros(w.shape + (n,))
+            dM[..., :-1] = M
+            dM[..., 1:] -= M
+        j = np.arange(n)
+        x = w[..., np.newaxis] + j
+        new = np.zeros(w.shape + (n,))
+        new[..., :-1] = x[..., :-1] * M
+        new[..., 1:] += (n - x[..., 1:]) * M
+        M = new / (n - 1)
+    if order == 2:
+        dM = np.stack([np.ones_like(w), -np.ones_like(w)], axis=-1)
+    return M, dM
+
+
+def bspline_moduli(n, order):
+    """The factors |b(m)|**2 of the smooth PME method for m < n."""
+    M = bspline(np.zeros(1), order)[0][0]
+    m = np.arange(n)
+    k = np.arange(order - 1)
+    denominator = np.abs(np.exp(2j * np.pi * np.outer(m, k) / n) @
+                         M[1:])**2
+    b = np.zeros(n)
+    ok = denominator > 1e-10
+    b[ok] = 1.0 / denominator[ok]
+    return b
@@ -1,11 +1,12 @@
 import numpy as np
+from scipy import sparse
 
-from ase.calculators.calculator import Calculator
+from ase.calculators.calculator import Calculator, all_changes
 from ase.utils import ff
 
 
 class ForceField(Calculator):
-    implemented_properties = ['energy', 'forces']
+    implemented_properties = ['energy', 'forces', 'hessian']
     nolabel = True
 
     def __init__(self, morses=None, bonds=None, angles=None, dihedrals=None,
@@ -43,110 +44,67 @@ class ForceField(Calculator):
             self.coulombs = []
         else:
             self.coulombs = coulombs
+        self.tables = None
 
-    def calculate(self, atoms, properties, system_changes):
+    def get_tables(self):
+        """Return the terms packed into arrays, one table per term type.
+
+        The tables are built on first use, so the lists of terms should
+        not be modified after the first calculation."""
+        if self.tables is None:
+            self.tables = [ff.pack_terms(terms)
+                           for terms in [self.morses, self.bonds,
+                                         self.angles, self.dihedrals,
+                                         self.vdws, self.coulombs]
+                           if len(terms) > 0]
+        return self.tables
+
+    def calculate(self, atoms, properties=['energy'],
+                  system_changes=all_changes):
         Calculator.calculate(self, atoms, properties, system_changes)
-        if system_changes:
-            for name in ['energy', 'forces', 'hessian']:
-                self.results.pop(name, None)
-        if 'energy' not in self.results:
-            energy = 0.0
-            for morse in self.morses:
-                i, j, e = ff.get_morse_potential_value(atoms, morse)
-                energy += e
-            for bond in self.bonds:
-                i, j, e = ff.get_bond_potential_value(atoms, bond)
-                energy += e
-            for angle in self.angles:
-                i, j, k, e = ff.get_angle_potential_value(atoms, angle)
-                energy += e
-            for dihedral in self.dihedrals:
-                i, j, k, l, e = ff.get_dihedral_potential_value(
-                    atoms, dihedral)
-                energy += e
-            for vdw in self.vdws:
-                i, j, e = ff.get_vdw_potential_value(atoms, vdw)
-                energy += e
-            for coulomb in self.coulombs:
-                i, j, e = ff.get_coulomb_potential_value(atoms, coulomb)
-                energy += e
-            self.results['energy'] = energy
-        if 'forces' not in self.results:
-            forces = np.zeros(3 * len(atoms))
-            for morse in self.morses:
-                i, j, g = ff.get_morse_potential_gradient(atoms, morse)
-                limits = get_limits([i, j])
-                for gb, ge, lb, le in limits:
-                    forces[gb:ge] -= g[lb:le]
-            for bond in self.bonds:
-                i, j, g = ff.get_bond_potential_gradient(atoms, bond)
-                limits = get_limits([i, j])
-                for gb, ge, lb, le in limits:
-                    forces[gb:ge] -= g[lb:le]
-            for angle in self.angles:
-                i, j, k, g = ff.get_angle_potential_gradient(atoms, angle)
-                limits = get_limits([i, j, k])
-                for gb, ge, lb, le in limits:
-                    forces[gb:ge] -= g[lb:le]
-            for dihedral in self.dihedrals:
-                i, j, k, l, g = ff.get_dihedral_potential_gradient(
-                    atoms, dihedral)
-                limits = get_limits([i, j, k, l])
-                for gb, ge, lb, le in limits:
-                    forces[gb:ge] -= g[lb:le]
-            for vdw in self.vdws:
-                i, j, g = ff.get_vdw_potential_gradient(atoms, vdw)
-                limits = get_limits([i, j])
-                for gb, ge, lb, le in limits:
-                    forces[gb:ge] -= g[lb:le]
-            for coulomb in self.coulombs:
-                i, j, g = ff.get_coulomb_potential_gradient(atoms, coulomb)
-                limits = get_limits([i, j])
-                for gb, ge, lb, le in limits:
-                    forces[gb:ge] -= g[lb:le]
-            self.results['forces'] = np.reshape(forces, (len(atoms), 3))
-        if 'hessian' not in self.results:
-            hessian = np.zeros((3 * len(atoms), 3 * len(atoms)))
-            for morse in self.morses:
-                i, j, h = ff.get_morse_potential_hessian(atoms, morse)
-                limits = get_limits([i, j])
-                for gb1, ge1, lb1, le1 in limits:
-                    for gb2, ge2, lb2, le2 in limits:
-                        hessian[gb1:ge1, gb2:ge2] += h[lb1:le1, lb2:le2]
-            for bond in self.bonds:
-                i, j, h = ff.get_bond_potential_hessian(atoms, bond)
-                limits = get_limits([i, j])
-                for gb1, ge1, lb1, le1 in limits:
-                    for gb2, ge2, lb2, le2 in limits:
-                        hessian[gb1:ge1, gb2:ge2] += h[lb1:le1, lb2:le2]
-            for angle in self.angles:
-                i, j, k, h = ff.get_angle_potential_hessian(atoms, angle)
-                limits = get_limits([i, j, k])
-                for gb1, ge1, lb1, le1 in limits:
-                    for gb2, ge2, lb2, le2 in limits:
-                        hessian[gb1:ge1, gb2:ge2] += h[lb1:le1, lb2:le2]
-            for dihedral in self.dihedrals:
-                i, j, k, l, h = ff.get_dihedral_potential_hessian(
-                    atoms, dihedral)
-                limits = get_limits([i, j, k, l])
-                for gb1, ge1, lb1, le1 in limits:
-                    for gb2, ge2, lb2, le2 in limits:
-                        hessian[gb1:ge1, gb2:ge2] += h[lb1:le1, lb2:le2]
-            for vdw in self.vdws:
-                i, j, h = ff.get_vdw_potential_hessian(atoms, vdw)
-                limits = get_limits([i, j])
-                for gb1, ge1, lb1, le1 in limits:
-                    for gb2, ge2, lb2, le2 in limits:
-                        hessian[gb1:ge1, gb2:ge2] += h[lb1:le1, lb2:le2]
-            for coulomb in self.coulombs:
-                i, j, h = ff.get_coulomb_potential_hessian(atoms, coulomb)
-                limits = get_limits([i, j])
-                for gb1, ge1, lb1, le1 in limits:
-                    for gb2, ge2, lb2, le2 in limits:
-                        hessian[gb1:ge1, gb2:ge2] += h[lb1:le1, lb2:le2]
-            self.results['hessian'] = hessian
+        natoms = len(self.atoms)
+        gradient = 'forces' in properties
+        hessian = 'hessian' in properties
+
+        energy = 0.0
+        forces = np.zeros(3 * natoms)
+        rows = []
+        columns = []
+        values = []
+        for table in self.get_tables():
+            v, g, H = ff.potential_terms[table['type']](
+                self.atoms, table, gradient=gradient, hessian=hessian)
+            energy += v.sum()
+            # indices of the coordinates of the atoms of every term
+            coordinates = (3 * table['indices'][:, :, np.newaxis] +
+                           np.arange(3)).reshape(len(v), -1)
+            if gradient:
+                forces -= np.bincount(coordinates.ravel(), g.ravel(),
+                                      minlength=3 * natoms)
+            if hessian:
+                m = coordinates.shape[1]
+                rows.append(np.repeat(coordinates, m, axis=1).ravel())
+                columns.append(np.tile(coordinates, m).ravel())
+                values.append(H.ravel())
+
+        self.results['energy'] = energy
+        if gradient:
+            self.results['forces'] = forces.reshape((natoms, 3))
+        if hessian:
+            shape = (3 * natoms, 3 * natoms)
+            if values:
+                self.results['hessian'] = sparse.coo_matrix(
+                    (np.concatenate(values),
+                     (np.concatenate(rows), np.concatenate(columns))),
+                    shape=shape).tocsr()
+            else:
+                self.results['hessian'] = sparse.csr_matrix(shape)
 
     def get_hessian(self, atoms=None):
+        """Return the hessian as a sparse matrix of shape (3N, 3N).
+
+        Use the toarray() method of the returned matrix to get a dense
+        array."""
         return self.get_property('hessian', atoms)
 
 
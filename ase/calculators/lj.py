@@ -1,6 +1,7 @@
 import numpy as np
 
-from ase.neighborlist import NeighborList
+from ase.data import chemical_symbols
+from ase.neighborlist import NeighborList, NewPrimitiveNeighborList
 from ase.calculators.calculator import Calculator, all_changes
 from ase.stress import full_3x3_to_voigt_6_stress
 
@@ -50,7 +51,7 @@ class LennardJones(Calculator):
     There is some freedom of choice in assigning atomic energies, i.e.
     choosing a way to partition the total energy into atomic contributions.
 
-    We choose a symmetric approach (`bothways=True` in the neighbor list):
+    We choose a symmetric approach:
 
     ``u_i = 1/2 sum_(j != i) u_ij``
 
@@ -113,6 +114,16 @@ class LennardJones(Calculator):
     This approach is taken from Jax-MD (https://github.com/google/jax-md), which in
     turn is inspired by HOOMD Blue (https://glotzerlab.engin.umich.edu/hoomd-blue/).
 
+    Several elements can be described by giving ``sigma`` and ``epsilon``
+    per chemical symbol.  The parameters of unlike pairs follow from a
+    mixing rule, Lorentz-Berthelot by default:
+
+    ``sigma_ij = (sigma_i + sigma_j) / 2``
+    ``epsilon_ij = sqrt(epsilon_i epsilon_j)``
+
+    Every pair of atoms is evaluated once, the pair energy is split
+    evenly between the two atoms.
+
     """
 
     implemented_properties = ['energy', 'energies', 'forces', 'free_energy']
@@ -123,6 +134,7 @@ class LennardJones(Calculator):
         'rc': None,
         'ro': None,
         'smooth': False,
+        'mixing': 'lorentz-berthelot',
     }
     nolabel = True
 
@@ -130,12 +142,18 @@ class LennardJones(Calculator):
         """
         Parameters
         ----------
-        sigma: float
-          The potential minimum is at  2**(1/6) * sigma, default 1.0
-        epsilon: float
-          The potential depth, default 1.0
+        sigma: float or dict
+          The potential minimum is at  2**(1/6) * sigma, default 1.0.
+          A dict gives sigma for each chemical symbol, e.g.
+          ``{'Ar': 3.4, 'Kr': 3.6}``.  Parameters of a specific pair can
+          be given with a tuple of two symbols as key, e.g.
+          ``('Ar', 'Kr')``, and take precedence over the mixing rule.
+        epsilon: float or dict
+          The potential depth, default 1.0.  Given per chemical symbol and
+          pair like sigma.
         rc: float, None
           Cut-off for the NeighborList is set to 3 * sigma if None.
+          For several elements the largest sigma is used.
           The energy is upshifted to be continuous at rc.
           Default None
         ro: float, None
@@ -149,19 +167,62 @@ class LennardJones(Calculator):
           forces are continuous in that case.
           If smooth=True, make sure to check the tail of the forces for kinks, ro
           might have to be adjusted to avoid distorting the potential too much.
+        mixing: str
+          Mixing rule for pairs of different elements.  Either
+          'lorentz-berthelot' (arithmetic mean of sigma, geometric mean
+          of epsilon) or 'geometric' (geometric mean of both).
 
         """
 
         Calculator.__init__(self, **kwargs)
 
         if self.parameters.rc is None:
-            self.parameters.rc = 3 * self.parameters.sigma
+            sigma = self.parameters.sigma
+            if isinstance(sigma, dict):
+                sigma = max(sigma.values())
+            self.parameters.rc = 3 * sigma
 
         if self.parameters.ro is None:
             self.parameters.ro = 0.66 * self.parameters.rc
 
         self.nl = None
 
+    def get_pair_parameters(self, numbers):
+        """Return sigma and epsilon for all pairs of elements.
+
+        Returns the index of the element of every atom and two arrays
+        with sigma and epsilon for every pair of element indices."""
+        elements, species = np.unique(numbers, return_inverse=True)
+        symbols = [chemical_symbols[Z] for Z in elements]
+        mixing = self.parameters.mixing
+        if mixing not in ['lorentz-berthelot', 'geometric']:
+            raise ValueError(f'Unknown mixing rule: {mixing}')
+
+        tables = []
+        for name in ['sigma', 'epsilon']:
+            value = self.parameters[name]
+            if not isinstance(value, dict):
+                tables.append(np.full((len(elements), len(elements)),
+                                      float(value)))
+                continue
+            missing = [symbol for symbol in symbols if symbol not in value]
+            if missing:
+                raise ValueError(f'No {name} given for {missing}')
+            single = np.array([value[symbol] for symbol in symbols],
+                              dtype=float)
+            if name == 'sigma' and mixing == 'lorentz-berthelot':
+                table = 0.5 * (single[:, np.newaxis] + single)
+            else:
+                table = np.sqrt(single[:, np.newaxis] * single)
+            for a, symbol1 in enumerate(symbols):
+                for b, symbol2 in enumerate(symbols):
+                    for pair in [(symbol1, symbol2), (symbol2, symbol1)]:
+                        if pair in value:
+                            table[a, b] = value[pair]
+            tables.append(table)
+
+        return species, tables[0], tables[1]
+
     def calculate(
         self,
         atoms=None,
@@ -175,15 +236,14 @@ class LennardJones(Calculator):
 
         natoms = len(self.atoms)
 
-        sigma = self.parameters.sigma
-        epsilon = self.parameters.epsilon
         rc = self.parameters.rc
         ro = self.parameters.ro
         smooth = self.parameters.smooth
 
         if self.nl is None or 'numbers' in system_changes:
             self.nl = NeighborList(
-                [rc / 2] * natoms, self_interaction=False, bothways=True
+                [rc / 2] * natoms, self_interaction=False, bothways=False,
+                primitive=NewPrimitiveNeighborList,
             )
 
         self.nl.update(self.atoms)
@@ -191,64 +251,76 @@ class LennardJones(Calculator):
         positions = self.atoms.positions
         cell = self.atoms.cell
 
-        # potential value at rc
-        e0 = 4 * epsilon * ((sigma / rc) ** 12 - (sigma / rc) ** 6)
-
-        energies = np.zeros(natoms)
-        forces = np.zeros((natoms, 3))
-        stresses = np.zeros((natoms, 3, 3))
-
-        for ii in range(natoms):
-            neighbors, offsets = self.nl.get_neighbors(ii)
-            cells = np.dot(offsets, cell)
-
-            # pointing *towards* neighbours
-            distance_vectors = positions[neighbors] + cells - positions[ii]
-
-            r2 = (distance_vectors ** 2).sum(1)
-            c6 = (sigma ** 2 / r2) ** 3
-            c6[r2 > rc ** 2] = 0.0
-            c12 = c6 ** 2
-
-            if smooth:
-                cutoff_fn = cutoff_function(r2, rc**2, ro**2)
-                d_cutoff_fn = d_cutoff_function(r2, rc**2, ro**2)
-
-            pairwise_energies = 4 * epsilon * (c12 - c6)
-            pairwise_forces = -24 * epsilon * (2 * c12 - c6) / r2  # du_ij
-
-            if smooth:
-                # order matters, otherwise the pairwise energy is already modified
-                pairwise_forces = (
-                    cutoff_fn * pairwise_forces + 2 * d_cutoff_fn * pairwise_energies
-                )
-                pairwise_energies *= cutoff_fn
-            else:
-                pairwise_energies -= e0 * (c6 != 0.0)
-
-            pairwise_forces = pairwise_forces[:, np.newaxis] * distance_vectors
-
-            energies[ii] += 0.5 * pairwise_energies.sum()  # atomic energies
-            forces[ii] += pairwise_forces.sum(axis=0)
-
-            stresses[ii] += 0.5 * np.dot(
-                pairwise_forces.T, distance_vectors
-            )  # equivalent to outer product
+        # every pair once, pointing from atom i *towards* atom j
+        i = self.nl.nl.pair_first
+        j = self.nl.nl.pair_second
+        distance_vectors = (positions[j] - positions[i] +
+                            self.nl.nl.offset_vec @ cell.complete())
+        r2 = (distance_vectors ** 2).sum(1)
+        mask = r2 <= rc ** 2
+        i = i[mask]
+        j = j[mask]
+        distance_vectors = distance_vectors[mask]
+        r2 = r2[mask]
+
+        species, sigma, epsilon = self.get_pair_parameters(
+            self.atoms.numbers)
+        pair_sigma = sigma[species[i], species[j]]
+        pair_epsilon = epsilon[species[i], species[j]]
+
+        c6 = (pair_sigma ** 2 / r2) ** 3
+        c12 = c6 ** 2
+        pairwise_energies = 4 * pair_epsilon * (c12 - c6)
+
+        if smooth:
+            cutoff_fn = cutoff_function(r2, rc**2, ro**2)
+        else:
+            # potential value at rc
+            e0 = 4 * epsilon * ((sigma / rc) ** 12 - (sigma / rc) ** 6)
+            pairwise_energies -= e0[species[i], species[j]]
+
+        pairwise_forces = -24 * pair_epsilon * (2 * c12 - c6) / r2  # du_ij
+
+        if smooth:
+            # order matters, otherwise the pairwise energy is already modified
+            d_cutoff_fn = d_cutoff_function(r2, rc**2, ro**2)
+            pairwise_forces = (
+                cutoff_fn * pairwise_forces + 2 * d_cutoff_fn * pairwise_energies
+            )
+            pairwise_energies *= cutoff_fn
 
-        # no lattice, no stress
-        if self.atoms.cell.rank == 3:
-            stresses = full_3x3_to_voigt_6_stress(stresses)
-            self.results['stress'] = stresses.sum(axis=0) / self.atoms.get_volume()
-            self.results['stresses'] = stresses / self.atoms.get_volume()
+        pairwise_forces = pairwise_forces[:, np.newaxis] * distance_vectors
 
+        # half of each pair energy goes to either atom
+        energies = 0.5 * (np.bincount(i, pairwise_energies, natoms) +
+                          np.bincount(j, pairwise_energies, natoms))
         energy = energies.sum()
         self.results['energy'] = energy
         self.results['energies'] = energies
-
         self.results['free_energy'] = energy
 
+        # the force on atom j is the opposite of that on atom i
+        forces = np.zeros((natoms, 3))
+        for c in range(3):
+            forces[:, c] = (np.bincount(i, pairwise_forces[:, c], natoms) -
+                            np.bincount(j, pairwise_forces[:, c], natoms))
         self.results['forces'] = forces
 
+        # no lattice, no stress
+        if self.atoms.cell.rank == 3:
+            # equivalent to outer product, half of it for each atom
+            pairwise_stresses = 0.5 * (pairwise_forces[:, :, np.newaxis] *
+                                       distance_vectors[:, np.newaxis, :])
+            pairwise_stresses = pairwise_stresses.reshape(-1, 9)
+            stresses = np.empty((natoms, 9))
+            for c in range(9):
+                stresses[:, c] = (
+                    np.bincount(i, pairwise_stresses[:, c], natoms) +
+                    np.bincount(j, pairwise_stresses[:, c], natoms))
+            stresses = full_3x3_to_voigt_6_stress(stresses.reshape(-1, 3, 3))
+            self.results['stress'] = stresses.sum(axis=0) / self.atoms.get_volume()
+            self.results['stresses'] = stresses / self.atoms.get_volume()
+
 
 def cutoff_function(r, rc, ro):
     """Smooth cutoff function.
@@ -2,8 +2,31 @@ from ase.calculators.calculator import BaseCalculator, all_changes
 from ase.calculators.calculator import PropertyNotImplementedError, CalculatorSetupError
 
 
+def get_calculator_properties(calc, properties, atoms):
+    """Get properties from calc, calculating the missing ones together.
+
+    Like calc.get_property(), the calculation is skipped if check_state()
+    finds no changes and the properties are already there.  Calculators
+    with their own get_property() (like Castep and Turbomole) are asked
+    for one property at a time."""
+    if type(calc).get_property is not BaseCalculator.get_property:
+        return [calc.get_property(name, atoms) for name in properties]
+
+    system_changes = calc.check_state(atoms)
+    if system_changes:
+        calc.atoms = None
+        calc.results = {}
+
+    missing = [name for name in properties if name not in calc.results]
+    if missing:
+        if calc.use_cache:
+            calc.atoms = atoms.copy()
+        calc.calculate(atoms, missing, system_changes)
+    return [calc.get_property(name, atoms) for name in properties]
+
+
 class Mixer:
-    def __init__(self, calcs, weights):
+    def __init__(self, calcs, weights, executor=None):
         self.check_input(calcs, weights)
         common_properties = set.intersection(*(set(calc.implemented_properties)
                                                for calc in calcs))
@@ -13,6 +36,7 @@ class Mixer:
                                               ' properties in common!')
         self.calcs = calcs
         self.weights = weights
+        self.executor = executor
 
     @staticmethod
     def check_input(calcs, weights):
@@ -27,9 +51,18 @@ class Mixer:
                              ' number of Calculators!')
 
     def get_properties(self, properties, atoms):
+        if self.executor is None:
+            values = [get_calculator_properties(calc, properties, atoms)
+                      for calc in self.calcs]
+        else:
+            futures = [self.executor.submit(get_calculator_properties,
+                                            calc, properties, atoms)
+                       for calc in self.calcs]
+            values = [future.result() for future in futures]
+
         results = {}
-        for prop in properties:
-            contributs = [calc.get_property(prop, atoms) for calc in self.calcs]
+        for i, prop in enumerate(properties):
+            contributs = [value[i] for value in values]
             results[f'{prop}_contributions'] = contributs
             results[prop] = sum(weight * value for weight, value
                                 in zip(self.weights, contributs))
@@ -39,16 +72,21 @@ class Mixer:
 class LinearCombinationCalculator(BaseCalculator):
     """LinearCombinationCalculator for weighted summation of multiple calculators.
     """
-    def __init__(self, calcs, weights):
+    def __init__(self, calcs, weights, executor=None):
         """Implementation of sum of calculators.
 
         calcs: list
             List of an arbitrary number of :mod:`ase.calculators` objects.
         weights: list of float
             Weights for each calculator in the list.
+        executor: concurrent.futures.Executor or None
+            Run the calculators at the same time with this executor,
+            which must be a thread pool.  This helps when the calculators
+            run external programs or release the GIL.  By default, the
+            calculators run one after the other.
         """
         super().__init__()
-        self.mixer = Mixer(calcs, weights)
+        self.mixer = Mixer(calcs, weights, executor)
         self.implemented_properties = self.mixer.implemented_properties
 
     def calculate(self, atoms, properties, system_changes):
@@ -79,8 +117,8 @@ class MixedCalculator(LinearCombinationCalculator):
     weight2 : float
         weight for calculator 2
     """
-    def __init__(self, calc1, calc2, weight1, weight2):
-        super().__init__([calc1, calc2], [weight1, weight2])
+    def __init__(self, calc1, calc2, weight1, weight2, executor=None):
+        super().__init__([calc1, calc2], [weight1, weight2], executor)
 
     def set_weights(self, w1, w2):
         self.mixer.weights[0] = w1
@@ -100,25 +138,29 @@ class SumCalculator(LinearCombinationCalculator):
     when it is required.
     The supported properties are the intersection of the implemented properties in each calculator.
     """
-    def __init__(self, calcs):
+    def __init__(self, calcs, executor=None):
         """Implementation of sum of calculators.
 
         calcs: list
             List of an arbitrary number of :mod:`ase.calculators` objects.
+        executor: concurrent.futures.Executor or None
+            Thread pool for running the calculators at the same time.
         """
 
         weights = [1.] * len(calcs)
-        super().__init__(calcs, weights)
+        super().__init__(calcs, weights, executor)
 
 
 class AverageCalculator(LinearCombinationCalculator):
     """AverageCalculator for equal summation of multiple calculators (for thermodynamic purposes)..
     """
-    def __init__(self, calcs):
+    def __init__(self, calcs, executor=None):
         """Implementation of average of calculators.
 
         calcs: list
             List of an arbitrary number of :mod:`ase.calculators` objects.
+        executor: concurrent.futures.Executor or None
+            Thread pool for running the calculators at the same time.
         """
         n = len(calcs)
 
@@ -126,4 +168,4 @@ class AverageCalculator(LinearCombinationCalculator):
             raise CalculatorSetupError('The value of the calcs must be a list of Calculators')
 
         weights = [1 / n] * n
-        super().__init__(calcs, weights)
+        super().__init__(calcs, weights, executor)
@@ -69,7 +69,8 @@ class MorsePotential(Calculator):
         forces = np.zeros((len(self.atoms), 3))
         preF = - 2 * epsilon * rho0 / r0
 
-        i, j, d, D = neighbor_list('ijdD', atoms, rcut2)
+        # Every pair only once: the force on j is opposite to that on i.
+        i, j, d, D = neighbor_list('ijdD', atoms, rcut2, bothways=False)
         dhat = (D / d[:, None]).T
 
         expf = np.exp(rho0 * (1.0 - d / r0))
@@ -77,12 +78,14 @@ class MorsePotential(Calculator):
 
         E = epsilon * expf * (expf - 2)
         dE = preF * expf * (expf - 1) * dhat
-        energy = 0.5 * (E * fc).sum()
+        energy = (E * fc).sum()
 
         F = (dE * fc + E * fcut_d(d, rcut1, rcut2) * dhat).T
         for dim in range(3):
-            forces[:, dim] = np.bincount(i, weights=F[:, dim],
-                                         minlength=len(atoms))
+            forces[:, dim] = (np.bincount(i, weights=F[:, dim],
+                                          minlength=len(atoms)) -
+                              np.bincount(j, weights=F[:, dim],
+                                          minlength=len(atoms)))
 
         self.results['energy'] = energy
         self.results['forces'] = forces
@@ -1,7 +1,13 @@
 import os
+import queue
 import socket
+import sys
+import threading
+import time
+from concurrent.futures import Future
 from subprocess import Popen, PIPE
 from contextlib import contextmanager
+from socket import AF_INET, AF_INET6, IPPROTO_TCP, TCP_NODELAY
 
 import numpy as np
 
@@ -21,10 +27,20 @@ class SocketClosed(OSError):
 
 
 class IPIProtocol:
-    """Communication using IPI protocol."""
+    """Communication using IPI protocol.
+
+    Each message is sent with a single call to the socket, and data
+    is received directly into buffers which are reused from one message
+    to the next.  The number of messages, the number of bytes and the
+    time spent on each type of message are counted in the timings
+    dictionary, see write_timings()."""
 
     def __init__(self, socket, txt=None):
         self.socket = socket
+        if socket.family in (AF_INET, AF_INET6):
+            # Do not let small messages wait for the acknowledgement
+            # of the previous one (Nagle's algorithm):
+            socket.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
 
         if txt is None:
             def log(*args):
@@ -35,36 +51,61 @@ class IPIProtocol:
                 txt.flush()
         self.log = log
 
+        self.timings = {}  # message: [count, bytes, seconds]
+        self._buffers = {}
+
+    def _count(self, msg, nbytes, t0):
+        counter = self.timings.setdefault(msg, [0, 0, 0.0])
+        counter[0] += 1
+        counter[1] += nbytes
+        counter[2] += time.perf_counter() - t0
+
+    def write_timings(self, out=sys.stdout):
+        """Write number of messages, bytes and time for each message."""
+        out.write('Message       count          bytes     time (s)\n')
+        for msg, (count, nbytes, seconds) in sorted(self.timings.items()):
+            out.write('{:10} {:8d} {:14d} {:12.6f}\n'
+                      .format(msg, count, nbytes, seconds))
+
+    def _buffer(self, name, nbytes):
+        """Reusable byte buffer with room for nbytes."""
+        buf = self._buffers.get(name)
+        if buf is None or len(buf) < nbytes:
+            buf = np.empty(nbytes, np.uint8)
+            self._buffers[name] = buf
+        return buf[:nbytes]
+
+    def _sendbuffer(self, msg, nbytes):
+        """Reusable buffer starting with the header for msg."""
+        buf = self._buffer('send', 12 + nbytes)
+        buf[:12] = np.frombuffer(msg.encode('ascii').ljust(12), np.uint8)
+        return buf
+
+    def _recvall_into(self, buf):
+        """Repeatedly read chunks until buf is full.
+
+        Normally we get all bytes in one read, but that is not guaranteed."""
+        view = memoryview(buf).cast('B')
+        nbytes = len(view)
+        nread = 0
+        while nread < nbytes:
+            n = self.socket.recv_into(view[nread:], nbytes - nread)
+            if n == 0:
+                # (If socket is still open, recv returns at least one byte)
+                raise SocketClosed()
+            nread += n
+        return nbytes
+
     def sendmsg(self, msg):
         self.log('  sendmsg', repr(msg))
         # assert msg in self.statements, msg
         msg = msg.encode('ascii').ljust(12)
         self.socket.sendall(msg)
 
-    def _recvall(self, nbytes):
-        """Repeatedly read chunks until we have nbytes.
-
-        Normally we get all bytes in one read, but that is not guaranteed."""
-        remaining = nbytes
-        chunks = []
-        while remaining > 0:
-            chunk = self.socket.recv(remaining)
-            if len(chunk) == 0:
-                # (If socket is still open, recv returns at least one byte)
-                raise SocketClosed()
-            chunks.append(chunk)
-            remaining -= len(chunk)
-        msg = b''.join(chunks)
-        assert len(msg) == nbytes and remaining == 0
-        return msg
-
     def recvmsg(self):
-        msg = self._recvall(12)
-        if not msg:
-            raise SocketClosed()
-
-        assert len(msg) == 12, msg
-        msg = msg.rstrip().decode('ascii')
+        buf = self._buffer('msg', 12)
+        self._recvall_into(buf)
+        msg = buf.tobytes().rstrip().decode('ascii')
         # assert msg in self.responses, msg
         self.log('  recvmsg', repr(msg))
         return msg
@@ -77,12 +118,8 @@ class IPIProtocol:
 
     def recv(self, shape, dtype):
         a = np.empty(shape, dtype)
-        nbytes = np.dtype(dtype).itemsize * np.prod(shape)
-        buf = self._recvall(nbytes)
-        assert len(buf) == nbytes, (len(buf), nbytes)
-        self.log('  recv {} bytes of {}'.format(len(buf), dtype))
-        # print(np.frombuffer(buf, dtype=dtype))
-        a.flat[:] = np.frombuffer(buf, dtype=dtype)
+        nbytes = self._recvall_into(a)
+        self.log('  recv {} bytes of {}'.format(nbytes, dtype))
         # self.log('  recv {}'.format(a.ravel().tolist()))
         assert np.isfinite(a).all()
         return a
@@ -93,39 +130,60 @@ class IPIProtocol:
         assert positions.size % 3 == 0
 
         self.log(' sendposdata')
-        self.sendmsg('POSDATA')
-        self.send(cell.T / units.Bohr, np.float64)
-        self.send(icell.T * units.Bohr, np.float64)
-        self.send(len(positions), np.int32)
-        self.send(positions / units.Bohr, np.float64)
+        t0 = time.perf_counter()
+        natoms = len(positions)
+        buf = self._sendbuffer('POSDATA', 148 + 24 * natoms)
+        buf[12:84].view(np.float64)[:] = np.ravel(cell, 'F') / units.Bohr
+        buf[84:156].view(np.float64)[:] = np.ravel(icell, 'F') * units.Bohr
+        buf[156:160].view(np.int32)[:] = natoms
+        np.divide(positions, units.Bohr,
+                  out=buf[160:].view(np.float64).reshape(natoms, 3))
+        self.socket.sendall(buf)
+        self._count('POSDATA', len(buf), t0)
 
     def recvposdata(self):
-        cell = self.recv((3, 3), np.float64).T.copy()
-        icell = self.recv((3, 3), np.float64).T.copy()
-        natoms = self.recv(1, np.int32)
-        natoms = int(natoms)
-        positions = self.recv((natoms, 3), np.float64)
-        return cell * units.Bohr, icell / units.Bohr, positions * units.Bohr
+        t0 = time.perf_counter()
+        head = self._buffer('head', 148)
+        self._recvall_into(head)
+        cell = head[:72].view(np.float64).reshape(3, 3).T * units.Bohr
+        icell = head[72:144].view(np.float64).reshape(3, 3).T / units.Bohr
+        natoms = int(head[144:].view(np.int32)[0])
+        positions = self._buffer('positions', 24 * natoms)
+        self._recvall_into(positions)
+        positions = positions.view(np.float64).reshape(natoms, 3)
+        assert np.isfinite(head[:144].view(np.float64)).all()
+        assert np.isfinite(positions).all()
+        self._count('POSDATA', 160 + 24 * natoms, t0)
+        return cell, icell, positions * units.Bohr
 
     def sendrecv_force(self):
         self.log(' sendrecv_force')
+        t0 = time.perf_counter()
         self.sendmsg('GETFORCE')
         msg = self.recvmsg()
         assert msg == 'FORCEREADY', msg
-        e = self.recv(1, np.float64)[0]
-        natoms = self.recv(1, np.int32)
+        head = self._buffer('head', 12)
+        self._recvall_into(head)
+        e = head[:8].view(np.float64)[0]
+        natoms = int(head[8:].view(np.int32)[0])
         assert natoms >= 0
-        forces = self.recv((int(natoms), 3), np.float64)
-        virial = self.recv((3, 3), np.float64).T.copy()
-        nmorebytes = self.recv(1, np.int32)
-        nmorebytes = int(nmorebytes)
+        # Forces, virial and the number of extra bytes:
+        nforces = 24 * natoms
+        data = self._buffer('forces', nforces + 76)
+        self._recvall_into(data)
+        forces = data[:nforces].view(np.float64).reshape(natoms, 3)
+        virial = data[nforces:nforces + 72].view(np.float64).reshape(3, 3)
+        nmorebytes = int(data[nforces + 72:].view(np.int32)[0])
+        assert np.isfinite(e)
+        assert np.isfinite(data[:nforces + 72].view(np.float64)).all()
         if nmorebytes > 0:
             # Receiving 0 bytes will block forever on python2.
             morebytes = self.recv(nmorebytes, np.byte)
         else:
             morebytes = b''
+        self._count('GETFORCE', 12 + 24 + len(data) + nmorebytes, t0)
         return (e * units.Ha, (units.Ha / units.Bohr) * forces,
-                units.Ha * virial, morebytes)
+                units.Ha * virial.T, morebytes)
 
     def sendforce(self, energy, forces, virial,
                   morebytes=np.zeros(1, dtype=np.byte)):
@@ -134,22 +192,31 @@ class IPIProtocol:
         assert virial.shape == (3, 3)
 
         self.log(' sendforce')
-        self.sendmsg('FORCEREADY')  # mind the units
-        self.send(np.array([energy / units.Ha]), np.float64)
+        t0 = time.perf_counter()
         natoms = len(forces)
-        self.send(np.array([natoms]), np.int32)
-        self.send(units.Bohr / units.Ha * forces, np.float64)
-        self.send(1.0 / units.Ha * virial.T, np.float64)
+        nforces = 24 * natoms
         # We prefer to always send at least one byte due to trouble with
         # empty messages.  Reading a closed socket yields 0 bytes
         # and thus can be confused with a 0-length bytestring.
-        self.send(np.array([len(morebytes)]), np.int32)
-        self.send(morebytes, np.byte)
+        morebytes = np.asarray(morebytes, np.byte).ravel()
+        buf = self._sendbuffer('FORCEREADY', 88 + nforces + len(morebytes))
+        buf[12:20].view(np.float64)[:] = energy / units.Ha  # mind the units
+        buf[20:24].view(np.int32)[:] = natoms
+        np.multiply(forces, units.Bohr / units.Ha,
+                    out=buf[24:24 + nforces].view(np.float64).reshape(-1, 3))
+        i = 24 + nforces
+        buf[i:i + 72].view(np.float64)[:] = np.ravel(virial, 'F') / units.Ha
+        buf[i + 72:i + 76].view(np.int32)[:] = len(morebytes)
+        buf[i + 76:] = morebytes.view(np.uint8)
+        self.socket.sendall(buf)
+        self._count('FORCEREADY', len(buf), t0)
 
     def status(self):
         self.log(' status')
+        t0 = time.perf_counter()
         self.sendmsg('STATUS')
         msg = self.recvmsg()
+        self._count('STATUS', 24, t0)
         return msg
 
     def end(self):
@@ -192,7 +259,7 @@ class IPIProtocol:
         r = dict(energy=e,
                  forces=forces,
                  virial=virial)
-        if morebytes:
+        if len(morebytes):
             r['morebytes'] = morebytes
         return r
 
@@ -387,6 +454,252 @@ class SocketServer(IOContext):
         return self.protocol.calculate(atoms.positions, atoms.cell)
 
 
+class SocketServerPool(IOContext):
+    default_port = 31415
+
+    def __init__(self, port=None, unixsocket=None, timeout=None, log=None):
+        """Socket server that keeps several clients busy at once.
+
+        Any number of i-PI clients may connect to the server, at any
+        time.  Configurations passed to :meth:`submit` are queued and
+        sent to the next idle client, and the results are returned as
+        :class:`concurrent.futures.Future` objects.  Each client only
+        needs to be started once, so the start-up cost of external codes
+        is paid once per client rather than once per configuration.
+        This is useful for independent calculations such as the images
+        of a band or displaced structures for phonons.
+
+        Parameters:
+
+        port: integer or None
+            Port on which to listen for INET connections.  Defaults
+            to 31415 if neither this nor unixsocket is specified.
+        unixsocket: string or None
+            Filename for unix socket.
+        timeout: float or None
+            Timeout in seconds for the communication with each client,
+            unlimited by default.
+        log: file object or None
+            useful debug messages are written to this.
+
+        Example::
+
+            with SocketServerPool(unixsocket='pool') as pool:
+                pool.launch_clients(PySocketIOClient(EMT), atoms, 4)
+                results = pool.map(images)
+
+        The results are dictionaries with energy, forces and virial as
+        returned by :meth:`SocketServer.calculate`."""
+
+        if unixsocket is None and port is None:
+            port = self.default_port
+        elif unixsocket is not None and port is not None:
+            raise ValueError('Specify only one of unixsocket and port')
+
+        self.port = port
+        self.unixsocket = unixsocket
+        self.timeout = timeout
+        self.log = log
+
+        if unixsocket is not None:
+            actualsocket = actualunixsocketname(unixsocket)
+            conn_name = 'UNIX-socket {}'.format(actualsocket)
+            socket_context = bind_unixsocket(actualsocket)
+        else:
+            conn_name = 'INET port {}'.format(port)
+            socket_context = bind_inetsocket(port)
+
+        self.serversocket = self.closelater(socket_context)
+        if log:
+            print('Accepting clients on {}'.format(conn_name), file=log)
+        # Short timeout so that the accepting thread notices when the
+        # pool is closed:
+        self.serversocket.settimeout(0.1)
+        self.serversocket.listen()
+
+        self.procs = []
+        self.clients = []
+        self.ncalculations = []  # calculations done by each client
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._acceptor = threading.Thread(target=self._accept_clients,
+                                          daemon=True)
+        self._acceptor.start()
+
+    @property
+    def nclients(self):
+        """Number of connected clients."""
+        with self._lock:
+            return sum(client is not None for client in self.clients)
+
+    def launch_clients(self, launch_client, atoms, n, properties=None):
+        """Start n client processes.
+
+        launch_client is called like the launch_client argument of
+        :class:`SocketIOCalculator`, for example
+        ``PySocketIOClient(calculator_factory)``."""
+        for _ in range(n):
+            proc = launch_client(atoms, properties, port=self.port,
+                                 unixsocket=self.unixsocket)
+            with self._lock:
+                self.procs.append(proc)
+
+    def wait_for_clients(self, n, timeout=None):
+        """Block until at least n clients are connected."""
+        t0 = time.time()
+        while self.nclients < n:
+            if timeout is not None and time.time() - t0 > timeout:
+                raise TimeoutError('Only {} of {} clients connected'
+                                   .format(self.nclients, n))
+            error = self._check_procs()
+            if error is not None:
+                raise error
+            time.sleep(0.01)
+
+    def submit(self, atoms):
+        """Queue a calculation and return a Future for its results."""
+        if self._closed.is_set():
+            raise RuntimeError('Cannot submit to a closed pool')
+        future = Future()
+        self._jobs.put((future, atoms.positions.copy(),
+                        np.array(atoms.cell)))
+        return future
+
+    def map(self, images):
+        """Calculate all images and return their results in order."""
+        futures = [self.submit(atoms) for atoms in images]
+        return [future.result() for future in futures]
+
+    def calculate(self, atoms):
+        """Send geometry to the next idle client and wait for results."""
+        return self.submit(atoms).result()
+
+    def _accept_clients(self):
+        while not self._closed.is_set():
+            try:
+                clientsocket, address = self.serversocket.accept()
+            except socket.timeout:
+                self._check_procs()
+                continue
+            except OSError:
+                break  # server socket closed
+            clientsocket.settimeout(self.timeout)
+            with self._lock:
+                index = len(self.clients)
+                self.clients.append(clientsocket)
+                self.ncalculations.append(0)
+            if self.log:
+                source = ('client' if address == b'' else address)
+                print('Accepted connection {} from {}'.format(index, source),
+                      file=self.log)
+            protocol = IPIProtocol(clientsocket, txt=self.log)
+            worker = threading.Thread(target=self._serve,
+                                      args=(index, protocol), daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _check_procs(self):
+        """Fail queued calculations if all launched clients have died.
+
+        Returns the error, or None if there are clients left."""
+        with self._lock:
+            if not self.procs or any(client is not None
+                                     for client in self.clients):
+                return None
+            status = [proc.poll() for proc in self.procs]
+        if any(code is None for code in status):
+            return None
+        error = OSError('Subprocess terminated unexpectedly'
+                        ' with status {}'.format(status[0]))
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[0].set_exception(error)
+        return error
+
+    def _serve(self, index, protocol):
+        """Send queued configurations to one client until closed."""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                # Tell the client to exit:
+                try:
+                    protocol.end()
+                except OSError:
+                    pass
+                break
+            future, positions, cell = job
+            # (jobs taken over from a lost client are running already)
+            if not (future.running() or
+                    future.set_running_or_notify_cancel()):
+                continue
+            try:
+                results = protocol.calculate(positions, cell)
+            except (SocketClosed, ConnectionError) as err:
+                # The client went away.  Give the configuration to
+                # another client and stop serving this one.
+                self._drop_client(index, protocol, err)
+                self._jobs.put((future, positions, cell))
+                break
+            except BaseException as err:
+                # We do not know where the conversation with the client
+                # stopped, so it cannot be used again:
+                self._drop_client(index, protocol, err)
+                future.set_exception(err)
+                break
+            else:
+                with self._lock:
+                    self.ncalculations[index] += 1
+                future.set_result(results)
+
+    def _drop_client(self, index, protocol, err):
+        if self.log:
+            print('Lost client {}: {}'.format(index, err), file=self.log)
+        with self._lock:
+            self.clients[index] = None
+        protocol.socket.close()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._acceptor.join()
+
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.join()
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            # Jobs taken over from a lost client are running already and
+            # cannot be cancelled:
+            if job is not None and not job[0].cancel():
+                job[0].set_exception(RuntimeError('Socket server pool '
+                                                  'closed'))
+
+        for clientsocket in self.clients:
+            if clientsocket is not None:
+                clientsocket.close()
+        super().close()
+        if self.log:
+            print('Close socket server pool', file=self.log)
+
+        for proc in self.procs:
+            exitcode = proc.wait()
+            if exitcode != 0:
+                import warnings
+                warnings.warn('Subprocess exited with status {}'
+                              .format(exitcode))
+
+
 class SocketClient:
     def __init__(self, host='localhost', port=None,
                  unixsocket=None, timeout=None, log=None, comm=None):
@@ -1,3 +1,5 @@
+import copy
+import os
 from math import pi
 
 import numpy as np
@@ -183,48 +185,166 @@ def numeric_force(atoms, a, i, d=0.001):
     return (eminus - eplus) / (2 * d)
 
 
-def numeric_forces(atoms, d=0.001):
-    return np.array([[numeric_force(atoms, a, i, d)
-                      for i in range(3)] for a in range(len(atoms))])
+def numeric_forces(atoms, d=0.001, stencil=2, executor=None, error=False):
+    """Compute numeric forces on all atoms with finite step of size d.
+
+    stencil: int
+        Number of points (2 or 4) in the central difference for each
+        Cartesian component.
+    executor: concurrent.futures.Executor or None
+        Evaluate the displaced configurations in parallel with
+        copies of the calculator, for example with a
+        ProcessPoolExecutor.  By default, they are evaluated one after
+        the other by the calculator of the atoms.  A calculator with a
+        get_potential_energy_batch(images) method gets all displaced
+        configurations in one call.
+    error: bool
+        Also return an estimate of the error of each component.  This
+        is the difference between the 4-point and the 2-point result
+        and requires stencil=4.
+    """
+    steps = _stencil_steps(stencil, error)
+    displacements = [(a, i, step * d)
+                     for a in range(len(atoms))
+                     for i in range(3)
+                     for step in steps]
+    energies = _displaced_energies(atoms, 'positions', displacements,
+                                   executor, force_consistent=False)
+    energies = energies.reshape((len(atoms), 3, len(steps)))
+    derivative, err = _central_difference(energies, d)
+    if error:
+        return -derivative, err
+    return -derivative
+
+
+def numeric_stress(atoms, d=1e-6, voigt=True, stencil=2, executor=None,
+                   error=False):
+    """Compute numeric stress with strains of size d.
+
+    See numeric_forces() for the stencil, executor and error
+    arguments."""
+    steps = _stencil_steps(stencil, error)
+    strains = []
+    for i in range(3):
+        j = i - 2
+        for step in steps:
+            x = np.eye(3)
+            x[i, i] += step * d
+            strains.append(x)
+        for step in steps:
+            x = np.eye(3)
+            x[i, j] = x[j, i] = step * d
+            strains.append(x)
+    energies = _displaced_energies(atoms, 'cell', strains, executor,
+                                   force_consistent=True)
+    energies = energies.reshape((3, 2, len(steps)))
+    derivative, err = _central_difference(energies, d)
 
+    V = atoms.get_volume()
+    stress = _strain_derivative_to_stress(derivative, V, voigt)
+    if error:
+        return stress, _strain_derivative_to_stress(err, V, voigt)
+    return stress
 
-def numeric_stress(atoms, d=1e-6, voigt=True):
-    stress = np.zeros((3, 3), dtype=float)
 
-    cell = atoms.cell.copy()
-    V = atoms.get_volume()
+def _strain_derivative_to_stress(derivative, V, voigt):
+    stress = np.zeros((3, 3))
     for i in range(3):
-        x = np.eye(3)
-        x[i, i] += d
-        atoms.set_cell(np.dot(cell, x), scale_atoms=True)
-        eplus = atoms.get_potential_energy(force_consistent=True)
-
-        x[i, i] -= 2 * d
-        atoms.set_cell(np.dot(cell, x), scale_atoms=True)
-        eminus = atoms.get_potential_energy(force_consistent=True)
+        j = i - 2
+        stress[i, i] = derivative[i, 0] / V
+        # Both stress[i, j] and stress[j, i] contribute to the energy:
+        stress[i, j] = stress[j, i] = derivative[i, 1] / (2 * V)
+    if voigt:
+        return stress.flat[[0, 4, 8, 5, 2, 1]]
+    return stress
 
-        stress[i, i] = (eplus - eminus) / (2 * d * V)
-        x[i, i] += d
 
-        j = i - 2
-        x[i, j] = d
-        x[j, i] = d
-        atoms.set_cell(np.dot(cell, x), scale_atoms=True)
-        eplus = atoms.get_potential_energy(force_consistent=True)
+def _stencil_steps(stencil, error):
+    if stencil == 2:
+        if error:
+            raise ValueError('Error estimates require stencil=4')
+        return [-1, 1]
+    if stencil == 4:
+        return [-2, -1, 1, 2]
+    raise ValueError('stencil must be 2 or 4, not {}'.format(stencil))
 
-        x[i, j] = -d
-        x[j, i] = -d
-        atoms.set_cell(np.dot(cell, x), scale_atoms=True)
-        eminus = atoms.get_potential_energy(force_consistent=True)
 
-        stress[i, j] = (eplus - eminus) / (4 * d * V)
-        stress[j, i] = stress[i, j]
-    atoms.set_cell(cell, scale_atoms=True)
+def _central_difference(energies, d):
+    """Derivative and error estimate from energies at the stencil points.
 
-    if voigt:
-        return stress.flat[[0, 4, 8, 5, 2, 1]]
+    The last axis of energies holds the points -d, d or -2d, -d, d, 2d.
+    """
+    if energies.shape[-1] == 2:
+        return (energies[..., 1] - energies[..., 0]) / (2 * d), None
+    em2, em1, ep1, ep2 = np.moveaxis(energies, -1, 0)
+    derivative = (em2 - 8 * em1 + 8 * ep1 - ep2) / (12 * d)
+    error = abs(derivative - (ep1 - em1) / (2 * d))
+    return derivative, error
+
+
+def _displaced_energies(atoms, kind, displacements, executor,
+                        force_consistent):
+    """Energies of atoms with each of the displacements applied.
+
+    kind is 'positions' for displacements (a, i, dx) of single atoms or
+    'cell' for strain matrices."""
+    calc = atoms.calc
+    if hasattr(calc, 'get_potential_energy_batch'):
+        images = []
+        for displacement in displacements:
+            image = atoms.copy()
+            _displace(image, kind, displacement,
+                      image.get_positions(), image.cell.copy())
+            images.append(image)
+        return np.array(calc.get_potential_energy_batch(
+            images, force_consistent=force_consistent), float)
+
+    if executor is None:
+        return np.array(_energies(atoms, None, kind, displacements,
+                                  force_consistent))
+
+    nchunks = min(len(displacements), 4 * (os.cpu_count() or 1))
+    chunks = [list(chunk) for chunk in
+              np.array_split(np.arange(len(displacements)), nchunks)]
+    futures = [executor.submit(_energies, atoms.copy(), copy.deepcopy(calc),
+                               kind, [displacements[n] for n in chunk],
+                               force_consistent)
+               for chunk in chunks]
+    return np.concatenate([future.result() for future in futures])
+
+
+def _energies(atoms, calc, kind, displacements, force_consistent):
+    """Evaluate energies one displacement at a time.
+
+    If calc is None, the calculator of atoms is used, and atoms are
+    restored afterwards."""
+    if calc is not None:
+        atoms.calc = calc
+    positions = atoms.get_positions()
+    cell = atoms.cell.copy()
+    energies = []
+    try:
+        for displacement in displacements:
+            _displace(atoms, kind, displacement, positions, cell)
+            energies.append(atoms.get_potential_energy(
+                force_consistent=force_consistent))
+    finally:
+        if kind == 'positions':
+            atoms.set_positions(positions, apply_constraint=False)
+        else:
+            atoms.set_cell(cell, scale_atoms=True)
+    return energies
+
+
+def _displace(atoms, kind, displacement, positions, cell):
+    """Apply displacement to reference positions or cell."""
+    if kind == 'positions':
+        a, i, dx = displacement
+        p = positions.copy()
+        p[a, i] += dx
+        atoms.set_positions(p, apply_constraint=False)
     else:
-        return stress
+        atoms.set_cell(np.dot(cell, displacement), scale_atoms=True)
 
 
 def gradient_test(atoms, indices=None):
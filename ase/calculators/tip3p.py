@@ -4,6 +4,7 @@ import numpy as np
 
 import ase.units as units
 from ase.calculators.calculator import Calculator, all_changes
+from ase.neighborlist import primitive_neighbor_list
 
 qH = 0.417
 sigma0 = 3.15061
@@ -55,49 +56,8 @@ class TIP3P(Calculator):
         charges = np.array([qH, qH, qH])
         charges[o] *= -2
 
-        energy = 0.0
-        forces = np.zeros((3 * nh2o, 3))
-
-        for m in range(nh2o - 1):
-            DOO = R[m + 1:, o] - R[m, o]
-            shift = np.zeros_like(DOO)
-            for i, periodic in enumerate(pbc):
-                if periodic:
-                    L = cell[i]
-                    shift[:, i] = (DOO[:, i] + L / 2) % L - L / 2 - DOO[:, i]
-            DOO += shift
-            d2 = (DOO**2).sum(1)
-            d = d2**0.5
-            x1 = d > self.rc - self.width
-            x2 = d < self.rc
-            x12 = np.logical_and(x1, x2)
-            y = (d[x12] - self.rc + self.width) / self.width
-            t = np.zeros(len(d))  # cutoff function
-            t[x2] = 1.0
-            t[x12] -= y**2 * (3.0 - 2.0 * y)
-            dtdd = np.zeros(len(d))
-            dtdd[x12] -= 6.0 / self.width * y * (1.0 - y)
-            c6 = (sigma0**2 / d2)**3
-            c12 = c6**2
-            e = 4 * epsilon0 * (c12 - c6)
-            energy += np.dot(t, e)
-            F = (24 * epsilon0 * (2 * c12 - c6) / d2 * t -
-                 e * dtdd / d)[:, np.newaxis] * DOO
-            forces[m * 3 + o] -= F.sum(0)
-            forces[m * 3 + 3 + o::3] += F
-
-            for j in range(3):
-                D = R[m + 1:] - R[m, j] + shift[:, np.newaxis]
-                r2 = (D**2).sum(axis=2)
-                r = r2**0.5
-                e = charges[j] * charges / r * units.Hartree * units.Bohr
-                energy += np.dot(t, e).sum()
-                F = (e / r2 * t[:, np.newaxis])[:, :, np.newaxis] * D
-                FOO = -(e.sum(1) * dtdd / d)[:, np.newaxis] * DOO
-                forces[(m + 1) * 3 + o::3] += FOO
-                forces[m * 3 + o] -= FOO.sum(0)
-                forces[(m + 1) * 3:] += F.reshape((-1, 3))
-                forces[m * 3 + j] -= F.sum(axis=0).sum(axis=0)
+        energy, forces = self.energy_and_forces(
+            self.atoms.positions, np.tile(charges, nh2o), sigma0, epsilon0, o)
 
         if self.pcpot:
             e, f = self.pcpot.calculate(np.tile(charges, nh2o),
@@ -108,6 +68,76 @@ class TIP3P(Calculator):
         self.results['energy'] = energy
         self.results['forces'] = forces
 
+    def get_molecule_pairs(self, positions):
+        """Find all pairs of molecules closer than the cutoff.
+
+        positions: positions of the sites that the cutoff refers to, one
+        per molecule.  Returns indices m < n of the two molecules and the
+        vector to add to the positions of molecule n.  A cell list is used
+        so that the cost grows linearly with the number of molecules."""
+        cell = self.atoms.cell
+        m, n, S = primitive_neighbor_list('ijS', self.atoms.pbc,
+                                          cell.complete(), positions,
+                                          self.rc, bothways=False)
+        return m, n, S @ cell
+
+    def energy_and_forces(self, positions, charges, sigma, epsilon, o=0):
+        """Energy and forces from all pairs of molecules.
+
+        positions and charges are those of all sites, the sites of a
+        molecule are consecutive.  The Lennard-Jones interaction acts
+        between sites number o of two molecules, and the cutoff
+        function for both the Lennard-Jones and the Coulomb interaction
+        depends on their distance."""
+        nsites = self.sites_per_mol
+        R = positions.reshape((-1, nsites, 3))
+        q = charges.reshape((-1, nsites))
+        m, n, shift = self.get_molecule_pairs(R[:, o])
+
+        DOO = R[n, o] + shift - R[m, o]
+        d2 = (DOO**2).sum(1)
+        d = d2**0.5
+        x12 = d > self.rc - self.width
+        y = (d[x12] - self.rc + self.width) / self.width
+        t = np.ones(len(d))  # cutoff function
+        t[x12] -= y**2 * (3.0 - 2.0 * y)
+        dtdd = np.zeros(len(d))
+        dtdd[x12] -= 6.0 / self.width * y * (1.0 - y)
+
+        # Lennard-Jones part
+        c6 = (sigma**2 / d2)**3
+        c12 = c6**2
+        e = 4 * epsilon * (c12 - c6)
+        energy = np.dot(t, e)
+        FOO = (24 * epsilon * (2 * c12 - c6) / d2 * t -
+               e * dtdd / d)[:, np.newaxis] * DOO
+
+        # Coulomb part between all sites of the two molecules
+        D = (R[n, np.newaxis, :] + shift[:, np.newaxis, np.newaxis] -
+             R[m, :, np.newaxis])
+        r2 = (D**2).sum(axis=3)
+        r = r2**0.5
+        e = (q[m, :, np.newaxis] * q[n, np.newaxis, :] / r *
+             units.Hartree * units.Bohr)
+        energy += np.dot(t, e.sum(axis=(1, 2)))
+        F = (e / r2 * t[:, np.newaxis, np.newaxis])[..., np.newaxis] * D
+        FOO -= (e.sum(axis=(1, 2)) * dtdd / d)[:, np.newaxis] * DOO
+
+        # F[p, j, k] acts on site k of molecule n and the opposite force
+        # on site j of molecule m
+        F_m = -F.sum(axis=2)
+        F_n = F.sum(axis=1)
+        F_m[:, o] -= FOO
+        F_n[:, o] += FOO
+        index_m = (m[:, np.newaxis] * nsites + np.arange(nsites)).ravel()
+        index_n = (n[:, np.newaxis] * nsites + np.arange(nsites)).ravel()
+        index = np.concatenate([index_m, index_n])
+        F = np.concatenate([F_m.reshape(-1, 3), F_n.reshape(-1, 3)])
+        forces = np.zeros((len(positions), 3))
+        for c in range(3):
+            forces[:, c] = np.bincount(index, F[:, c], len(positions))
+        return energy, forces
+
     def embed(self, charges):
         """Embed atoms in point-charges."""
         self.pcpot = PointChargePotential(charges)
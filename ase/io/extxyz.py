@@ -10,9 +10,11 @@ Contributed by James Kermode <james.kermode@gmail.com>
 
 
 from itertools import islice
+import os
+from typing import Dict, Tuple
 import re
 import warnings
-from io import StringIO, UnsupportedOperation
+from io import BytesIO, TextIOWrapper, UnsupportedOperation
 import json
 
 import numpy as np
@@ -22,10 +24,11 @@ from ase.atoms import Atoms
 from ase.calculators.calculator import all_properties, Calculator
 from ase.calculators.singlepoint import SinglePointCalculator
 from ase.spacegroup.spacegroup import Spacegroup
+from ase.data import atomic_numbers
 from ase.parallel import paropen
 from ase.constraints import FixAtoms, FixCartesian
 from ase.io.formats import index2range
-from ase.utils import reader
+from ase.utils import reader, tokenize_version
 
 __all__ = ['read_xyz', 'write_xyz', 'iread_xyz']
 
@@ -52,6 +55,10 @@ SPECIAL_3_3_KEYS = ['Lattice', 'virial', 'stress']
 per_atom_properties = ['forces', 'stresses', 'charges', 'magmoms', 'energies']
 per_config_properties = ['energy', 'stress', 'dipole', 'magmom', 'free_energy']
 
+# np.loadtxt() is implemented in C from numpy 1.23:
+FAST_LOADTXT = (tokenize_version(np.__version__) >=
+                tokenize_version('1.23'))
+
 
 def key_val_str_to_dict(string, sep=None):
     """
@@ -369,6 +376,42 @@ def parse_properties(prop_str):
     return properties, properties_list, dtype, converters
 
 
+def _read_atom_lines(lines, natoms, dtype, convs):
+    """Parse natoms lines into structured array."""
+    lines = list(islice(lines, natoms))
+    if len(lines) < natoms:
+        raise XYZError('ase.io.extxyz: Frame has {} atoms, expected {}'
+                       .format(len(lines), natoms))
+
+    if FAST_LOADTXT and natoms >= 8:
+        # Parse all lines in one go.  Anything unusual (missing columns,
+        # numbers that need Python's int() or float()) falls back to the
+        # loop below, which is also faster for very few atoms.
+        converters = {i: conv for i, conv in enumerate(convs)
+                      if dtype[i] == bool}
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                return np.loadtxt(lines, dtype, comments=None,
+                                  usecols=range(len(convs)),
+                                  converters=converters, ndmin=1,
+                                  encoding=None)
+        except (ValueError, TypeError, Warning):
+            pass
+
+    data = []
+    for line in lines:
+        vals = line.split()
+        row = tuple([conv(val) for conv, val in zip(convs, vals)])
+        data.append(row)
+
+    try:
+        return np.array(data, dtype)
+    except TypeError:
+        raise XYZError('Badly formatted data '
+                       'or end of file reached before end of frame')
+
+
 def _read_xyz_frame(lines, natoms, properties_parser=key_val_str_to_dict,
                     nvec=0):
     # comment line
@@ -405,22 +448,7 @@ def _read_xyz_frame(lines, natoms, properties_parser=key_val_str_to_dict,
     properties, names, dtype, convs = parse_properties(info['Properties'])
     del info['Properties']
 
-    data = []
-    for ln in range(natoms):
-        try:
-            line = next(lines)
-        except StopIteration:
-            raise XYZError('ase.io.extxyz: Frame has {} atoms, expected {}'
-                           .format(len(data), natoms))
-        vals = line.split()
-        row = tuple([conv(val) for conv, val in zip(convs, vals)])
-        data.append(row)
-
-    try:
-        data = np.array(data, dtype)
-    except TypeError:
-        raise XYZError('Badly formatted data '
-                       'or end of file reached before end of frame')
+    data = _read_atom_lines(lines, natoms, dtype, convs)
 
     # Read VEC entries if present
     if nvec > 0:
@@ -460,15 +488,18 @@ def _read_xyz_frame(lines, natoms, properties_parser=key_val_str_to_dict,
                                for c in range(cols)]).T
         arrays[ase_name] = value
 
-    symbols = None
-    if 'symbols' in arrays:
-        symbols = [s.capitalize() for s in arrays['symbols']]
-        del arrays['symbols']
-
     numbers = None
     duplicate_numbers = None
+    if 'symbols' in arrays:
+        # Look up each species only once:
+        species = arrays.pop('symbols')
+        table = {s: atomic_numbers[s.capitalize()]
+                 for s in dict.fromkeys(species)}
+        numbers = np.fromiter(map(table.__getitem__, species), int,
+                              len(species))
+
     if 'numbers' in arrays:
-        if symbols is None:
+        if numbers is None:
             numbers = arrays['numbers']
         else:
             duplicate_numbers = arrays['numbers']
@@ -484,8 +515,7 @@ def _read_xyz_frame(lines, natoms, properties_parser=key_val_str_to_dict,
         positions = arrays['positions']
         del arrays['positions']
 
-    atoms = Atoms(symbols=symbols,
-                  positions=positions,
+    atoms = Atoms(positions=positions,
                   numbers=numbers,
                   charges=charges,
                   cell=cell,
@@ -542,28 +572,35 @@ class XYZError(IOError):
 
 
 class XYZChunk:
-    def __init__(self, lines, natoms):
+    def __init__(self, lines, natoms, nvec=0):
         self.lines = lines
         self.natoms = natoms
+        self.nvec = nvec
 
-    def build(self):
+    def build(self, **kwargs):
         """Convert unprocessed chunk into Atoms."""
-        return _read_xyz_frame(iter(self.lines), self.natoms)
+        return _read_xyz_frame(iter(self.lines), self.natoms, nvec=self.nvec,
+                               **kwargs)
 
 
 def ixyzchunks(fd):
     """Yield unprocessed chunks (header, lines) for each xyz image."""
-    while True:
-        line = next(fd).strip()  # Raises StopIteration on empty file
+    line = fd.readline()
+    while line.strip():
         try:
             natoms = int(line)
         except ValueError:
             raise XYZError('Expected integer, found "{0}"'.format(line))
-        try:
-            lines = [next(fd) for _ in range(1 + natoms)]
-        except StopIteration:
+        lines = [fd.readline() for _ in range(1 + natoms)]
+        if not lines[-1]:
             raise XYZError('Incomplete XYZ chunk')
-        yield XYZChunk(lines, natoms)
+        nvec = 0
+        line = fd.readline()
+        while line.lstrip().startswith('VEC'):
+            lines.append(line)
+            nvec += 1
+            line = fd.readline()
+        yield XYZChunk(lines, natoms, nvec)
 
 
 class ImageIterator:
@@ -603,7 +640,8 @@ iread_xyz = ImageIterator(ixyzchunks)
 
 
 @reader
-def read_xyz(fileobj, index=-1, properties_parser=key_val_str_to_dict):
+def read_xyz(fileobj, index=-1, properties_parser=key_val_str_to_dict,
+             index_file=None):
     r"""
     Read from a file in Extended XYZ format
 
@@ -613,6 +651,12 @@ def read_xyz(fileobj, index=-1, properties_parser=key_val_str_to_dict):
     deal with most use cases, ``extxyz.key_val_str_to_dict_regex`` is slightly
     faster but has fewer features.
 
+    The byte offsets of the frames are found once per file and kept in
+    memory, so that later reads of the same file go straight to the
+    requested frames.  If index_file is given, the frame index is also
+    stored in that file and reused by later processes.  The index is
+    rebuilt when the size or modification time of the xyz file changes.
+
     Extended XYZ format is an enhanced version of the `basic XYZ format
     <http://en.wikipedia.org/wiki/XYZ_file_format>`_ that allows extra
     columns to be present in the file for additonal per-atom properties as
@@ -721,57 +765,216 @@ def read_xyz(fileobj, index=-1, properties_parser=key_val_str_to_dict):
         raise TypeError('Index argument is neither slice nor integer!')
 
     # If possible, build a partial index up to the last frame required
-    last_frame = None
+    nframes = None
     if isinstance(index, int) and index >= 0:
-        last_frame = index
+        nframes = index + 1
     elif isinstance(index, slice):
-        if index.stop is not None and index.stop >= 0:
-            last_frame = index.stop
+        if (index.stop is not None and index.stop >= 0
+                and (index.start or 0) >= 0 and (index.step or 1) > 0):
+            nframes = index.stop + 1
 
-    # scan through file to find where the frames start
     try:
         fileobj.seek(0)
     except UnsupportedOperation:
-        fileobj = StringIO(fileobj.read())
-        fileobj.seek(0)
-    frames = []
-    while True:
-        frame_pos = fileobj.tell()
-        line = fileobj.readline()
-        if line.strip() == '':
-            break
-        try:
-            natoms = int(line)
-        except ValueError as err:
-            raise XYZError('ase.io.extxyz: Expected xyz header but got: {}'
-                           .format(err))
-        fileobj.readline()  # read comment line
-        for i in range(natoms):
-            fileobj.readline()
-        # check for VEC
-        nvec = 0
+        fileobj = TextIOWrapper(BytesIO(fileobj.read().encode()))
+    else:
+        if not hasattr(fileobj, 'buffer'):
+            # StringIO: we need byte offsets
+            fileobj = TextIOWrapper(BytesIO(fileobj.read().encode()))
+
+    if (isinstance(index, slice) and index.stop is None
+            and (index.start or 0) >= 0 and (index.step or 1) > 0):
+        # Open-ended: extend the index while reading (read(index=n)
+        # and iread() end up here)
+        xyzindex = get_xyz_index(fileobj, (index.start or 0) + 1, index_file)
+        i = index.start or 0
         while True:
-            lastPos = fileobj.tell()
-            line = fileobj.readline()
-            if line.lstrip().startswith('VEC'):
+            if i >= len(xyzindex):
+                xyzindex.update(fileobj.buffer,
+                                max(i + 1, 2 * len(xyzindex)))
+                if i >= len(xyzindex):
+                    break
+            yield _read_indexed_frame(fileobj, xyzindex.frames[i],
+                                      properties_parser)
+            i += index.step or 1
+        get_xyz_index(fileobj, len(xyzindex), index_file)  # store index
+        return
+
+    frames = get_xyz_index(fileobj, nframes, index_file).frames
+    for i in index2range(index, len(frames)):
+        yield _read_indexed_frame(fileobj, frames[i], properties_parser)
+
+
+def _read_indexed_frame(fileobj, frame, properties_parser):
+    frame_pos, natoms, nvec = frame
+    fileobj.seek(frame_pos)
+    # check for consistency with frame index table
+    assert int(fileobj.readline()) == natoms
+    return _read_xyz_frame(fileobj, natoms, properties_parser, nvec)
+
+
+class _Lines:
+    """Random access to the lines of a binary file read in big blocks.
+
+    Only lines after the last requested one are kept in memory."""
+
+    def __init__(self, fd, blocksize):
+        self.fd = fd
+        self.blocksize = blocksize
+        self.offset = fd.tell()  # file offset of self.data
+        self.data = b''
+        self.starts = [0]  # line starts in self.data
+        self.first = 0  # line number of first line in self.data
+        self.eof = False
+
+    def get(self, n):
+        """Return file offset and content of line number n."""
+        k = n - self.first
+        while k + 1 >= len(self.starts) and not self.eof:
+            self._read(k)
+            k = n - self.first
+        if k >= len(self.starts):
+            return self.offset + len(self.data), b''
+        start = self.starts[k]
+        if k + 1 < len(self.starts):
+            return self.offset + start, self.data[start:self.starts[k + 1]]
+        return self.offset + start, self.data[start:]
+
+    def _read(self, k):
+        k = min(k, len(self.starts) - 1)
+        start = self.starts[k]
+        self.data = self.data[start:]
+        self.offset += start
+        self.starts = [i - start for i in self.starts[k:]]
+        self.first += k
+        block = self.fd.read(self.blocksize)
+        if not block:
+            self.eof = True
+            return
+        newlines = np.flatnonzero(np.frombuffer(block, np.uint8) == 10)
+        self.starts += (newlines + len(self.data) + 1).tolist()
+        self.data += block
+
+
+class XYZIndex:
+    """Byte offsets, number of atoms and number of VEC lines of frames.
+
+    The index is built by looking for newlines in big blocks of the
+    file, without parsing the frames.  Indexing can stop after a given
+    number of frames and continue from there later.
+
+    size, mtime:
+        Size and modification time (in ns) of the indexed file.
+    """
+
+    dtype = np.dtype([('offset', np.int64), ('natoms', np.int64),
+                      ('nvec', np.int8)])
+
+    def __init__(self, size=None, mtime=None):
+        self.size = size
+        self.mtime = mtime
+        self.frames = np.zeros(0, self.dtype)
+        self.end = 0  # offset after last indexed frame
+        self.complete = False
+
+    def __len__(self):
+        return len(self.frames)
+
+    def matches(self, stat):
+        return (self.size, self.mtime) == (stat.st_size, stat.st_mtime_ns)
+
+    def update(self, fd, nframes=None, blocksize=2**22):
+        """Index frames of binary file until nframes frames are known."""
+        if self.complete or nframes is not None and len(self) >= nframes:
+            return
+        fd.seek(self.end)
+        lines = _Lines(fd, blocksize)
+        frames = []
+        n = 0
+        while nframes is None or len(self) + len(frames) < nframes:
+            offset, line = lines.get(n)
+            if not line.strip():
+                self.complete = True
+                break
+            try:
+                natoms = int(line)
+            except ValueError as err:
+                raise XYZError('ase.io.extxyz: Expected xyz header but got: '
+                               '{}'.format(err))
+            n += natoms + 2
+            # check for VEC
+            nvec = 0
+            while lines.get(n)[1].lstrip().startswith(b'VEC'):
                 nvec += 1
                 if nvec > 3:
                     raise XYZError('ase.io.extxyz: More than 3 VECX entries')
-            else:
-                fileobj.seek(lastPos)
-                break
-        frames.append((frame_pos, natoms, nvec))
-        if last_frame is not None and len(frames) > last_frame:
-            break
-
-    trbl = index2range(index, len(frames))
+                n += 1
+            frames.append((offset, natoms, nvec))
+            self.end = lines.get(n)[0]
+        self.frames = np.concatenate([self.frames,
+                                      np.array(frames, self.dtype)])
+
+    def write(self, filename):
+        tmpfilename = filename + '.tmp'
+        with open(tmpfilename, 'wb') as fd:
+            np.savez(fd, frames=self.frames, end=self.end,
+                     complete=self.complete, size=self.size, mtime=self.mtime)
+        os.replace(tmpfilename, filename)
+
+    @classmethod
+    def read(cls, filename):
+        with np.load(filename) as data:
+            index = cls(int(data['size']), int(data['mtime']))
+            index.frames = data['frames']
+            index.end = int(data['end'])
+            index.complete = bool(data['complete'])
+        return index
+
+
+# Indices of the most recently read files by (device, inode):
+_xyz_indices: Dict[Tuple[int, int], XYZIndex] = {}
+_max_xyz_indices = 16
+
+
+def get_xyz_index(fileobj, nframes=None, index_file=None):
+    """Get index of the first nframes frames (default all) of xyz file.
+
+    fileobj must be opened in text mode and have a seekable buffer
+    attribute.  Indices of recently read files are kept in memory and are
+    rebuilt if the size or modification time of the file changes.
+    If index_file is given, the index is also read from and stored in
+    that file so that it can be reused by other processes."""
+    try:
+        stat = os.fstat(fileobj.fileno())
+    except (AttributeError, UnsupportedOperation):
+        stat = None
 
-    for index in trbl:
-        frame_pos, natoms, nvec = frames[index]
-        fileobj.seek(frame_pos)
-        # check for consistency with frame index table
-        assert int(fileobj.readline()) == natoms
-        yield _read_xyz_frame(fileobj, natoms, properties_parser, nvec)
+    stored = None
+    if stat is None:
+        index = XYZIndex()
+    else:
+        key = (stat.st_dev, stat.st_ino)
+        index = _xyz_indices.pop(key, None)
+        if index is not None and not index.matches(stat):
+            index = None
+        if index_file and os.path.isfile(index_file):
+            try:
+                stored = XYZIndex.read(index_file)
+            except (OSError, ValueError, KeyError):
+                pass  # broken index file
+            if stored is not None and not stored.matches(stat):
+                stored = None
+        if index is None or stored is not None and len(stored) > len(index):
+            index = stored or XYZIndex(stat.st_size, stat.st_mtime_ns)
+        _xyz_indices[key] = index
+        if len(_xyz_indices) > _max_xyz_indices:
+            del _xyz_indices[next(iter(_xyz_indices))]  # least recent
+
+    nstored = -1 if stored is None else len(stored)
+    index.update(fileobj.buffer, nframes)
+    if index_file and stat is not None and len(index) > nstored:
+        index.write(index_file)
+    return index
 
 
 def output_column_format(atoms, columns, arrays,
@@ -1037,4 +1240,5 @@ def write_xyz(fileobj, images, comment='', columns=None,
 
 # create aliases for read/write functions
 read_extxyz = read_xyz
+ichunks_extxyz = ixyzchunks
 write_extxyz = write_xyz
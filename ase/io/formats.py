@@ -125,6 +125,13 @@ class IOFormat:
     def can_write(self) -> bool:
         return self._writefunc() is not None
 
+    @property
+    def can_read_chunks(self) -> bool:
+        """Whether the file can be split into chunks of one image each.
+
+        Such formats can be read with ``workers``."""
+        return self._ichunksfunc() is not None
+
     @property
     def can_append(self) -> bool:
         writefunc = self._writefunc()
@@ -157,6 +164,9 @@ class IOFormat:
     def _writefunc(self):
         return getattr(self.module, 'write_' + self._formatname, None)
 
+    def _ichunksfunc(self):
+        return getattr(self.module, 'ichunks_' + self._formatname, None)
+
     @property
     def read(self):
         if not self.can_read:
@@ -722,6 +732,7 @@ def read(
         format: str = None,
         parallel: bool = True,
         do_not_split_by_at_sign: bool = False,
+        workers: Optional[int] = None,
         **kwargs
 ) -> Union[Atoms, List[Atoms]]:
     """Read Atoms object(s) from file.
@@ -745,6 +756,13 @@ def read(
         parallel=False to read on all slaves.
     do_not_split_by_at_sign: bool
         If False (default) ``filename`` is splited by at sign ``@``
+    workers: int
+        Number of processes used to build the Atoms objects.  The file
+        is split into images by the main process and parsed by the
+        workers.  The images are returned in the order of the file, and
+        at most ``2 * workers`` of them are read ahead.  Only supported
+        for formats with ``can_read_chunks`` (extxyz, vasp-out and
+        lammps-dump-text).
 
     Many formats allow on open file-like object to be passed instead
     of ``filename``. In this case the format cannot be auto-decected,
@@ -768,10 +786,15 @@ def read(
     io = get_ioformat(format)
     if isinstance(index, (slice, str)):
         return list(_iread(filename, index, format, io, parallel=parallel,
-                           **kwargs))
+                           workers=workers, **kwargs))
     else:
-        return next(_iread(filename, slice(index, None), format, io,
-                           parallel=parallel, **kwargs))
+        if workers is None:
+            index = slice(index, None)
+        else:
+            # Do not build images beyond the one we want:
+            index = slice(index, (index + 1) or None)
+        return next(_iread(filename, index, format, io,
+                           parallel=parallel, workers=workers, **kwargs))
 
 
 def iread(
@@ -780,6 +803,7 @@ def iread(
         format: str = None,
         parallel: bool = True,
         do_not_split_by_at_sign: bool = False,
+        workers: Optional[int] = None,
         **kwargs
 ) -> Iterable[Atoms]:
     """Iterator for reading Atoms objects from file.
@@ -805,17 +829,20 @@ def iread(
     io = get_ioformat(format)
 
     for atoms in _iread(filename, index, format, io, parallel=parallel,
-                        **kwargs):
+                        workers=workers, **kwargs):
         yield atoms
 
 
 @parallel_generator
 def _iread(filename, index, format, io, parallel=None, full_output=False,
-           **kwargs):
+           workers=None, **kwargs):
 
     if not io.can_read:
         raise ValueError("Can't read from {}-format".format(format))
 
+    if workers is not None and not io.can_read_chunks:
+        raise ValueError("Can't read {}-format with workers".format(format))
+
     if io.single:
         start = index.start
         assert start is None or start == 0 or start == -1
@@ -837,7 +864,12 @@ def _iread(filename, index, format, io, parallel=None, full_output=False,
 
     # Make sure fd is closed in case loop doesn't finish:
     try:
-        for dct in io.read(fd, *args, **kwargs):
+        if workers is None:
+            images = io.read(fd, *args, **kwargs)
+        else:
+            chunks = _select_chunks(io._ichunksfunc(), fd, index)
+            images = _build_chunks(chunks, workers, kwargs)
+        for dct in images:
             if not isinstance(dct, dict):
                 dct = {'atoms': dct}
             if full_output:
@@ -849,6 +881,56 @@ def _iread(filename, index, format, io, parallel=None, full_output=False,
             fd.close()
 
 
+def _select_chunks(ichunks, fd, index):
+    from itertools import islice
+
+    start, stop, step = index.start, index.stop, index.step
+    if ((start is None or start >= 0) and (stop is None or stop >= 0)
+            and (step is None or step > 0)):
+        return islice(ichunks(fd), start, stop, step)
+
+    # Count the chunks so that the slice can be evaluated:
+    if not fd.seekable():
+        raise ValueError('Negative indices only supported for '
+                         'seekable streams')
+    startpos = fd.tell()
+    nchunks = sum(1 for chunk in ichunks(fd))
+    fd.seek(startpos)
+    indices = range(*index.indices(nchunks))
+    if not indices:
+        return iter([])
+    if indices.step > 0:
+        return islice(ichunks(fd), indices.start, indices.stop,
+                      indices.step)
+    chunks = list(islice(ichunks(fd), indices[-1], indices[0] + 1,
+                         -indices.step))
+    return reversed(chunks)
+
+
+def _build_chunk(chunk, kwargs):
+    return chunk.build(**kwargs)
+
+
+def _build_chunks(chunks, workers, kwargs):
+    """Build images from chunks in worker processes, keeping the order."""
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    executor = ProcessPoolExecutor(workers)
+    futures = deque()
+    try:
+        for chunk in chunks:
+            futures.append(executor.submit(_build_chunk, chunk, kwargs))
+            if len(futures) > 2 * workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
+
+
 def parse_filename(filename, index=None, do_not_split_by_at_sign=False):
     if not isinstance(filename, str):
         return filename, index
@@ -1,6 +1,7 @@
 import gzip
 import struct
 from collections import deque
+from io import StringIO
 from os.path import splitext
 
 import numpy as np
@@ -8,6 +9,7 @@ import numpy as np
 from ase.atoms import Atoms
 from ase.calculators.lammps import convert
 from ase.calculators.singlepoint import SinglePointCalculator
+from ase.io.utils import ImageChunk
 from ase.parallel import paropen
 from ase.quaternions import Quaternions
 
@@ -331,6 +333,34 @@ def read_lammps_dump_text(fileobj, index=-1, **kwargs):
     return images[index]
 
 
+class LAMMPSDumpChunk(ImageChunk):
+    """Lines of a single timestep of a cleartext dump file."""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def build(self, **kwargs):
+        return read_lammps_dump_text(StringIO(''.join(self.lines)),
+                                     index=-1, **kwargs)
+
+
+def ilammpsdumpchunks(fd):
+    """Yield a chunk for each timestep of a cleartext dump file."""
+    lines = None
+    for line in fd:
+        if "ITEM: TIMESTEP" in line:
+            if lines is not None:
+                yield LAMMPSDumpChunk(lines)
+            lines = []
+        if lines is not None:
+            lines.append(line)
+    if lines is not None:
+        yield LAMMPSDumpChunk(lines)
+
+
+ichunks_lammps_dump_text = ilammpsdumpchunks
+
+
 def read_lammps_dump_binary(
     fileobj, index=-1, colnames=None, intformat="SMALLBIG", **kwargs
 ):
@@ -1,3 +1,4 @@
+import numbers
 import warnings
 from typing import Tuple
 
@@ -17,7 +18,8 @@ from ase.utils import tokenize_version
 __all__ = ['Trajectory', 'PickleTrajectory']
 
 
-def Trajectory(filename, mode='r', atoms=None, properties=None, master=None):
+def Trajectory(filename, mode='r', atoms=None, properties=None, master=None,
+               **kwargs):
     """A Trajectory can be created in read, write or append mode.
 
     Parameters:
@@ -44,17 +46,22 @@ def Trajectory(filename, mode='r', atoms=None, properties=None, master=None):
         default is that process number 0 does this.  If this
         argument is given, processes where it is True will write.
 
+    Other keyword arguments (buffersize, background and fsync) are passed
+    on to :class:`TrajectoryWriter`.
+
     The atoms, properties and master arguments are ignores in read mode.
     """
     if mode == 'r':
         return TrajectoryReader(filename)
-    return TrajectoryWriter(filename, mode, atoms, properties, master=master)
+    return TrajectoryWriter(filename, mode, atoms, properties, master=master,
+                            **kwargs)
 
 
 class TrajectoryWriter:
     """Writes Atoms objects to a .traj file."""
     def __init__(self, filename, mode='w', atoms=None, properties=None,
-                 extra=[], master=None):
+                 extra=[], master=None, buffersize=1, background=False,
+                 fsync=False):
         """A Trajectory writer, in write or append mode.
 
         Parameters:
@@ -80,6 +87,21 @@ class TrajectoryWriter:
             Controls which process does the actual writing. The
             default is that process number 0 does this.  If this
             argument is given, processes where it is True will write.
+        buffersize: int
+            Number of images kept in memory before they are written to
+            the file together.  The default is to write every image
+            right away.  Images in the buffer are written when
+            flush() or close() is called, or when Python exits (also
+            after an uncaught exception).  If the process is killed, up
+            to *buffersize* images are lost.
+        background: bool
+            Write the images to the file in a separate thread, so that
+            e.g. molecular dynamics can continue while the file system
+            is busy.
+        fsync: bool
+            Make sure that the images are stored on disk and not only in
+            the cache of the operating system, each time images are
+            written.  This is slow, so use it with a large buffersize.
         """
         if master is None:
             master = (world.rank == 0)
@@ -91,7 +113,9 @@ class TrajectoryWriter:
         self.header_data = None
         self.multiple_headers = False
 
-        self._open(filename, mode)
+        self._open(filename, mode, dict(buffersize=buffersize,
+                                        background=background,
+                                        fsync=fsync))
 
     def __enter__(self):
         return self
@@ -102,12 +126,13 @@ class TrajectoryWriter:
     def set_description(self, description):
         self.description.update(description)
 
-    def _open(self, filename, mode):
+    def _open(self, filename, mode, kwargs):
         import ase.io.ulm as ulm
         if mode not in 'aw':
             raise ValueError('mode must be "w" or "a".')
         if self.master:
-            self.backend = ulm.open(filename, mode, tag='ASE-Trajectory')
+            self.backend = ulm.Writer(filename, mode, tag='ASE-Trajectory',
+                                      **kwargs)
             if len(self.backend) > 0 and mode == 'a':
                 with Trajectory(filename) as traj:
                     atoms = traj[0]
@@ -202,6 +227,10 @@ class TrajectoryWriter:
 
         b.sync()
 
+    def flush(self):
+        """Write buffered images to the file."""
+        self.backend.flush()
+
     def close(self):
         """Close the trajectory file."""
         self.backend.close()
@@ -291,6 +320,39 @@ class TrajectoryReader:
         for i in range(len(self)):
             yield self[i]
 
+    def get_array(self, name, index=slice(None)):
+        """Read one quantity for several images without creating Atoms.
+
+        name: str
+            One of 'positions', 'cell', 'numbers', 'pbc', 'masses',
+            'momenta', 'tags', 'initial_magmoms', 'initial_charges' or a
+            calculator property such as 'energy' or 'forces'.
+        index: int, slice or sequence of int
+            The images to read.  Default is all images.
+
+        Returns an ndarray with the images along the first axis, e.g.
+        of shape (nimages, natoms, 3) for positions::
+
+            positions = traj.get_array('positions', slice(100, None))
+        """
+        if isinstance(index, (slice, numbers.Integral)):
+            indices = range(len(self))[index]
+        else:
+            indices = index
+        if isinstance(indices, numbers.Integral):
+            return self.get_array(name, [indices])[0]
+
+        default = None
+        if name in ['numbers', 'pbc', 'masses']:
+            # Only written when they change:
+            default = getattr(self, name)
+        if name in all_properties:
+            name = 'calculator.' + name
+        else:
+            name = {'initial_magmoms': 'magmoms',
+                    'initial_charges': 'charges'}.get(name, name)
+        return self.backend.stack(name, indices, default)
+
 
 class SlicedTrajectory:
     """Wrapper to return a slice from a trajectory without loading
@@ -312,6 +374,12 @@ class SlicedTrajectory:
     def __len__(self):
         return len(self.map)
 
+    def get_array(self, name, index=slice(None)):
+        """Read one quantity for several images without creating Atoms.
+
+        See :meth:`TrajectoryReader.get_array`."""
+        return self.trajectory.get_array(name, self.map[index])
+
 
 def get_header_data(atoms):
     return {'pbc': atoms.pbc.copy(),
@@ -120,8 +120,11 @@ Versions
 3) Changed magic string from "AFFormat" to "- of Ulm".
 """
 
+import atexit
 import os
 import numbers
+import queue
+import threading
 from pathlib import Path
 from typing import Union, Set
 
@@ -209,8 +212,36 @@ def file_has_fileno(fd):
     return True
 
 
+class WriteBuffer:
+    """Collect bytes in memory that will be written to a file later.
+
+    pos: int
+        Position in the file of the first byte."""
+
+    def __init__(self, pos):
+        self.pos = pos
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+
+    def tell(self):
+        return self.pos + self.size
+
+    def take(self):
+        """Return the buffered bytes and empty the buffer."""
+        data = b''.join(self.chunks)
+        self.pos += self.size
+        self.chunks = []
+        self.size = 0
+        return data
+
+
 class Writer:
-    def __init__(self, fd, mode='w', tag='', data=None):
+    def __init__(self, fd, mode='w', tag='', data=None,
+                 buffersize=1, background=False, fsync=False):
         """Create writer object.
 
         fd: str
@@ -220,6 +251,19 @@ class Writer:
             existing one) and 'a' for appending to an existing file.
         tag: str
             Magic ID string.
+        buffersize: int
+            Number of items kept in memory.  The items are written to
+            the file, and the offsets and number of items in the header
+            updated, once for every *buffersize* calls to sync().
+            Buffered items are written by flush() and close(), and when
+            the interpreter exits.
+        background: bool
+            Write to the file in a separate thread so that sync() does
+            not wait for the file system.
+        fsync: bool
+            Call os.fsync() when items are written, so that they are on
+            disk, and not only in the operating system's cache, before
+            the number of items in the header includes them.
         """
 
         assert mode in 'aw'
@@ -227,7 +271,9 @@ class Writer:
         # Header to be written later:
         self.header = b''
 
-        if data is None:
+        child = data is not None
+
+        if not child:
             if np.little_endian:
                 data = {}
             else:
@@ -266,6 +312,25 @@ class Writer:
                 self.offsets = np.concatenate((offsets, padding))
                 fd.seek(0, 2)
 
+        self.file = fd  # items are written here by flush()
+        self.buffersize = buffersize
+        self.fsync = fsync
+        self.nflushed = 0 if child else self.nitems
+        self.pos0_changed = False
+        self.queue = None
+        self.error = None
+
+        if not child and (buffersize > 1 or background):
+            fd = WriteBuffer(fd.tell())
+            if background:
+                # Limit the number of batches waiting to be written:
+                self.queue = queue.Queue(2)
+                self.thread = threading.Thread(target=self._write_batches,
+                                               daemon=True)
+                self.thread.start()
+            # Make sure nothing is lost if we are never closed:
+            atexit.register(self.close)
+
         self.fd = fd
         self.hasfileno = file_has_fileno(fd)
 
@@ -352,20 +417,85 @@ class Writer:
                 buf.tofile(self.fd)
             else:
                 self.fd.write(buf.tobytes())
-            writeint(self.fd, self.pos0, 40)
+            self.pos0_changed = True
             self.offsets = offsets
 
         self.offsets[self.nitems] = i
-        writeint(self.fd, i, self.pos0 + self.nitems * 8)
         self.nitems += 1
-        writeint(self.fd, self.nitems, 32)
-        self.fd.flush()
-        self.fd.seek(0, 2)  # end of file
+        if self.nitems - self.nflushed >= self.buffersize:
+            self._flush()
         if np.little_endian:
             self.data = {}
         else:
             self.data = {'_little_endian': False}
 
+    def flush(self):
+        """Write buffered items to the file and wait until done."""
+        self._flush()
+        if self.queue is not None:
+            self.queue.join()
+            self._check_background_error()
+
+    def _flush(self):
+        pos = None
+        data = b''
+        if isinstance(self.fd, WriteBuffer):
+            pos = self.fd.pos
+            data = self.fd.take()
+        if self.nitems == self.nflushed and not data:
+            return
+
+        offsets = self.offsets[self.nflushed:self.nitems]
+        if not np.little_endian:
+            offsets = offsets.byteswap()
+        batch = (pos, data, self.pos0 if self.pos0_changed else None,
+                 self.pos0 + self.nflushed * 8, offsets.tobytes(),
+                 self.nitems)
+        self.pos0_changed = False
+        self.nflushed = self.nitems
+
+        if self.queue is None:
+            self._write_batch(*batch)
+        else:
+            self._check_background_error()
+            self.queue.put(batch)
+
+    def _write_batch(self, pos, data, pos0, offsetspos, offsets, nitems):
+        fd = self.file
+        if data:
+            fd.seek(pos)
+            fd.write(data)
+        if pos0 is not None:
+            writeint(fd, pos0, 40)
+        fd.seek(offsetspos)
+        fd.write(offsets)
+        if self.fsync:
+            # Data must be on disk before the header says it is there:
+            fd.flush()
+            os.fsync(fd.fileno())
+        writeint(fd, nitems, 32)
+        fd.flush()
+        if self.fsync:
+            os.fsync(fd.fileno())
+        fd.seek(0, 2)  # end of file
+
+    def _write_batches(self):
+        while True:
+            batch = self.queue.get()
+            if batch is not None and self.error is None:
+                try:
+                    self._write_batch(*batch)
+                except BaseException as error:
+                    self.error = error
+            self.queue.task_done()
+            if batch is None:
+                return
+
+    def _check_background_error(self):
+        if self.error is not None:
+            raise IOError('Writing ulm-file in background failed') \
+                from self.error
+
     def write(self, *args, **kwargs):
         """Write data.
 
@@ -417,7 +547,17 @@ class Writer:
         else:
             # Make sure header has been written (empty ulm-file):
             self._write_header()
-        self.fd.close()
+        if self.file is None:
+            return  # already closed
+        atexit.unregister(self.close)
+        try:
+            self.flush()
+        finally:
+            if self.queue is not None:
+                self.queue.put(None)
+                self.thread.join()
+            self.file.close()
+            self.file = None
 
     def __len__(self):
         return int(self.nitems)
@@ -439,6 +579,9 @@ class DummyWriter:
     def sync(self):
         pass
 
+    def flush(self):
+        pass
+
     def write(self, *args, **kwargs):
         pass
 
@@ -584,6 +727,94 @@ class Reader:
         data = self._read_data(index)
         return Reader(self._fd, index, data, self._little_endian)
 
+    def stack(self, name, indices=None, default=None):
+        """Read *name* from several items and stack the values.
+
+        name: str
+            Name of the value.  Use dots for values of children
+            (``'calculator.forces'``).
+        indices: sequence of int
+            Items to read.  Defaults to all items.
+        default:
+            Value to use for items that do not have *name*.  If not
+            given, a KeyError is raised for such items.
+
+        Returns an ndarray with the values of the items along the first
+        axis.  Only the json data of the items is read.  The ndarrays
+        are copied out of a memory map of the file, so no Reader objects
+        are created."""
+
+        if indices is None:
+            indices = range(len(self))
+        *parents, key = name.split('.')
+        values = []
+        endian = []
+        for i in indices:
+            data = self._read_data(i)
+            try:
+                for parent in parents:
+                    data = data[parent + '.']
+                value = data.get(key + '.', data.get(key, KeyError))
+                if value is KeyError:
+                    raise KeyError(name)
+            except KeyError:
+                if default is None:
+                    raise
+                value = default
+            values.append(value)
+            endian.append(self._little_endian)
+
+        isarray = np.array([isinstance(value, dict) and 'ndarray' in value
+                            for value in values], bool)
+        if not isarray.any():
+            return np.array(values)
+
+        shape, dtype, offset = values[isarray.argmax()]['ndarray']
+        shape = tuple(shape)
+        dtype = np.dtype(dtype.encode())
+        out = np.empty((len(values),) + shape, dtype)
+        offsets = np.zeros(len(values), np.int64)
+        for n, value in enumerate(values):
+            if isarray[n]:
+                shape1, dtype1, offsets[n] = value['ndarray']
+                value = np.empty(shape1, dtype1.encode())
+            else:
+                value = np.asarray(value)
+                out[n] = value
+            if value.shape != shape or value.dtype != dtype:
+                raise ValueError(
+                    'Cannot stack {}: shapes or dtypes differ'.format(name))
+
+        endian = np.array(endian, bool)
+        if not file_has_fileno(self._fd):
+            for n in isarray.nonzero()[0]:
+                out[n] = NDArrayReader(self._fd, shape, dtype, offsets[n],
+                                       endian[n]).read()
+            return out
+
+        mm = np.memmap(self._fd, np.uint8, 'r')
+        size = int(np.prod(shape))
+        for little_endian in [True, False]:
+            mask = isarray & (endian == little_endian)
+            if not mask.any():
+                continue
+            filetype = dtype.newbyteorder('<' if little_endian else '>')
+            steps = np.diff(offsets[mask])
+            if len(steps) > 0 and (steps == steps[0]).all():
+                # Items of equal size: a single strided view of the file.
+                strides = ((int(steps[0]),) +
+                           np.empty(shape, filetype).strides)
+                out[mask] = np.ndarray((mask.sum(),) + shape, filetype,
+                                       buffer=mm,
+                                       offset=int(offsets[mask][0]),
+                                       strides=strides)
+            else:
+                out[mask] = [np.frombuffer(mm, filetype, size,
+                                           int(offset)).reshape(shape)
+                             for offset in offsets[mask]]
+        del mm
+        return out
+
     def tostr(self, verbose=False, indent='    '):
         keys = sorted(self._data)
         strings = []
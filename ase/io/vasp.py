@@ -249,6 +249,9 @@ def read_vasp(filename='CONTCAR'):
     return atoms
 
 
+ichunks_vasp_out = vop.outcarchunks
+
+
 def iread_vasp_out(filename, index=-1):
     """Import OUTCAR type file, as a generator."""
     it = ImageIterator(vop.outcarchunks)
@@ -129,38 +129,28 @@ class DiffusionCoefficient:
             end = start + self.len_segments
             seg = self.traj[ignore_n_images+start:ignore_n_images+end]
 
-            # If we are considering a molecular system, work out the COM for the starting structure
-            if self.is_molecule:
-                com_orig = np.zeros(3)
-                for atom_no in self.atom_indices:
-                    com_orig += seg[0].positions[atom_no] / len(self.atom_indices)
-
-            # For each image, calculate displacement.
-            # I spent some time deciding if this should run from 0 or 1, as the displacement will be zero for 
+            # Positions of the selected atoms for all images in the segment,
+            # read without creating Atoms objects where the trajectory allows
+            if hasattr(seg, 'get_array'):
+                positions = seg.get_array('positions')
+            else:
+                positions = np.array([atoms.positions for atoms in seg])
+            positions = positions[:, self.atom_indices]
+
+            # I spent some time deciding if the displacements should run from 0 or 1, as the displacement will be zero for
             # t = 0, but this is a data point that needs fitting too and so should be included
-            for image_no in range(0,len(seg)): 
-                # This object collects the xyz displacements for all atom species in the image
-                xyz_disp = np.zeros((self.no_of_types_of_atoms,3))
-                
-                # Calculating for each atom individually, grouping by species type (e.g. solid state)
-                if not self.is_molecule:
-                    # For each atom, work out displacement from start coordinate and collect information with like atoms
-                    for atom_no in self.atom_indices:
-                        sym_index = self.types_of_atoms.index(seg[image_no].symbols[atom_no])
-                        xyz_disp[sym_index] += np.square(seg[image_no].positions[atom_no] - seg[0].positions[atom_no])
-        
-                else: # Calculating for group of atoms (molecule) and work out squared displacement
-                    com_disp = np.zeros(3)
-                    for atom_no in self.atom_indices:
-                        com_disp += seg[image_no].positions[atom_no] / len(self.atom_indices)
-                    xyz_disp[0] += np.square(com_disp - com_orig)
-
-                # For each atom species or molecule, use xyz_disp to calculate the average data                      
-                for sym_index in range(self.no_of_types_of_atoms):
-                    # Normalise by degrees of freedom and average overall atoms for each axes over entire segment                         
-                    denominator = (2*self.no_of_atoms[sym_index])
-                    for xyz in range(3):
-                        self.xyz_segment_ensemble_average[segment_no][sym_index][xyz][image_no] = (xyz_disp[sym_index][xyz]/denominator)
+            if not self.is_molecule:
+                # For each atom, work out displacement from start coordinate and collect information with like atoms
+                symbols = np.array(seg[0].get_chemical_symbols())[self.atom_indices]
+                squared_disp = np.square(positions - positions[0])
+                for sym_index, symbol in enumerate(self.types_of_atoms):
+                    xyz_disp = squared_disp[:, symbols == symbol].sum(axis=1)
+                    # Normalise by degrees of freedom and average overall atoms for each axes over entire segment
+                    self.xyz_segment_ensemble_average[segment_no][sym_index] = (xyz_disp.T / (2*self.no_of_atoms[sym_index]))
+            else: # Calculating for group of atoms (molecule) and work out squared displacement of the centre of mass
+                com = positions.sum(axis=1) / len(self.atom_indices)
+                xyz_disp = np.square(com - com[0])
+                self.xyz_segment_ensemble_average[segment_no][0] = (xyz_disp.T / (2*self.no_of_atoms[0]))
 
             # We've collected all the data for this entire segment, so now to fit the data.
             for sym_index in range(self.no_of_types_of_atoms):    
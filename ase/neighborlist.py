@@ -2,7 +2,6 @@ import numpy as np
 import itertools
 from scipy import sparse as sp
 from scipy.spatial import cKDTree
-import scipy.sparse.csgraph as csgraph
 
 from ase.data import atomic_numbers, covalent_radii
 from ase.geometry import complete_cell, find_mic, wrap_positions
@@ -57,8 +56,9 @@ def get_distance_matrix(graph, limit=3):
     Parameters:
 
     graph: array, matrix or sparse matrix, 2 dimensions (N, N)
-        Graph representation of the connectivity. See `scipy doc <https://docs.scipy.org/doc/scipy/reference/generated/scipy.sparse.csgraph.dijkstra.html#scipy.sparse.csgraph.dijkstra>`_
-        for reference.
+        Graph representation of the connectivity.  Every nonzero element
+        is an edge; the graph is treated as undirected and edge weights
+        are ignored.
     limit: integer
         Maximum number of steps to analyze. For most molecular information,
         three should be enough.
@@ -69,15 +69,25 @@ def get_distance_matrix(graph, limit=3):
         A scipy.sparse.csr_matrix. All elements that are not connected within
         *limit* steps are set to zero.
 
-    This is a potential memory bottleneck, as csgraph.dijkstra produces a
-    dense output matrix. Here we replace all np.inf values with 0 and
-    transform back to csr_matrix.
-    Why not dok_matrix like the connectivity-matrix? Because row-picking
-    is most likely and this is super fast with csr.
+    The topological distances are found by a breadth-first search that
+    stops after *limit* steps.  Each step is a sparse matrix product of
+    the current front with the graph, so only pairs of nodes that are
+    at most *limit* steps apart are ever stored.  Why csr? Because
+    row-picking is most likely and this is super fast with csr.
     """
-    mat = csgraph.dijkstra(graph, directed=False, limit=limit)
-    mat[mat == np.inf] = 0
-    return sp.csr_matrix(mat, dtype=np.int8)
+    graph = sp.csr_matrix(graph, dtype=bool)
+    graph = graph + graph.T
+    reached = sp.identity(graph.shape[0], dtype=bool, format='csr')
+    front = reached
+    distances = sp.csr_matrix(graph.shape, dtype=np.int8)
+    for step in range(1, limit + 1):
+        # Nodes one step further than the front that were not seen before.
+        front = (front @ graph) > reached
+        if front.nnz == 0:
+            break
+        distances = distances + front.astype(np.int8) * step
+        reached = reached + front
+    return distances
 
 
 def get_distance_indices(distanceMatrix, distance):
@@ -100,18 +110,13 @@ def get_distance_indices(distanceMatrix, distance):
     distances longer than one, we need to add the lower values for cases
     where atoms are connected via a shorter path too.
     """
-    shape = distanceMatrix.get_shape()
-    indices = []
-    #iterate over rows
-    for i in range(shape[0]):
-        row = distanceMatrix.getrow(i)[0]
-        #find all non-zero
-        found = sp.find(row)
-        #screen for smaller or equal distance
-        equal = np.where(found[-1] <= distance)[0]
-        #found[1] contains the indexes
-        indices.append([found[1][x] for x in equal])
-    return indices
+    matrix = sp.csr_matrix(distanceMatrix, copy=True)
+    #screen for nonzero and smaller or equal distance
+    matrix.data = (matrix.data != 0) & (matrix.data <= distance)
+    matrix.eliminate_zeros()
+    matrix.sort_indices()
+    #split the column indices into rows
+    return [list(row) for row in np.split(matrix.indices, matrix.indptr[1:-1])]
 
 
 def mic(dr, cell, pbc=True):
@@ -138,9 +143,527 @@ def mic(dr, cell, pbc=True):
     return dr
 
 
+def _empty_neighbor_arrays():
+    return dict(i=np.empty(0, dtype=int),
+                j=np.empty(0, dtype=int),
+                D=np.empty((0, 3), dtype=float),
+                d=np.empty(0, dtype=float),
+                S=np.empty((0, 3), dtype=int))
+
+
+def _select_quantities(quantities, arrays):
+    """Return arrays in the order given by the *quantities* string."""
+    retvals = []
+    for q in quantities:
+        if q not in arrays:
+            raise ValueError('Unsupported quantity specified.')
+        retvals.append(arrays[q])
+    if len(retvals) == 1:
+        return retvals[0]
+    else:
+        return tuple(retvals)
+
+
+def _pair_cutoff_table(cutoff, zmax=0):
+    """Tabulate a dict of per element pair cutoffs by atomic numbers.
+
+    Element pairs that are not in the dict get a cutoff of zero."""
+    pairs = [(atomic_numbers.get(z1, z1), atomic_numbers.get(z2, z2))
+             for z1, z2 in cutoff]
+    zmax = max(max(max(pair) for pair in pairs), zmax)
+    table = np.zeros((zmax + 1, zmax + 1))
+    for (z1, z2), c in zip(pairs, cutoff.values()):
+        table[z1, z2] = table[z2, z1] = c
+    return table
+
+
+class CellList:
+    """Linked-cell (bin) neighbor search that can be reused across calls.
+
+    The atoms are sorted into spatial bins whose layout depends only on
+    the cell, the periodic boundary conditions and the cutoff.  The bin
+    layout is kept between calls to :meth:`update`, and atoms are only
+    moved between bins when they actually cross a bin boundary, so the
+    cost of an update in an MD run is proportional to the number of atoms
+    that changed bin.  Neighbor pairs are generated bin by bin and can be
+    retrieved in chunks with :meth:`iter_chunks`, which keeps the memory
+    needed for candidate pairs bounded.
+
+    pbc: array_like
+        3-tuple indicating giving periodic boundaries in the three Cartesian
+        directions.
+    cell: 3x3 matrix
+        Unit cell vectors.
+    cutoff: float, dict or list of float
+        Cutoff for neighbor search.  See
+        :func:`~ase.neighborlist.primitive_neighbor_list`.
+    numbers: list of int
+        Atomic numbers.  Only needed if *cutoff* is a dictionary.
+    self_interaction: bool
+        Return the atom itself as its own neighbor if set to true.
+    bothways: bool
+        Return all neighbors.  If false, only "half" of the neighbors
+        are returned, see :func:`~ase.neighborlist.primitive_neighbor_list`.
+    max_nbins: int
+        Maximum number of bins used in neighbor search.
+
+    Example::
+
+        cl = CellList(atoms.pbc, atoms.cell, 5.0)
+        cl.update(atoms.positions)
+        i, j, d = cl.neighbor_list('ijd')
+        ...
+        cl.update(atoms.positions, moved=[3, 17])
+        for i, j, D in cl.iter_chunks('ijD'):
+            ...
+    """
+
+    # Naming conventions: Suffixes indicate the dimension of an array. The
+    # following convention is used here:
+    #     c: Cartesian index, can have values 0, 1, 2
+    #     i: Global atom index, can have values 0..len(a)-1
+    #     xyz: Bin index, three values identifying x-, y- and z-component of a
+    #          spatial bin that is used to make neighbor search O(n)
+    #     b: Linearized version of the 'xyz' bin index
+    #     a: Bin-local atom index, i.e. index identifying an atom *within* a
+    #        bin
+    #     p: Pair index, can have value 0 or 1
+    #     n: (Linear) neighbor index
+
+    def __init__(self, pbc, cell, cutoff, numbers=None,
+                 self_interaction=False, bothways=True, max_nbins=1e6):
+        self.pbc = np.zeros(3, bool)
+        self.pbc[:] = pbc
+        self.cell = np.array(cell, dtype=float)
+        self.self_interaction = self_interaction
+        self.bothways = bothways
+
+        if isinstance(cutoff, dict):
+            max_cutoff = max(cutoff.values())
+        elif np.isscalar(cutoff):
+            max_cutoff = cutoff
+        else:
+            cutoff = np.asarray(cutoff)
+            max_cutoff = 2 * np.max(cutoff, initial=0)
+        self.cutoff = cutoff
+        self.max_cutoff = max_cutoff
+        self.numbers = None if numbers is None else np.asarray(numbers)
+
+        # If cutoff is a dictionary, then the cutoff radii are specified per
+        # element pair.  Tabulate them so that they can be looked up by
+        # atomic numbers.
+        self.pair_cutoff_table = None
+        if isinstance(cutoff, dict) and numbers is not None:
+            self.pair_cutoff_table = _pair_cutoff_table(
+                cutoff, self.numbers.max(initial=0))
+
+        # Compute reciprocal lattice vectors.
+        b1_c, b2_c, b3_c = np.linalg.pinv(self.cell).T
+
+        # Compute distances of cell faces.
+        l1 = np.linalg.norm(b1_c)
+        l2 = np.linalg.norm(b2_c)
+        l3 = np.linalg.norm(b3_c)
+        face_dist_c = np.array([1 / l1 if l1 > 0 else 1,
+                                1 / l2 if l2 > 0 else 1,
+                                1 / l3 if l3 > 0 else 1])
+
+        # We use a minimum bin size of 3 A
+        bin_size = max(max_cutoff, 3)
+        # Compute number of bins such that a sphere of radius cutoff fits
+        # into eight neighboring bins.
+        nbins_c = np.maximum((face_dist_c / bin_size).astype(int), [1, 1, 1])
+        nbins = np.prod(nbins_c)
+        # Make sure we limit the amount of memory used by the explicit bins.
+        while nbins > max_nbins:
+            nbins_c = np.maximum(nbins_c // 2, [1, 1, 1])
+            nbins = np.prod(nbins_c)
+        self.face_dist_c = face_dist_c
+        self.nbins_c = nbins_c
+        self.nbins = nbins
+
+        # Compute over how many bins we need to loop in the neighbor list
+        # search.
+        neigh_search_c = np.ceil(bin_size * nbins_c /
+                                 face_dist_c).astype(int)
+
+        # If we only have a single bin and the system is not periodic, then
+        # we do not need to search neighboring bins
+        neigh_search_c[(nbins_c == 1) & ~self.pbc] = 0
+        self.neigh_search_c = neigh_search_c
+
+        self.positions = None
+        self.nupdates = 0
+        self.nrebinned = 0
+
+    def __len__(self):
+        return 0 if self.positions is None else len(self.positions)
+
+    def _find_bins(self, positions):
+        """Return linear bin index and cell shift of each position."""
+        nbins_c = self.nbins_c
+        scaled_positions_ic = np.linalg.solve(complete_cell(self.cell).T,
+                                              positions.T).T
+        bin_index_ic = np.floor(scaled_positions_ic * nbins_c).astype(int)
+        cell_shift_ic = np.zeros_like(bin_index_ic)
+
+        for c in range(3):
+            if self.pbc[c]:
+                # (Note: np.divmod does not exist in older numpies)
+                cell_shift_ic[:, c], bin_index_ic[:, c] = \
+                    divmod(bin_index_ic[:, c], nbins_c[c])
+            else:
+                bin_index_ic[:, c] = np.clip(bin_index_ic[:, c],
+                                             0, nbins_c[c] - 1)
+
+        # Convert Cartesian bin index to unique scalar bin index.
+        bin_index_i = (bin_index_ic[:, 0] +
+                       nbins_c[0] * (bin_index_ic[:, 1] +
+                                     nbins_c[1] * bin_index_ic[:, 2]))
+        return bin_index_i, cell_shift_ic
+
+    def update(self, positions, moved=None, use_scaled_positions=False):
+        """Sort atoms into bins.
+
+        positions: list of xyz-positions
+            Positions of all atoms.  If use_scaled_positions is set to
+            true, these must be scaled positions.
+        moved: list of int
+            Indices of the atoms that moved since the last update.  Only
+            these atoms are reconsidered.  If not given, all atoms are
+            checked and those that crossed a bin boundary are moved to
+            their new bin.  The bins are always rebuilt from scratch on
+            the first call or if the number of atoms changed.
+
+        Returns the number of atoms that were moved to another bin."""
+
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        if use_scaled_positions:
+            positions = positions @ self.cell
+
+        if self.positions is None or len(positions) != len(self.positions):
+            self._build(positions)
+            return self.nrebinned
+
+        if moved is None:
+            moved = np.arange(len(positions))
+        else:
+            moved = np.unique(np.asarray(moved, dtype=int))
+
+        self.positions[moved] = positions[moved]
+        bin_index_i, cell_shift_ic = self._find_bins(positions[moved])
+        self.cell_shift_ic[moved] = cell_shift_ic
+
+        changed = bin_index_i != self.bin_index_i[moved]
+        for i, b in zip(moved[changed], bin_index_i[changed]):
+            self._move(i, b)
+
+        # Drop empty trailing slots so that the pair search does not have
+        # to loop over them.
+        max_natoms_per_bin = max(self.natoms_in_bin_b.max(), 1)
+        if max_natoms_per_bin < self.atoms_in_bin_ba.shape[1]:
+            self.atoms_in_bin_ba = \
+                self.atoms_in_bin_ba[:, :max_natoms_per_bin].copy()
+
+        self.nrebinned = int(changed.sum())
+        self.nupdates += 1
+        return self.nrebinned
+
+    def _build(self, positions):
+        self.positions = positions.copy()
+        natoms = len(positions)
+        if self.pair_cutoff_table is None and not (
+                isinstance(self.cutoff, dict) or np.isscalar(self.cutoff)):
+            if len(self.cutoff) != natoms:
+                raise ValueError('Wrong number of cutoff radii: {0} != {1}'
+                                 .format(len(self.cutoff), natoms))
+
+        bin_index_i, self.cell_shift_ic = self._find_bins(positions)
+
+        # atom_i contains atom index in new sort order.
+        atom_i = np.argsort(bin_index_i, kind='stable')
+        sorted_bin_index_i = bin_index_i[atom_i]
+        self.natoms_in_bin_b = np.bincount(bin_index_i,
+                                           minlength=self.nbins)
+        max_natoms_per_bin = max(self.natoms_in_bin_b.max(initial=0), 1)
+
+        # Position of every atom within its bin.
+        first_in_bin_b = np.cumsum(self.natoms_in_bin_b) - \
+            self.natoms_in_bin_b
+        slot_i = np.empty(natoms, dtype=int)
+        slot_i[atom_i] = np.arange(natoms) - first_in_bin_b[sorted_bin_index_i]
+
+        # Sort atoms into bins: atoms_in_bin_ba contains for each bin
+        # (identified by its scalar bin index) a list of atoms inside that
+        # bin. This list is homogeneous, i.e. has the same size
+        # *max_natoms_per_bin* for all bins.  The list is padded with -1
+        # values.  Atoms occupy the first natoms_in_bin_b slots of each bin.
+        self.atoms_in_bin_ba = -np.ones([self.nbins, max_natoms_per_bin],
+                                        dtype=int)
+        self.atoms_in_bin_ba[bin_index_i, slot_i] = np.arange(natoms)
+        self.bin_index_i = bin_index_i
+        self.slot_i = slot_i
+
+        self.nrebinned = natoms
+        self.nupdates += 1
+
+    def _move(self, i, b):
+        """Move atom *i* from its current bin to bin *b*."""
+        atoms_in_bin_ba = self.atoms_in_bin_ba
+        natoms_in_bin_b = self.natoms_in_bin_b
+
+        # Fill the hole with the last atom of the old bin.
+        b0 = self.bin_index_i[i]
+        a0 = self.slot_i[i]
+        last = natoms_in_bin_b[b0] - 1
+        k = atoms_in_bin_ba[b0, last]
+        atoms_in_bin_ba[b0, a0] = k
+        self.slot_i[k] = a0
+        atoms_in_bin_ba[b0, last] = -1
+        natoms_in_bin_b[b0] -= 1
+
+        a = natoms_in_bin_b[b]
+        if a == atoms_in_bin_ba.shape[1]:
+            atoms_in_bin_ba = np.hstack([atoms_in_bin_ba,
+                                         -np.ones_like(atoms_in_bin_ba)])
+            self.atoms_in_bin_ba = atoms_in_bin_ba
+        atoms_in_bin_ba[b, a] = i
+        natoms_in_bin_b[b] += 1
+        self.slot_i[i] = a
+        self.bin_index_i[i] = b
+
+    def iter_chunks(self, quantities, indices=None, chunk_size=2**22):
+        """Iterate over the neighbor list in chunks.
+
+        quantities: str
+            Quantities to compute, see
+            :func:`~ase.neighborlist.primitive_neighbor_list`.
+        indices: list of int
+            Only return pairs whose first atom 'i' is one of these atoms.
+            Default is to return pairs for all atoms.
+        chunk_size: int
+            Approximate number of candidate pairs that are considered
+            at a time for each neighboring bin.  This bounds the memory
+            used by the search.
+
+        Each chunk is a tuple of arrays as returned by
+        :meth:`neighbor_list`.  Within a chunk the pairs are sorted by
+        'i', and every pair is returned in exactly one chunk, but the
+        chunks themselves are not ordered."""
+
+        if self.positions is None:
+            raise RuntimeError('Must call update(positions) first!')
+
+        selected_i = None
+        if indices is None:
+            bins_b = np.arange(self.nbins)
+        else:
+            indices = np.asarray(indices, dtype=int)
+            selected_i = np.zeros(len(self) + 1, bool)
+            selected_i[indices] = True
+            bins_b = np.unique(self.bin_index_i[indices])
+        bins_b = bins_b[self.natoms_in_bin_b[bins_b] > 0]
+
+        max_natoms_per_bin = self.atoms_in_bin_ba.shape[1]
+        # atom_pairs_pn is a helper buffer that contains all potential pairs
+        # of atoms between two bins, i.e. it is a list of length
+        # max_natoms_per_bin**2.
+        atom_pairs_pn = np.indices((max_natoms_per_bin, max_natoms_per_bin),
+                                   dtype=int).reshape(2, -1)
+        nbins_per_chunk = max(1, int(chunk_size) // max_natoms_per_bin**2)
+
+        for start in range(0, len(bins_b), nbins_per_chunk):
+            arrays = self._search_bins(bins_b[start:start + nbins_per_chunk],
+                                       atom_pairs_pn, selected_i)
+            if len(arrays['i']) > 0:
+                yield _select_quantities(quantities, arrays)
+
+    def neighbor_list(self, quantities, indices=None, chunk_size=2**22):
+        """Compute the neighbor list for the binned atoms.
+
+        Same as :meth:`iter_chunks`, but all chunks are returned at once
+        as a single tuple of arrays sorted by first atom index 'i'."""
+
+        arrays = _empty_neighbor_arrays()
+        if self.positions is not None and len(self) > 0:
+            chunks = list(self.iter_chunks('ijDdS', indices=indices,
+                                           chunk_size=chunk_size))
+            if chunks:
+                arrays = {q: np.concatenate(values)
+                          for q, values in zip('ijDdS', zip(*chunks))}
+                n = np.argsort(arrays['i'], kind='stable')
+                arrays = {q: values[n] for q, values in arrays.items()}
+        return _select_quantities(quantities, arrays)
+
+    def _pair_cutoffs(self, first_at_neightuple_n, secnd_at_neightuple_n):
+        """Return cutoff of each pair, or None for a single cutoff."""
+        if self.pair_cutoff_table is not None:
+            numbers = self.numbers
+            return self.pair_cutoff_table[numbers[first_at_neightuple_n],
+                                          numbers[secnd_at_neightuple_n]]
+        elif isinstance(self.cutoff, dict) or np.isscalar(self.cutoff):
+            return None
+        else:
+            # If cutoff is neither a dictionary nor a scalar, then we assume
+            # it is a list or numpy array that contains atomic radii. Atoms
+            # are neighbors if their radii overlap.
+            return (self.cutoff[first_at_neightuple_n] +
+                    self.cutoff[secnd_at_neightuple_n])
+
+    def _search_bins(self, bin_b, atom_pairs_pn, selected_i=None):
+        """Find all neighbors of the atoms in the bins *bin_b*."""
+        nbins_c = self.nbins_c
+        atoms_in_bin_ba = self.atoms_in_bin_ba
+        binx_b = bin_b % nbins_c[0]
+        biny_b = (bin_b // nbins_c[0]) % nbins_c[1]
+        binz_b = bin_b // (nbins_c[0] * nbins_c[1])
+        bin_width_c = self.face_dist_c / nbins_c
+
+        # First atoms in pair.
+        first_at_neightuple_bn = atoms_in_bin_ba[bin_b][:, atom_pairs_pn[0]]
+        first_mask_bn = first_at_neightuple_bn != -1
+        if selected_i is not None:
+            first_mask_bn &= selected_i[first_at_neightuple_bn]
+
+        # Initialized empty neighbor list buffers.
+        first_at_neightuple_nn = []
+        secnd_at_neightuple_nn = []
+        cell_shift_vector_nn = []
+        distance_vector_nn = []
+        abs_distance_vector_nn = []
+        positions = self.positions
+
+        # This is the main neighbor list search. We loop over neighboring
+        # bins and then construct all possible pairs of atoms between two
+        # bins, assuming that each bin contains exactly max_natoms_per_bin
+        # atoms. We then throw out pairs involving pad atoms with atom
+        # index -1 below.
+        search_x, search_y, search_z = self.neigh_search_c
+        for dz in range(-search_z, search_z + 1):
+            for dy in range(-search_y, search_y + 1):
+                for dx in range(-search_x, search_x + 1):
+                    # Lower bound for the distance between atoms in this
+                    # bin and atoms in the neighboring bin.  Pairs with a
+                    # shorter cutoff can be dropped right away.
+                    min_dist = (np.maximum(np.abs([dx, dy, dz]) - 1, 0) *
+                                bin_width_c).max()
+                    if min_dist >= self.max_cutoff:
+                        continue
+
+                    # Bin index of neighboring bin and shift vector.
+                    shiftx_b, neighbinx_b = divmod(binx_b + dx, nbins_c[0])
+                    shifty_b, neighbiny_b = divmod(biny_b + dy, nbins_c[1])
+                    shiftz_b, neighbinz_b = divmod(binz_b + dz, nbins_c[2])
+                    shift_bc = np.transpose([shiftx_b, shifty_b, shiftz_b])
+
+                    # For nonperiodic directions, skip neighboring bins
+                    # that lie across the domain boundary.
+                    inside_b = (shift_bc[:, ~self.pbc] == 0).all(axis=1)
+                    if not inside_b.any():
+                        continue
+
+                    neighbin_b = (neighbinx_b + nbins_c[0] *
+                                  (neighbiny_b + nbins_c[1] * neighbinz_b))
+
+                    # Second atom in pair.
+                    secnd_at_neightuple_bn = \
+                        atoms_in_bin_ba[neighbin_b][:, atom_pairs_pn[1]]
+
+                    # We have created too many pairs because we assumed each
+                    # bin has exactly max_natoms_per_bin atoms. Remove all
+                    # surperfluous pairs. Those are pairs that involve an
+                    # atom with index -1.
+                    mask_bn = first_mask_bn & (secnd_at_neightuple_bn != -1)
+                    mask_bn &= inside_b[:, np.newaxis]
+
+                    if not self.bothways:
+                        # Keep pairs with i < j.  An atom paired with its
+                        # own periodic image is kept for the image with
+                        # the first nonzero component of the shift vector
+                        # positive.
+                        nonzero_b = shift_bc != 0
+                        first_nonzero_b = np.argmax(nonzero_b, axis=1)
+                        positive_b = shift_bc[np.arange(len(bin_b)),
+                                              first_nonzero_b] > 0
+                        positive_b |= ~nonzero_b.any(axis=1)
+                        mask_bn &= ((first_at_neightuple_bn <
+                                     secnd_at_neightuple_bn) |
+                                    ((first_at_neightuple_bn ==
+                                      secnd_at_neightuple_bn) &
+                                     positive_b[:, np.newaxis]))
+
+                    b_n, _ = np.nonzero(mask_bn)
+                    if len(b_n) == 0:
+                        continue
+                    first_at_neightuple_n = first_at_neightuple_bn[mask_bn]
+                    secnd_at_neightuple_n = secnd_at_neightuple_bn[mask_bn]
+                    cell_shift_vector_n = shift_bc[b_n]
+
+                    pair_cutoff_n = self._pair_cutoffs(first_at_neightuple_n,
+                                                       secnd_at_neightuple_n)
+                    if pair_cutoff_n is not None:
+                        m = pair_cutoff_n > min_dist
+                        first_at_neightuple_n = first_at_neightuple_n[m]
+                        secnd_at_neightuple_n = secnd_at_neightuple_n[m]
+                        cell_shift_vector_n = cell_shift_vector_n[m]
+                        cutoff_n = np.minimum(pair_cutoff_n[m],
+                                              self.max_cutoff)
+                    else:
+                        cutoff_n = self.max_cutoff
+
+                    # Add global cell shift to shift vectors
+                    cell_shift_vector_n += (
+                        self.cell_shift_ic[first_at_neightuple_n] -
+                        self.cell_shift_ic[secnd_at_neightuple_n])
+
+                    # Compute distance vectors.
+                    distance_vector_nc = positions[secnd_at_neightuple_n] - \
+                        positions[first_at_neightuple_n] + \
+                        cell_shift_vector_n.dot(self.cell)
+                    abs_distance_vector_n = np.sqrt(
+                        np.sum(distance_vector_nc * distance_vector_nc,
+                               axis=1))
+
+                    # We have still created too many pairs. Only keep those
+                    # with distance smaller than the cutoff.  Doing this
+                    # for every neighboring bin separately keeps the
+                    # candidate pairs of only one bin offset in memory.
+                    mask = abs_distance_vector_n < cutoff_n
+
+                    # Remove all self-pairs that do not cross the cell
+                    # boundary.
+                    if not self.self_interaction:
+                        mask &= np.logical_not(np.logical_and(
+                            first_at_neightuple_n == secnd_at_neightuple_n,
+                            (cell_shift_vector_n == 0).all(axis=1)))
+
+                    first_at_neightuple_nn.append(
+                        first_at_neightuple_n[mask])
+                    secnd_at_neightuple_nn.append(
+                        secnd_at_neightuple_n[mask])
+                    cell_shift_vector_nn.append(cell_shift_vector_n[mask])
+                    distance_vector_nn.append(distance_vector_nc[mask])
+                    abs_distance_vector_nn.append(abs_distance_vector_n[mask])
+
+        if not first_at_neightuple_nn:
+            return _empty_neighbor_arrays()
+
+        # Flatten overall neighbor list.
+        first_at_neightuple_n = np.concatenate(first_at_neightuple_nn)
+
+        # Sort neighbor list.
+        n = np.argsort(first_at_neightuple_n, kind='stable')
+        return dict(i=first_at_neightuple_n[n],
+                    j=np.concatenate(secnd_at_neightuple_nn)[n],
+                    D=np.concatenate(distance_vector_nn)[n],
+                    d=np.concatenate(abs_distance_vector_nn)[n],
+                    S=np.concatenate(cell_shift_vector_nn)[n])
+
+
 def primitive_neighbor_list(quantities, pbc, cell, positions, cutoff,
                             numbers=None, self_interaction=False,
-                            use_scaled_positions=False, max_nbins=1e6):
+                            use_scaled_positions=False, max_nbins=1e6,
+                            bothways=True):
     """Compute a neighbor list for an atomic configuration.
 
     Atoms outside periodic boundaries are mapped into the box. Atoms
@@ -193,6 +716,14 @@ def primitive_neighbor_list(quantities, pbc, cell, positions, cutoff,
     max_nbins: int
         Maximum number of bins used in neighbor search. This is used to limit
         the maximum amount of memory required by the neighbor list.
+    bothways: bool
+        Return all neighbors (default).  If set to false, only "half" of
+        the neighbors are returned, i.e. every pair of atoms appears only
+        once: (i, j, S) is returned with i < j but not (j, i, -S).  An
+        atom that neighbors its own periodic image is returned for the
+        shift vector S whose first nonzero component is positive.  The
+        half list is built during the search, which saves half of the
+        work and memory, e.g. for pair potentials.
 
     Returns:
 
@@ -203,314 +734,19 @@ def primitive_neighbor_list(quantities, pbc, cell, positions, cutoff,
 
     """
 
-    # Naming conventions: Suffixes indicate the dimension of an array. The
-    # following convention is used here:
-    #     c: Cartesian index, can have values 0, 1, 2
-    #     i: Global atom index, can have values 0..len(a)-1
-    #     xyz: Bin index, three values identifying x-, y- and z-component of a
-    #          spatial bin that is used to make neighbor search O(n)
-    #     b: Linearized version of the 'xyz' bin index
-    #     a: Bin-local atom index, i.e. index identifying an atom *within* a
-    #        bin
-    #     p: Pair index, can have value 0 or 1
-    #     n: (Linear) neighbor index
-
     # Return empty neighbor list if no atoms are passed here
     if len(positions) == 0:
-        empty_types = dict(i=(int, (0, )),
-                           j=(int, (0, )),
-                           D=(float, (0, 3)),
-                           d=(float, (0, )),
-                           S=(int, (0, 3)))
-        retvals = []
-        for i in quantities:
-            dtype, shape = empty_types[i]
-            retvals += [np.array([], dtype=dtype).reshape(shape)]
-        if len(retvals) == 1:
-            return retvals[0]
-        else:
-            return tuple(retvals)
-
-    # Compute reciprocal lattice vectors.
-    b1_c, b2_c, b3_c = np.linalg.pinv(cell).T
-
-    # Compute distances of cell faces.
-    l1 = np.linalg.norm(b1_c)
-    l2 = np.linalg.norm(b2_c)
-    l3 = np.linalg.norm(b3_c)
-    face_dist_c = np.array([1 / l1 if l1 > 0 else 1,
-                            1 / l2 if l2 > 0 else 1,
-                            1 / l3 if l3 > 0 else 1])
-
-    if isinstance(cutoff, dict):
-        max_cutoff = max(cutoff.values())
-    else:
-        if np.isscalar(cutoff):
-            max_cutoff = cutoff
-        else:
-            cutoff = np.asarray(cutoff)
-            max_cutoff = 2*np.max(cutoff)
-
-    # We use a minimum bin size of 3 A
-    bin_size = max(max_cutoff, 3)
-    # Compute number of bins such that a sphere of radius cutoff fits into
-    # eight neighboring bins.
-    nbins_c = np.maximum((face_dist_c / bin_size).astype(int), [1, 1, 1])
-    nbins = np.prod(nbins_c)
-    # Make sure we limit the amount of memory used by the explicit bins.
-    while nbins > max_nbins:
-        nbins_c = np.maximum(nbins_c // 2, [1, 1, 1])
-        nbins = np.prod(nbins_c)
-
-    # Compute over how many bins we need to loop in the neighbor list search.
-    neigh_search_x, neigh_search_y, neigh_search_z = \
-        np.ceil(bin_size * nbins_c / face_dist_c).astype(int)
+        return _select_quantities(quantities, _empty_neighbor_arrays())
 
-    # If we only have a single bin and the system is not periodic, then we
-    # do not need to search neighboring bins
-    neigh_search_x = 0 if nbins_c[0] == 1 and not pbc[0] else neigh_search_x
-    neigh_search_y = 0 if nbins_c[1] == 1 and not pbc[1] else neigh_search_y
-    neigh_search_z = 0 if nbins_c[2] == 1 and not pbc[2] else neigh_search_z
-
-    # Sort atoms into bins.
-    if use_scaled_positions:
-        scaled_positions_ic = positions
-        positions = np.dot(scaled_positions_ic, cell)
-    else:
-        scaled_positions_ic = np.linalg.solve(complete_cell(cell).T,
-                                              positions.T).T
-    bin_index_ic = np.floor(scaled_positions_ic*nbins_c).astype(int)
-    cell_shift_ic = np.zeros_like(bin_index_ic)
-
-    for c in range(3):
-        if pbc[c]:
-            # (Note: np.divmod does not exist in older numpies)
-            cell_shift_ic[:, c], bin_index_ic[:, c] = \
-                divmod(bin_index_ic[:, c], nbins_c[c])
-        else:
-            bin_index_ic[:, c] = np.clip(bin_index_ic[:, c], 0, nbins_c[c]-1)
-
-    # Convert Cartesian bin index to unique scalar bin index.
-    bin_index_i = (bin_index_ic[:, 0] +
-                   nbins_c[0] * (bin_index_ic[:, 1] +
-                                 nbins_c[1] * bin_index_ic[:, 2]))
-
-    # atom_i contains atom index in new sort order.
-    atom_i = np.argsort(bin_index_i)
-    bin_index_i = bin_index_i[atom_i]
-
-    # Find max number of atoms per bin
-    max_natoms_per_bin = np.bincount(bin_index_i).max()
-
-    # Sort atoms into bins: atoms_in_bin_ba contains for each bin (identified
-    # by its scalar bin index) a list of atoms inside that bin. This list is
-    # homogeneous, i.e. has the same size *max_natoms_per_bin* for all bins.
-    # The list is padded with -1 values.
-    atoms_in_bin_ba = -np.ones([nbins, max_natoms_per_bin], dtype=int)
-    for i in range(max_natoms_per_bin):
-        # Create a mask array that identifies the first atom of each bin.
-        mask = np.append([True], bin_index_i[:-1] != bin_index_i[1:])
-        # Assign all first atoms.
-        atoms_in_bin_ba[bin_index_i[mask], i] = atom_i[mask]
-
-        # Remove atoms that we just sorted into atoms_in_bin_ba. The next
-        # "first" atom will be the second and so on.
-        mask = np.logical_not(mask)
-        atom_i = atom_i[mask]
-        bin_index_i = bin_index_i[mask]
-
-    # Make sure that all atoms have been sorted into bins.
-    assert len(atom_i) == 0
-    assert len(bin_index_i) == 0
-
-    # Now we construct neighbor pairs by pairing up all atoms within a bin or
-    # between bin and neighboring bin. atom_pairs_pn is a helper buffer that
-    # contains all potential pairs of atoms between two bins, i.e. it is a list
-    # of length max_natoms_per_bin**2.
-    atom_pairs_pn = np.indices((max_natoms_per_bin, max_natoms_per_bin),
-                               dtype=int)
-    atom_pairs_pn = atom_pairs_pn.reshape(2, -1)
-
-    # Initialized empty neighbor list buffers.
-    first_at_neightuple_nn = []
-    secnd_at_neightuple_nn = []
-    cell_shift_vector_x_n = []
-    cell_shift_vector_y_n = []
-    cell_shift_vector_z_n = []
-
-    # This is the main neighbor list search. We loop over neighboring bins and
-    # then construct all possible pairs of atoms between two bins, assuming
-    # that each bin contains exactly max_natoms_per_bin atoms. We then throw
-    # out pairs involving pad atoms with atom index -1 below.
-    binz_xyz, biny_xyz, binx_xyz = np.meshgrid(np.arange(nbins_c[2]),
-                                               np.arange(nbins_c[1]),
-                                               np.arange(nbins_c[0]),
-                                               indexing='ij')
-    # The memory layout of binx_xyz, biny_xyz, binz_xyz is such that computing
-    # the respective bin index leads to a linearly increasing consecutive list.
-    # The following assert statement succeeds:
-    #     b_b = (binx_xyz + nbins_c[0] * (biny_xyz + nbins_c[1] *
-    #                                     binz_xyz)).ravel()
-    #     assert (b_b == np.arange(np.prod(nbins_c))).all()
-
-    # First atoms in pair.
-    _first_at_neightuple_n = atoms_in_bin_ba[:, atom_pairs_pn[0]]
-    for dz in range(-neigh_search_z, neigh_search_z+1):
-        for dy in range(-neigh_search_y, neigh_search_y+1):
-            for dx in range(-neigh_search_x, neigh_search_x+1):
-                # Bin index of neighboring bin and shift vector.
-                shiftx_xyz, neighbinx_xyz = divmod(binx_xyz + dx, nbins_c[0])
-                shifty_xyz, neighbiny_xyz = divmod(biny_xyz + dy, nbins_c[1])
-                shiftz_xyz, neighbinz_xyz = divmod(binz_xyz + dz, nbins_c[2])
-                neighbin_b = (neighbinx_xyz + nbins_c[0] *
-                              (neighbiny_xyz + nbins_c[1] * neighbinz_xyz)
-                              ).ravel()
-
-                # Second atom in pair.
-                _secnd_at_neightuple_n = \
-                    atoms_in_bin_ba[neighbin_b][:, atom_pairs_pn[1]]
-
-                # Shift vectors.
-                _cell_shift_vector_x_n = \
-                    np.resize(shiftx_xyz.reshape(-1, 1),
-                              (max_natoms_per_bin**2, shiftx_xyz.size)).T
-                _cell_shift_vector_y_n = \
-                    np.resize(shifty_xyz.reshape(-1, 1),
-                              (max_natoms_per_bin**2, shifty_xyz.size)).T
-                _cell_shift_vector_z_n = \
-                    np.resize(shiftz_xyz.reshape(-1, 1),
-                              (max_natoms_per_bin**2, shiftz_xyz.size)).T
-
-                # We have created too many pairs because we assumed each bin
-                # has exactly max_natoms_per_bin atoms. Remove all surperfluous
-                # pairs. Those are pairs that involve an atom with index -1.
-                mask = np.logical_and(_first_at_neightuple_n != -1,
-                                      _secnd_at_neightuple_n != -1)
-                if mask.sum() > 0:
-                    first_at_neightuple_nn += [_first_at_neightuple_n[mask]]
-                    secnd_at_neightuple_nn += [_secnd_at_neightuple_n[mask]]
-                    cell_shift_vector_x_n += [_cell_shift_vector_x_n[mask]]
-                    cell_shift_vector_y_n += [_cell_shift_vector_y_n[mask]]
-                    cell_shift_vector_z_n += [_cell_shift_vector_z_n[mask]]
-
-    # Flatten overall neighbor list.
-    first_at_neightuple_n = np.concatenate(first_at_neightuple_nn)
-    secnd_at_neightuple_n = np.concatenate(secnd_at_neightuple_nn)
-    cell_shift_vector_n = np.transpose([np.concatenate(cell_shift_vector_x_n),
-                                        np.concatenate(cell_shift_vector_y_n),
-                                        np.concatenate(cell_shift_vector_z_n)])
-
-    # Add global cell shift to shift vectors
-    cell_shift_vector_n += cell_shift_ic[first_at_neightuple_n] - \
-        cell_shift_ic[secnd_at_neightuple_n]
-
-    # Remove all self-pairs that do not cross the cell boundary.
-    if not self_interaction:
-        m = np.logical_not(np.logical_and(
-            first_at_neightuple_n == secnd_at_neightuple_n,
-            (cell_shift_vector_n == 0).all(axis=1)))
-        first_at_neightuple_n = first_at_neightuple_n[m]
-        secnd_at_neightuple_n = secnd_at_neightuple_n[m]
-        cell_shift_vector_n = cell_shift_vector_n[m]
-
-    # For nonperiodic directions, remove any bonds that cross the domain
-    # boundary.
-    for c in range(3):
-        if not pbc[c]:
-            m = cell_shift_vector_n[:, c] == 0
-            first_at_neightuple_n = first_at_neightuple_n[m]
-            secnd_at_neightuple_n = secnd_at_neightuple_n[m]
-            cell_shift_vector_n = cell_shift_vector_n[m]
-
-    # Sort neighbor list.
-    i = np.argsort(first_at_neightuple_n)
-    first_at_neightuple_n = first_at_neightuple_n[i]
-    secnd_at_neightuple_n = secnd_at_neightuple_n[i]
-    cell_shift_vector_n = cell_shift_vector_n[i]
-
-    # Compute distance vectors.
-    distance_vector_nc = positions[secnd_at_neightuple_n] - \
-        positions[first_at_neightuple_n] + \
-        cell_shift_vector_n.dot(cell)
-    abs_distance_vector_n = \
-        np.sqrt(np.sum(distance_vector_nc*distance_vector_nc, axis=1))
-
-    # We have still created too many pairs. Only keep those with distance
-    # smaller than max_cutoff.
-    mask = abs_distance_vector_n < max_cutoff
-    first_at_neightuple_n = first_at_neightuple_n[mask]
-    secnd_at_neightuple_n = secnd_at_neightuple_n[mask]
-    cell_shift_vector_n = cell_shift_vector_n[mask]
-    distance_vector_nc = distance_vector_nc[mask]
-    abs_distance_vector_n = abs_distance_vector_n[mask]
-
-    if isinstance(cutoff, dict) and numbers is not None:
-        # If cutoff is a dictionary, then the cutoff radii are specified per
-        # element pair. We now have a list up to maximum cutoff.
-        per_pair_cutoff_n = np.zeros_like(abs_distance_vector_n)
-        for (atomic_number1, atomic_number2), c in cutoff.items():
-            try:
-                atomic_number1 = atomic_numbers[atomic_number1]
-            except KeyError:
-                pass
-            try:
-                atomic_number2 = atomic_numbers[atomic_number2]
-            except KeyError:
-                pass
-            if atomic_number1 == atomic_number2:
-                mask = np.logical_and(
-                    numbers[first_at_neightuple_n] == atomic_number1,
-                    numbers[secnd_at_neightuple_n] == atomic_number2)
-            else:
-                mask = np.logical_or(
-                    np.logical_and(
-                        numbers[first_at_neightuple_n] == atomic_number1,
-                        numbers[secnd_at_neightuple_n] == atomic_number2),
-                    np.logical_and(
-                        numbers[first_at_neightuple_n] == atomic_number2,
-                        numbers[secnd_at_neightuple_n] == atomic_number1))
-            per_pair_cutoff_n[mask] = c
-        mask = abs_distance_vector_n < per_pair_cutoff_n
-        first_at_neightuple_n = first_at_neightuple_n[mask]
-        secnd_at_neightuple_n = secnd_at_neightuple_n[mask]
-        cell_shift_vector_n = cell_shift_vector_n[mask]
-        distance_vector_nc = distance_vector_nc[mask]
-        abs_distance_vector_n = abs_distance_vector_n[mask]
-    elif not np.isscalar(cutoff):
-        # If cutoff is neither a dictionary nor a scalar, then we assume it is
-        # a list or numpy array that contains atomic radii. Atoms are neighbors
-        # if their radii overlap.
-        mask = abs_distance_vector_n < \
-            cutoff[first_at_neightuple_n] + cutoff[secnd_at_neightuple_n]
-        first_at_neightuple_n = first_at_neightuple_n[mask]
-        secnd_at_neightuple_n = secnd_at_neightuple_n[mask]
-        cell_shift_vector_n = cell_shift_vector_n[mask]
-        distance_vector_nc = distance_vector_nc[mask]
-        abs_distance_vector_n = abs_distance_vector_n[mask]
-
-    # Assemble return tuple.
-    retvals = []
-    for q in quantities:
-        if q == 'i':
-            retvals += [first_at_neightuple_n]
-        elif q == 'j':
-            retvals += [secnd_at_neightuple_n]
-        elif q == 'D':
-            retvals += [distance_vector_nc]
-        elif q == 'd':
-            retvals += [abs_distance_vector_n]
-        elif q == 'S':
-            retvals += [cell_shift_vector_n]
-        else:
-            raise ValueError('Unsupported quantity specified.')
-    if len(retvals) == 1:
-        return retvals[0]
-    else:
-        return tuple(retvals)
+    cell_list = CellList(pbc, cell, cutoff, numbers=numbers,
+                         self_interaction=self_interaction,
+                         bothways=bothways, max_nbins=max_nbins)
+    cell_list.update(positions, use_scaled_positions=use_scaled_positions)
+    return cell_list.neighbor_list(quantities)
 
 
 def neighbor_list(quantities, a, cutoff, self_interaction=False,
-                  max_nbins=1e6):
+                  max_nbins=1e6, bothways=True):
     """Compute a neighbor list for an atomic configuration.
 
     Atoms outside periodic boundaries are mapped into the box. Atoms
@@ -555,6 +791,10 @@ def neighbor_list(quantities, a, cutoff, self_interaction=False,
     max_nbins: int
         Maximum number of bins used in neighbor search. This is used to limit
         the maximum amount of memory required by the neighbor list.
+    bothways: bool
+        Return all neighbors (default).  If set to false, every pair of
+        atoms is returned only once.  See
+        :func:`~ase.neighborlist.primitive_neighbor_list`.
 
     Returns:
 
@@ -620,7 +860,225 @@ def neighbor_list(quantities, a, cutoff, self_interaction=False,
                                    a.get_cell(complete=True),
                                    a.positions, cutoff, numbers=a.numbers,
                                    self_interaction=self_interaction,
-                                   max_nbins=max_nbins)
+                                   max_nbins=max_nbins, bothways=bothways)
+
+
+def primitive_batch_neighbor_list(quantities, pbc, cell, positions, cutoff,
+                                  numbers=None, self_interaction=False,
+                                  max_natoms=100, max_nbins=1e6):
+    """Compute neighbor lists for many atomic configurations at once.
+
+    Configurations with the same number of atoms and the same periodic
+    boundary conditions are grouped together and their neighbor lists
+    are computed by checking all pairs of atoms and periodic images
+    for the whole group with a few array operations.  This removes the
+    per-call overhead of :func:`~ase.neighborlist.primitive_neighbor_list`
+    when processing many small structures.  Configurations with more
+    than *max_natoms* atoms are handled one by one by
+    :func:`~ase.neighborlist.primitive_neighbor_list`.
+
+    Parameters:
+
+    quantities: str
+        Quantities to compute, see
+        :func:`~ase.neighborlist.primitive_neighbor_list`.
+    pbc: array_like
+        Periodic boundary conditions, shape (nimages, 3).
+    cell: array_like
+        Unit cell vectors, shape (nimages, 3, 3).
+    positions: list of arrays
+        Atomic positions of each configuration.  The configurations may
+        have different numbers of atoms.
+    cutoff: float or dict
+        Cutoff for neighbor search.  Either a single float or a
+        dictionary with cutoffs for element pairs as in
+        :func:`~ase.neighborlist.primitive_neighbor_list`.
+    numbers: list of arrays
+        Atomic numbers of each configuration.  Only needed if *cutoff*
+        is a dictionary.
+    self_interaction: bool
+        Return the atom itself as its own neighbor if set to true.
+        Default: False
+    max_natoms: int
+        Largest configuration that is treated by the vectorised
+        all-pairs search.
+    max_nbins: int
+        Maximum number of bins used in neighbor search of large
+        configurations.
+
+    Returns:
+
+    i, j, ..., first: array
+        Tuple with the concatenated arrays of all configurations for each
+        quantity specified above, followed by an index array *first*.
+        The neighbors of configuration k are found at
+        first[k]:first[k + 1].  The atom indices 'i' and 'j' are
+        relative to the configuration they belong to, and are sorted by
+        'i' within each configuration.
+    """
+
+    nimages = len(positions)
+    if nimages == 0:
+        pbc = np.zeros((0, 3), dtype=bool)
+        cell = np.zeros((0, 3, 3))
+    pbc = np.broadcast_to(np.asarray(pbc, dtype=bool), (nimages, 3))
+    cell = np.broadcast_to(np.asarray(cell, dtype=float), (nimages, 3, 3))
+    positions = [np.asarray(pos, dtype=float).reshape(-1, 3)
+                 for pos in positions]
+    natoms_k = np.array([len(pos) for pos in positions], dtype=int)
+
+    if isinstance(cutoff, dict):
+        if numbers is None:
+            raise ValueError('Per element pair cutoffs need atomic numbers')
+        max_cutoff = max(cutoff.values())
+        table = _pair_cutoff_table(
+            cutoff, max([np.max(z, initial=0) for z in numbers], default=0))
+    elif np.isscalar(cutoff):
+        max_cutoff = cutoff
+        table = None
+    else:
+        raise TypeError('Cutoff must be a float or a dict')
+
+    # Group configurations that can be handled with the same arrays.
+    groups = {}
+    for k in range(nimages):
+        if natoms_k[k] <= max_natoms:
+            key = (natoms_k[k],) + tuple(pbc[k])
+        else:
+            key = None
+        groups.setdefault(key, []).append(k)
+
+    chunks = []
+    for key, images in groups.items():
+        if key is None:
+            for k in images:
+                arrays = dict(zip('ijDdS', primitive_neighbor_list(
+                    'ijDdS', pbc[k], cell[k], positions[k], cutoff,
+                    numbers=None if numbers is None else numbers[k],
+                    self_interaction=self_interaction,
+                    max_nbins=max_nbins)))
+                arrays['k'] = np.full(len(arrays['i']), k)
+                chunks.append(arrays)
+        elif key[0] > 0:
+            images = np.array(images)
+            chunks += _batch_all_pairs(
+                images, np.array(key[1:]), cell[images],
+                np.array([positions[k] for k in images]),
+                max_cutoff, table,
+                None if table is None else
+                np.array([numbers[k] for k in images]),
+                self_interaction)
+
+    if chunks:
+        arrays = {q: np.concatenate([chunk[q] for chunk in chunks])
+                  for q in 'ijDdSk'}
+        image_n = arrays.pop('k')
+        n = np.argsort(image_n, kind='stable')
+        arrays = {q: values[n] for q, values in arrays.items()}
+    else:
+        arrays = _empty_neighbor_arrays()
+        image_n = np.empty(0, dtype=int)
+    first = np.zeros(nimages + 1, dtype=int)
+    first[1:] = np.cumsum(np.bincount(image_n, minlength=nimages))
+
+    retvals = _select_quantities(quantities, arrays)
+    if len(quantities) == 1:
+        retvals = (retvals,)
+    return retvals + (first,)
+
+
+def _batch_all_pairs(images, pbc, cell_kcc, positions_kic, max_cutoff,
+                     pair_cutoff_table=None, numbers_ki=None,
+                     self_interaction=False, chunk_size=2**22):
+    """Vectorised all-pairs neighbor search for a group of configurations.
+
+    All configurations have the same number of atoms and the same
+    periodic boundary conditions.  Suffixes follow the conventions of
+    :class:`~ase.neighborlist.CellList`, with k denoting the
+    configuration and t the periodic image."""
+
+    nimages, natoms = positions_kic.shape[:2]
+
+    # Map atoms into the cell along periodic directions and remember by
+    # how many cell vectors they were shifted.
+    scaled_kic = np.linalg.solve(
+        np.array([complete_cell(cell).T for cell in cell_kcc]),
+        positions_kic.transpose(0, 2, 1)).transpose(0, 2, 1)
+    cell_shift_kic = np.floor(scaled_kic).astype(int)
+    cell_shift_kic[:, :, ~pbc] = 0
+    positions_kic = positions_kic - np.einsum('kic,kcd->kid',
+                                              cell_shift_kic, cell_kcc)
+
+    # Number of periodic images needed along each direction.
+    face_dist_kc = np.zeros((nimages, 3))
+    for k, cell in enumerate(cell_kcc):
+        face_dist_kc[k] = Cell(cell).reciprocal().lengths()
+    with np.errstate(divide='ignore'):
+        face_dist_kc = np.where(face_dist_kc > 0, 1 / face_dist_kc, np.inf)
+    nshift_c = np.ceil(max_cutoff / face_dist_kc.min(axis=0)).astype(int)
+    nshift_c[~pbc] = 0
+    shift_tc = np.array(list(itertools.product(
+        *[range(-n, n + 1) for n in nshift_c])))
+
+    if pair_cutoff_table is not None:
+        cutoff_kij = pair_cutoff_table[numbers_ki[:, :, np.newaxis],
+                                       numbers_ki[:, np.newaxis, :]]
+    else:
+        cutoff_kij = np.full((nimages, natoms, natoms), float(max_cutoff))
+
+    chunks = []
+    nimages_per_chunk = max(1, chunk_size // (natoms**2 * len(shift_tc)))
+    for start in range(0, nimages, nimages_per_chunk):
+        chunk = slice(start, start + nimages_per_chunk)
+        pos_kic = positions_kic[chunk]
+        image_ktc = np.einsum('tc,kcd->ktd', shift_tc, cell_kcc[chunk])
+        distance_vector_kijtc = (pos_kic[:, np.newaxis, :, np.newaxis] -
+                                 pos_kic[:, :, np.newaxis, np.newaxis] +
+                                 image_ktc[:, np.newaxis, np.newaxis])
+        sqr_distance_kijt = np.einsum('kijtc,kijtc->kijt',
+                                      distance_vector_kijtc,
+                                      distance_vector_kijtc)
+        mask = sqr_distance_kijt < \
+            np.minimum(cutoff_kij[chunk], max_cutoff)[..., np.newaxis]**2
+        if not self_interaction:
+            zero_t = (shift_tc == 0).all(axis=1)
+            mask &= ~(np.eye(natoms, dtype=bool)[:, :, np.newaxis] &
+                      zero_t)
+
+        k_n, i_n, j_n, t_n = np.nonzero(mask)
+        shift_nc = (shift_tc[t_n] +
+                    cell_shift_kic[chunk][k_n, i_n] -
+                    cell_shift_kic[chunk][k_n, j_n])
+        chunks.append(dict(i=i_n, j=j_n,
+                           D=distance_vector_kijtc[mask],
+                           d=np.sqrt(sqr_distance_kijt[mask]),
+                           S=shift_nc, k=images[chunk][k_n]))
+    return chunks
+
+
+def batch_neighbor_list(quantities, images, cutoff, self_interaction=False,
+                        max_natoms=100, max_nbins=1e6):
+    """Compute neighbor lists for a list of atomic configurations.
+
+    This gives the same result as calling
+    :func:`~ase.neighborlist.neighbor_list` for every configuration,
+    but many small configurations are processed together.  See
+    :func:`~ase.neighborlist.primitive_batch_neighbor_list` for the
+    meaning of the parameters and the returned arrays.
+
+    Example::
+
+        i, j, d, first = batch_neighbor_list('ijd', images, 5.0)
+        for k, atoms in enumerate(images):
+            d_k = d[first[k]:first[k + 1]]
+    """
+    return primitive_batch_neighbor_list(
+        quantities, [atoms.pbc for atoms in images],
+        [atoms.get_cell(complete=True) for atoms in images],
+        [atoms.positions for atoms in images], cutoff,
+        numbers=[atoms.numbers for atoms in images],
+        self_interaction=self_interaction, max_natoms=max_natoms,
+        max_nbins=max_nbins)
 
 
 def first_neighbors(natoms, first_atom):
@@ -714,14 +1172,22 @@ def get_connectivity_matrix(nl, sparse=True):
     if nl.nupdates <= 0:
         raise RuntimeError('Must call update(atoms) on your neighborlist first!')
 
+    if hasattr(nl, 'pair_first'):
+        first = nl.pair_first
+        second = nl.pair_second
+    else:
+        neighbors = [nl.get_neighbors(i)[0] for i in range(nAtoms)]
+        first = np.repeat(np.arange(nAtoms), [len(n) for n in neighbors])
+        second = np.concatenate(neighbors + [np.empty(0, int)]).astype(int)
+
     if sparse:
-        matrix = sp.dok_matrix((nAtoms, nAtoms), dtype=np.int8)
+        matrix = sp.csr_matrix((np.ones(len(first), dtype=np.int8),
+                                (first, second)), shape=(nAtoms, nAtoms))
+        # Neighbors in several periodic images are only counted once.
+        matrix.data[:] = 1
     else:
         matrix = np.zeros((nAtoms, nAtoms), dtype=np.int8)
-
-    for i in range(nAtoms):
-        for idx in nl.get_neighbors(i)[0]:
-            matrix[i, idx] = 1
+        matrix[first, second] = 1
 
     return matrix
 
@@ -746,6 +1212,13 @@ class NewPrimitiveNeighborList:
     bothways: bool
         Return all neighbors.  Default is to return only "half" of
         the neighbors.
+    incremental: bool
+        Only rebuild the parts of the list that belong to atoms that
+        have moved more than the skin-distance (and the rows of their
+        neighbors) instead of rebuilding the whole list.  The bins of
+        the underlying :class:`~ase.neighborlist.CellList` are kept
+        between updates.  The number of full and partial rebuilds is
+        counted in *nfullupdates* and *npartialupdates*.
 
     Example::
 
@@ -755,14 +1228,18 @@ class NewPrimitiveNeighborList:
     """
 
     def __init__(self, cutoffs, skin=0.3, sorted=False, self_interaction=True,
-                 bothways=False, use_scaled_positions=False):
+                 bothways=False, use_scaled_positions=False,
+                 incremental=False):
         self.cutoffs = np.asarray(cutoffs) + skin
         self.skin = skin
         self.sorted = sorted
         self.self_interaction = self_interaction
         self.bothways = bothways
         self.nupdates = 0
+        self.nfullupdates = 0
+        self.npartialupdates = 0
         self.use_scaled_positions = use_scaled_positions
+        self.incremental = incremental
         self.nneighbors = 0
         self.npbcneighbors = 0
 
@@ -773,12 +1250,21 @@ class NewPrimitiveNeighborList:
             self.build(pbc, cell, positions, numbers=numbers)
             return True
 
-        if ((self.pbc != pbc).any() or (self.cell != cell).any() or
-            ((self.positions - positions)**2).sum(1).max() > self.skin**2):
+        if (self.pbc != pbc).any() or (self.cell != cell).any():
             self.build(pbc, cell, positions, numbers=numbers)
             return True
 
-        return False
+        moved = np.flatnonzero(
+            ((self.positions - positions)**2).sum(1) > self.skin**2)
+        if len(moved) == 0:
+            return False
+
+        # A partial rebuild only pays off when few atoms have moved.
+        if self.incremental and len(moved) <= len(positions) // 4:
+            self.partial_build(positions, moved)
+        else:
+            self.build(pbc, cell, positions, numbers=numbers)
+        return True
 
     def build(self, pbc, cell, positions, numbers=None):
         """Build the list.
@@ -787,13 +1273,67 @@ class NewPrimitiveNeighborList:
         self.cell = np.array(cell, copy=True)
         self.positions = np.array(positions, copy=True)
 
-        pair_first, pair_second, offset_vec = \
-            primitive_neighbor_list(
-                'ijS', pbc, cell, positions, self.cutoffs, numbers=numbers,
-                self_interaction=self.self_interaction,
-                use_scaled_positions=self.use_scaled_positions)
-
-        if len(positions) > 0 and not self.bothways:
+        if self.incremental:
+            # Keep the bins and the full list around for partial rebuilds.
+            self.cell_list = CellList(pbc, cell, self.cutoffs,
+                                      self_interaction=self.self_interaction)
+            self.cell_list.update(
+                positions, use_scaled_positions=self.use_scaled_positions)
+            pair_first, pair_second, offset_vec = \
+                self.cell_list.neighbor_list('ijS')
+            self.full_pairs = (pair_first, pair_second, offset_vec)
+        else:
+            pair_first, pair_second, offset_vec = \
+                primitive_neighbor_list(
+                    'ijS', pbc, cell, positions, self.cutoffs,
+                    numbers=numbers,
+                    self_interaction=self.self_interaction,
+                    use_scaled_positions=self.use_scaled_positions)
+
+        self._set_pairs(pair_first, pair_second, offset_vec)
+        self.nfullupdates += 1
+
+    def partial_build(self, positions, moved):
+        """Rebuild the list for the atoms in *moved* only.
+
+        All pairs involving a moved atom are removed and the rows of
+        the moved atoms are recomputed.  The other atoms keep the
+        positions they had when their rows were last built, so the
+        skin criterion stays valid for them."""
+        pair_first, pair_second, offset_vec = self.full_pairs
+
+        self.positions[moved] = positions[moved]
+        self.cell_list.update(self.positions, moved=moved,
+                              use_scaled_positions=self.use_scaled_positions)
+
+        is_moved = np.zeros(len(self.positions), bool)
+        is_moved[moved] = True
+        keep = ~(is_moved[pair_first] | is_moved[pair_second])
+
+        new_first, new_second, new_offset = \
+            self.cell_list.neighbor_list('ijS', indices=moved)
+
+        # Add the same pairs seen from the atoms that did not move.
+        mirror = ~is_moved[new_second]
+        pair_first = np.concatenate([pair_first[keep], new_first,
+                                     new_second[mirror]])
+        pair_second = np.concatenate([pair_second[keep], new_second,
+                                      new_first[mirror]])
+        offset_vec = np.concatenate([offset_vec[keep], new_offset,
+                                     -new_offset[mirror]])
+
+        mask = np.argsort(pair_first, kind='stable')
+        pair_first = pair_first[mask]
+        pair_second = pair_second[mask]
+        offset_vec = offset_vec[mask]
+        self.full_pairs = (pair_first, pair_second, offset_vec)
+
+        self._set_pairs(pair_first, pair_second, offset_vec)
+        self.npartialupdates += 1
+
+    def _set_pairs(self, pair_first, pair_second, offset_vec):
+        natoms = len(self.positions)
+        if natoms > 0 and not self.bothways:
             offset_x, offset_y, offset_z = offset_vec.T
 
             mask = offset_z > 0
@@ -807,7 +1347,7 @@ class NewPrimitiveNeighborList:
             pair_second = pair_second[mask]
             offset_vec = offset_vec[mask]
 
-        if len(positions) > 0 and self.sorted:
+        if natoms > 0 and self.sorted:
             mask = np.argsort(pair_first * len(pair_first) +
                               pair_second)
             pair_first = pair_first[mask]
@@ -819,7 +1359,7 @@ class NewPrimitiveNeighborList:
         self.offset_vec = offset_vec
 
         # Compute the index array point to the first neighbor
-        self.first_neigh = first_neighbors(len(positions), pair_first)
+        self.first_neigh = first_neighbors(natoms, pair_first)
 
         self.nupdates += 1
 
@@ -1026,6 +1566,10 @@ class NeighborList:
         Define which implementation to use. Older and quadratically-scaling
         :class:`~ase.neighborlist.PrimitiveNeighborList` or newer and
         linearly-scaling :class:`~ase.neighborlist.NewPrimitiveNeighborList`.
+    kwargs: arbitrary number of options
+        Will be passed to the constructor of the *primitive* class, e.g.
+        ``incremental=True`` for
+        :class:`~ase.neighborlist.NewPrimitiveNeighborList`.
 
     Example::
 
@@ -1035,10 +1579,10 @@ class NeighborList:
     """
 
     def __init__(self, cutoffs, skin=0.3, sorted=False, self_interaction=True,
-                 bothways=False, primitive=PrimitiveNeighborList):
+                 bothways=False, primitive=PrimitiveNeighborList, **kwargs):
         self.nl = primitive(cutoffs, skin, sorted,
                             self_interaction=self_interaction,
-                            bothways=bothways)
+                            bothways=bothways, **kwargs)
 
     def update(self, atoms):
         """
@@ -0,0 +1,88 @@
+import io
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from ase.calculators.socketio import IPIProtocol
+
+
+def serve(protocol, nsteps, morebytes):
+    """Answer with forces and virial derived from the positions."""
+    for _ in range(nsteps):
+        assert protocol.recvmsg() == 'STATUS'
+        protocol.sendmsg('READY')
+        assert protocol.recvmsg() == 'POSDATA'
+        cell, icell, positions = protocol.recvposdata()
+        assert protocol.recvmsg() == 'STATUS'
+        protocol.sendmsg('HAVEDATA')
+        assert protocol.recvmsg() == 'GETFORCE'
+        protocol.sendforce(positions.sum(), -2 * positions, cell,
+                           morebytes=morebytes)
+
+
+def test_ipi_protocol():
+    sock1, sock2 = socket.socketpair()
+    sock1.settimeout(5.0)
+    sock2.settimeout(5.0)
+    server = IPIProtocol(sock1)
+    client = IPIProtocol(sock2)
+    morebytes = np.frombuffer(b'hello', np.byte)
+    rng = np.random.RandomState(17)
+    configurations = []
+    # The number of atoms changes, so buffers are both reused and grown
+    for natoms in [5, 3, 1000, 7]:
+        cell = rng.rand(3, 3) + 4 * np.eye(3)
+        configurations.append((rng.rand(natoms, 3), cell))
+
+    thread = threading.Thread(target=serve,
+                              args=(client, len(configurations), morebytes))
+    thread.start()
+    try:
+        for positions, cell in configurations:
+            results = server.calculate(positions, cell)
+            assert results['energy'] == pytest.approx(positions.sum(),
+                                                      rel=1e-14)
+            assert results['forces'] == pytest.approx(-2 * positions,
+                                                      rel=1e-14)
+            assert results['virial'] == pytest.approx(cell, rel=1e-14)
+            assert results['morebytes'].tobytes() == b'hello'
+            # Results must not share memory with the receive buffers:
+            assert results['forces'].flags.owndata
+    finally:
+        thread.join()
+        sock1.close()
+        sock2.close()
+
+    n = len(configurations)
+    assert server.timings['STATUS'][0] == 2 * n
+    assert server.timings['POSDATA'][0] == n
+    assert server.timings['GETFORCE'][0] == n
+    assert client.timings['POSDATA'][:2] == server.timings['POSDATA'][:2]
+    # (The server also counts the 12-byte GETFORCE request)
+    assert (client.timings['FORCEREADY'][1] + 12 * n
+            == server.timings['GETFORCE'][1])
+
+    out = io.StringIO()
+    server.write_timings(out)
+    assert 'GETFORCE' in out.getvalue()
+
+
+def test_zero_morebytes():
+    # An extra payload of zero bytes is still data:
+    sock1, sock2 = socket.socketpair()
+    sock1.settimeout(5.0)
+    sock2.settimeout(5.0)
+    server = IPIProtocol(sock1)
+    client = IPIProtocol(sock2)
+    thread = threading.Thread(target=serve,
+                              args=(client, 1, np.zeros(3, np.byte)))
+    thread.start()
+    try:
+        results = server.calculate(np.zeros((2, 3)), 5 * np.eye(3))
+    finally:
+        thread.join()
+        sock1.close()
+        sock2.close()
+    assert results['morebytes'].tobytes() == b'\0\0\0'
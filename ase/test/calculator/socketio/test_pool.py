@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+
+import pytest
+
+from ase.build import bulk
+from ase.calculators.socketio import (SocketClient, SocketClosed,
+                                      SocketServerPool, PySocketIOClient)
+from ase.calculators.emt import EMT
+from ase.cluster.icosahedron import Icosahedron
+from ase.stress import full_3x3_to_voigt_6_stress
+
+pid = os.getpid()
+timeout = 20.0
+
+
+def getimages(n=12):
+    images = []
+    for i in range(n):
+        atoms = Icosahedron('Cu', 2)
+        atoms.rattle(0.05, seed=i)
+        images.append(atoms)
+    return images
+
+
+def run_client(unixsocket, ncalculations=None):
+    atoms = getimages(1)[0]
+    atoms.calc = EMT()
+    client = SocketClient(unixsocket=unixsocket, timeout=timeout)
+    for n, _ in enumerate(client.irun(atoms, use_stress=False)):
+        if n + 1 == ncalculations:
+            # Die in the middle of a calculation
+            break
+    client.close()
+
+
+def start_client(unixsocket, ncalculations=None):
+    thread = threading.Thread(target=run_client,
+                              args=(unixsocket, ncalculations))
+    thread.start()
+    return thread
+
+
+def check(images, results):
+    assert len(results) == len(images)
+    for atoms, result in zip(images, results):
+        atoms.calc = EMT()
+        assert result['energy'] == pytest.approx(
+            atoms.get_potential_energy(), abs=1e-10)
+        assert result['forces'] == pytest.approx(atoms.get_forces(),
+                                                 abs=1e-10)
+
+
+def test_pool_threads():
+    unixsocket = f'ase_test_pool_threads_{pid}'
+    images = getimages()
+    with SocketServerPool(unixsocket=unixsocket, timeout=timeout) as pool:
+        threads = [start_client(unixsocket) for _ in range(3)]
+        pool.wait_for_clients(3, timeout=timeout)
+        futures = [pool.submit(atoms) for atoms in images]
+        results = [future.result(timeout=timeout) for future in futures]
+        assert sum(pool.ncalculations) == len(images)
+        assert pool.nclients == 3
+    for thread in threads:
+        thread.join()
+    check(images, results)
+
+
+def test_pool_lost_client():
+    unixsocket = f'ase_test_pool_lost_{pid}'
+    images = getimages()
+    with SocketServerPool(unixsocket=unixsocket, timeout=timeout) as pool:
+        threads = [start_client(unixsocket, ncalculations=2)]
+        pool.wait_for_clients(1, timeout=timeout)
+        futures = [pool.submit(atoms) for atoms in images]
+        # The first client finishes one calculation and dies during the
+        # second, which is queued again for the next client:
+        futures[0].result(timeout=timeout)
+        t0 = time.time()
+        while pool.nclients > 0:
+            assert time.time() - t0 < timeout
+            time.sleep(0.01)
+        assert not futures[1].done()
+        threads.append(start_client(unixsocket))
+        results = [future.result(timeout=timeout) for future in futures]
+        assert pool.ncalculations == [1, len(images) - 1]
+    for thread in threads:
+        thread.join()
+    check(images, results)
+
+
+def test_pool_close_after_lost_client():
+    unixsocket = f'ase_test_pool_close_lost_{pid}'
+    images = getimages(4)
+    with SocketServerPool(unixsocket=unixsocket, timeout=timeout) as pool:
+        thread = start_client(unixsocket, ncalculations=2)
+        pool.wait_for_clients(1, timeout=timeout)
+        futures = [pool.submit(atoms) for atoms in images]
+        futures[0].result(timeout=timeout)
+        t0 = time.time()
+        while pool.nclients > 0:
+            assert time.time() - t0 < timeout
+            time.sleep(0.01)
+    thread.join()
+    # The job of the lost client was running and cannot be cancelled:
+    with pytest.raises(RuntimeError, match='closed'):
+        futures[1].result(timeout=timeout)
+    assert all(future.cancelled() for future in futures[2:])
+
+
+def test_pool_close_sends_exit():
+    unixsocket = f'ase_test_pool_exit_{pid}'
+    messages = []
+
+    def listen():
+        client = SocketClient(unixsocket=unixsocket, timeout=timeout)
+        messages.append(client.protocol.recvmsg())
+        client.close()
+
+    with SocketServerPool(unixsocket=unixsocket, timeout=timeout) as pool:
+        thread = threading.Thread(target=listen)
+        thread.start()
+        pool.wait_for_clients(1, timeout=timeout)
+    thread.join()
+    assert messages == ['EXIT']
+
+
+def test_pool_broken_client():
+    unixsocket = f'ase_test_pool_broken_{pid}'
+    images = getimages(4)
+    messages = []
+
+    def answer_nonsense():
+        client = SocketClient(unixsocket=unixsocket, timeout=timeout)
+        assert client.protocol.recvmsg() == 'STATUS'
+        client.protocol.sendmsg('NONSENSE')
+        # The server must hang up instead of sending more work:
+        try:
+            messages.append(client.protocol.recvmsg())
+        except SocketClosed:
+            messages.append(None)
+        client.close()
+
+    with SocketServerPool(unixsocket=unixsocket, timeout=timeout) as pool:
+        threads = [threading.Thread(target=answer_nonsense)]
+        threads[0].start()
+        pool.wait_for_clients(1, timeout=timeout)
+        futures = [pool.submit(atoms) for atoms in images]
+        # The failed calculation is reported and the client is dropped:
+        with pytest.raises(AssertionError, match='NONSENSE'):
+            futures[0].result(timeout=timeout)
+        assert pool.nclients == 0
+        threads.append(start_client(unixsocket))
+        results = [future.result(timeout=timeout) for future in futures[1:]]
+        assert pool.ncalculations == [0, len(images) - 1]
+    for thread in threads:
+        thread.join()
+    assert messages == [None]
+    check(images[1:], results)
+
+
+def test_pool_processes():
+    unixsocket = f'ase_test_pool_processes_{pid}'
+    images = []
+    for i in range(6):
+        atoms = bulk('Cu', cubic=True)
+        atoms.rattle(0.05, seed=i)
+        images.append(atoms)
+    with SocketServerPool(unixsocket=unixsocket, timeout=timeout) as pool:
+        pool.launch_clients(PySocketIOClient(EMT), images[0], 2)
+        results = pool.map(images)
+    check(images, results)
+    for atoms, result in zip(images, results):
+        stress = -result['virial'] / atoms.get_volume()
+        assert full_3x3_to_voigt_6_stress(stress) == pytest.approx(
+            atoms.get_stress(), abs=1e-10)
+    assert all(proc.returncode == 0 for proc in pool.procs)
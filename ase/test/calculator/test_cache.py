@@ -0,0 +1,88 @@
+import pytest
+
+from ase.build import bulk
+from ase.calculators.cache import CachedCalculator, ResultCache
+from ase.calculators.emt import EMT
+from ase.calculators.lj import LennardJones
+
+
+class CountingEMT(EMT):
+    ncalculations = 0
+
+    def calculate(self, *args, **kwargs):
+        EMT.calculate(self, *args, **kwargs)
+        self.ncalculations += 1
+
+
+@pytest.fixture
+def atoms():
+    atoms = bulk('Cu', cubic=True)
+    atoms.rattle(0.05, seed=42)
+    return atoms
+
+
+def test_cached_calculator(testdir, atoms):
+    emt = CountingEMT()
+    atoms.calc = CachedCalculator(emt, 'cache.db')
+    e1 = atoms.get_potential_energy()
+    f1 = atoms.get_forces()
+    positions = atoms.get_positions()
+
+    atoms.positions[0, 0] += 0.1
+    e2 = atoms.get_potential_energy()
+    assert e2 != e1
+
+    # Back to the first structure (up to the tolerance):
+    atoms.positions = positions + 1e-11
+    assert atoms.get_potential_energy() == e1
+    assert atoms.get_forces() == pytest.approx(f1, abs=1e-14)
+    # (EMT calculates the forces together with the energy)
+    assert emt.ncalculations == 2
+    stats = atoms.calc.get_statistics()
+    assert stats['hits'] == 1 and stats['misses'] == 2
+
+    # A stress calculation needs the calculator again:
+    atoms.get_stress()
+    assert emt.ncalculations == 3
+
+    # The results are still there after a restart:
+    atoms.calc.cache.close()
+    emt = CountingEMT()
+    atoms.calc = CachedCalculator(emt, 'cache.db')
+    assert atoms.get_stress() == pytest.approx(
+        atoms.calc.calc.get_stress(atoms))
+    atoms.calc.results.clear()
+    assert atoms.get_potential_energy() == e1
+    assert atoms.calc.hits == 2 and atoms.calc.misses == 0
+    assert emt.ncalculations == 1  # only from the comparison above
+    atoms.calc.cache.close()
+
+
+def test_cache_parameters(testdir, atoms):
+    cache = ResultCache('cache.db')
+    energies = []
+    for sigma in [2.3, 2.4, 2.3]:
+        atoms.calc = CachedCalculator(LennardJones(sigma=sigma), cache)
+        energies.append(atoms.get_potential_energy())
+        assert atoms.calc.hits == (sigma == 2.3 and len(energies) == 3)
+    assert energies[0] == energies[2] != energies[1]
+    assert len(cache) == 2
+    cache.close()
+
+
+def test_cache_eviction(testdir, atoms):
+    cache = ResultCache('cache.db')
+    cache.put('a', {'energy': 1.0, 'forces': atoms.positions})
+    size = cache.get_size()
+    cache.close()
+
+    cache = ResultCache('cache.db', maxsize=2.5 * size)
+    cache.put('b', {'energy': 2.0, 'forces': atoms.positions})
+    cache.get('a')
+    cache.put('c', {'energy': 3.0, 'forces': atoms.positions})
+    # b is least recently used:
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a')['energy'] == 1.0
+    assert cache.get('c')['forces'] == pytest.approx(atoms.positions)
+    cache.close()
@@ -1,6 +1,13 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+
+import numpy as np
 import pytest
-from ase.calculators.calculator import Calculator
+
+from ase.build import bulk
+from ase.calculators.calculator import (Calculator, FileIOCalculator,
+                                        CalculationFailed)
 
 
 def test_directory_and_label():
@@ -66,3 +73,50 @@ def test_deprecated_get_spin_polarized():
     with pytest.warns(FutureWarning):
         spinpol = calc.get_spin_polarized()
     assert spinpol is False
+
+
+class SleepyCalculator(FileIOCalculator):
+    """Energy is the sum of the positions, after a short nap."""
+    implemented_properties = ['energy']
+    name = 'sleepy'
+    script = ('import time, numpy as np; t0 = time.time(); time.sleep(0.3); '
+              "np.savetxt('energy', [np.loadtxt('positions').sum(), "
+              't0, time.time()])')
+    command = f'"{sys.executable}" -c "{script}"'
+
+    def write_input(self, atoms, properties=None, system_changes=None):
+        FileIOCalculator.write_input(self, atoms, properties, system_changes)
+        np.savetxt(Path(self.directory) / 'positions', atoms.positions)
+
+    def read_results(self):
+        energy, start, end = np.loadtxt(Path(self.directory) / 'energy')
+        self.results['energy'] = energy
+        self.interval = (start, end)
+
+
+def test_fileio_submit(testdir):
+    calc = SleepyCalculator(directory='jobs')
+    images = [bulk('Cu') * (1, 1, n) for n in range(1, 9)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [calc.submit(atoms, executor=executor) for atoms in images]
+        results = [future.result() for future in futures]
+
+    directories = set()
+    for atoms, result in zip(images, results):
+        assert result.calc is not calc
+        assert (result.get_potential_energy()
+                == pytest.approx(atoms.positions.sum()))
+        assert result.calc.directory.startswith('jobs')
+        directories.add(result.calc.directory)
+    assert len(directories) == len(images)
+    assert calc.atoms is None
+
+    # The jobs must overlap:
+    intervals = sorted(result.calc.interval for result in results)
+    assert any(start2 < end1 for (start1, end1), (start2, end2)
+               in zip(intervals[:-1], intervals[1:]))
+
+    calc.command = '"{}" -c "raise SystemExit(3)"'.format(sys.executable)
+    future = calc.submit(images[0], directory='failed')
+    with pytest.raises(CalculationFailed):
+        future.result()
@@ -0,0 +1,222 @@
+import os
+
+import numpy as np
+import pytest
+
+from ase import Atoms
+from ase.build import bulk, molecule
+from ase.calculators.dftd3 import DFTD3, D3Reference, NumpyDFTD3
+from ase.calculators.test import numeric_forces, numeric_stress
+from ase.data.s22 import create_s22_system
+from ase.units import Bohr, Hartree
+
+zero = dict(s6=1.0, sr6=1.217, s8=0.722, sr8=1.0, alpha6=14.0)
+bj = dict(damping='bj', s6=1.0, a1=0.4289, s8=0.7875, a2=4.4407,
+          alpha6=14.0)
+
+
+@pytest.fixture
+def reference():
+    """Made-up reference data for H-Ne.
+
+    H has one reference system, the others two."""
+    rng = np.random.RandomState(42)
+    n = 11
+    cn = np.empty((n, 5))
+    cn[:] = np.nan
+    cn[1:, 0] = 0.0
+    cn[2:, 1] = 1.0 + 3 * rng.rand(n - 2)
+    c6atom = 5 + 45 * rng.rand(n, 5)
+    c6 = np.sqrt(c6atom[:, None, :, None] * c6atom[None, :, None, :])
+    rcov = (0.6 + 0.9 * rng.rand(n)) / Bohr
+    r0ab = 1.8 * (rcov[:, None] + rcov[None, :])
+    r2r4 = 1.5 + 2.5 * rng.rand(n)
+    return D3Reference(c6, cn, r0ab, r2r4, rcov)
+
+
+def test_two_atoms(reference):
+    r = 3.0
+    atoms = Atoms('H2', [(0, 0, 0), (0, 0, r)])
+    atoms.calc = NumpyDFTD3(reference=reference, **zero)
+    energy = atoms.get_potential_energy()
+
+    c6 = reference.c6[1, 1, 0, 0]
+    c8 = 3 * c6 * reference.r2r4[1]**2
+    r0 = reference.r0ab[1, 1]
+    r /= Bohr
+    f6 = 1 / (1 + 6 * (r / (zero['sr6'] * r0))**-14)
+    f8 = 1 / (1 + 6 * (r / r0)**-16)
+    assert energy == pytest.approx(
+        -(c6 * f6 / r**6 + zero['s8'] * c8 * f8 / r**8) * Hartree,
+        rel=1e-12)
+
+
+@pytest.mark.parametrize('parameters', [zero, bj])
+def test_molecule_forces(reference, parameters):
+    atoms = molecule('CH3CH2OH')
+    atoms.rattle(0.1, seed=1)
+    atoms.calc = NumpyDFTD3(reference=reference, abc=True, **parameters)
+    e3 = atoms.get_potential_energy()
+    forces = atoms.get_forces()
+    assert forces == pytest.approx(
+        numeric_forces(atoms, d=1e-3, stencil=4), abs=1e-7)
+    assert forces.sum(axis=0) == pytest.approx(0, abs=1e-12)
+
+    atoms.calc.set(abc=False)
+    assert atoms.get_potential_energy() != e3
+
+
+def test_periodic(reference):
+    atoms = bulk('C', cubic=True)
+    atoms.rattle(0.05, seed=2)
+    atoms.calc = NumpyDFTD3(reference=reference, abc=True, cutoff=8.0,
+                            cnthr=4.0, **bj)
+    # Small steps so that no pairs cross the cutoffs:
+    assert atoms.get_stress() == pytest.approx(
+        numeric_stress(atoms, d=1e-6), abs=1e-8)
+    assert atoms.get_forces() == pytest.approx(
+        numeric_forces(atoms, d=1e-5), abs=1e-7)
+
+
+def test_images(reference):
+    # Molecule in a large box gives the same as without periodic images:
+    atoms = molecule('H2O')
+    atoms.center(vacuum=10.0)
+    parameters = dict(reference=reference, abc=True, cutoff=10.0, cnthr=6.0,
+                      **zero)
+    atoms.calc = NumpyDFTD3(**parameters)
+    energy = atoms.get_potential_energy()
+    forces = atoms.get_forces()
+    atoms.pbc = True
+    atoms.calc = NumpyDFTD3(**parameters)
+    assert atoms.get_potential_energy() == pytest.approx(energy, abs=1e-14)
+    assert atoms.get_forces() == pytest.approx(forces, abs=1e-14)
+    assert atoms.get_stress() == pytest.approx(
+        numeric_stress(atoms, d=1e-4), abs=1e-8)
+
+
+def test_backend(reference, tmp_path, monkeypatch):
+    filename = tmp_path / 'd3.npz'
+    reference.write(filename)
+    monkeypatch.setenv('ASE_DFTD3_REFERENCE', str(filename))
+    atoms = molecule('H2O')
+
+    atoms.calc = DFTD3(backend='numpy', **bj)
+    assert isinstance(atoms.calc.dftd3, NumpyDFTD3)
+    energy = atoms.get_potential_energy()
+    atoms.calc = NumpyDFTD3(reference=reference, **bj)
+    assert atoms.get_potential_energy() == energy
+
+    # Parameters for the XC functional from the table:
+    atoms.calc = DFTD3(backend='numpy', xc='pbe')
+    assert atoms.get_potential_energy() == pytest.approx(
+        NumpyDFTD3(reference=reference, **zero).get_potential_energy(atoms),
+        rel=1e-14)
+    with pytest.raises(NotImplementedError):
+        DFTD3(backend='numpy', damping='zerom')
+    with pytest.raises(ValueError):
+        atoms.calc = DFTD3(backend='numpy', reference=reference, **zero)
+        atoms.numbers[0] = 11
+        atoms.get_potential_energy()
+
+
+def test_xc(reference):
+    atoms = molecule('CH3CH2OH')
+    atoms.calc = NumpyDFTD3(reference=reference, damping='bj')
+    energy = atoms.get_potential_energy()
+    atoms.calc = NumpyDFTD3(reference=reference, **bj)
+    assert atoms.get_potential_energy() == pytest.approx(energy, rel=1e-14)
+
+    atoms.calc = NumpyDFTD3(reference=reference, xc='B3-LYP')
+    energy = atoms.get_potential_energy()
+    atoms.calc = NumpyDFTD3(reference=reference, s6=1.0, sr6=1.261,
+                            s8=1.703, sr8=1.0, alpha6=14.0)
+    assert atoms.get_potential_energy() == pytest.approx(energy, rel=1e-14)
+
+    for parameters in [dict(xc='does_not_exist'),
+                       dict(xc='revpbe', damping='bjm')]:
+        atoms.calc = NumpyDFTD3(reference=reference, **parameters)
+        with pytest.raises(ValueError, match='No .* damping parameters'):
+            atoms.get_potential_energy()
+    atoms.calc = NumpyDFTD3(reference=reference, tz=True)
+    with pytest.raises(NotImplementedError):
+        atoms.get_potential_energy()
+
+
+def test_from_dftd3_program(tmp_path):
+    # Layout of the source code of dftd3 version 3.1 (C6 in pars.f as
+    # rows of C6, Z1, Z2, CN1, CN2 and the radii in dftd3.f):
+    (tmp_path / 'pars.f').write_text("""\
+      subroutine setpars(pars)
+      real*8 pars(20)
+c     pars(1:5)=(/ 9.0, 1.0, 1.0, 0.0, 0.0 /)
+      pars(   1:  20)=(/
+     .   3.0267000D+00,  1.0000000D+00,  1.0000000D+00,  9.1180000D-01,
+     .   9.1180000D-01,  2.0835000D+00,  2.0000000D+00,  1.0000000D+00,
+     .   0.0000000D+00,  9.1180000D-01,  1.5583000D+00,  2.0000000D+00,
+     .   2.0000000D+00,  0.0000000D+00,  0.0000000D+00,  1.7500000D+00,
+     .   1.0200000D+02,  1.0000000D+00,  1.5000000D+00,  9.1180000D-01
+     ./)
+      end
+""")
+    (tmp_path / 'dftd3.f').write_text("""\
+      subroutine setr0ab(max_elem,autoang,r)
+      real*8 r0ab(3)
+      r0ab(1:3)=(/
+     .   2.1823,  1.8547,  1.7347 /)
+      end
+      data r2r4 / 2.00734898,  1.56637132 /
+! covalent radii, scaled by 4/3 and in Bohr
+      data rcov/
+     . 0.80628308, 1.15903197 /
+""")
+    ref = D3Reference.read(tmp_path)
+    assert ref.c6.shape == (3, 3, 2, 2)
+    assert ref.c6[1, 1, 0, 0] == 3.0267
+    assert ref.c6[2, 1, 0, 0] == ref.c6[1, 2, 0, 0] == 2.0835
+    assert ref.c6[2, 1, 1, 0] == ref.c6[1, 2, 0, 1] == 1.75
+    assert ref.c6[1, 1, 1, 1] == 0.0
+    assert ref.cn[1] == pytest.approx([0.9118, np.nan], nan_ok=True)
+    assert ref.cn[2] == pytest.approx([0.0, 1.5])
+    assert ref.r0ab[1:, 1:] * Bohr == pytest.approx(
+        np.array([[2.1823, 1.8547], [1.8547, 1.7347]]))
+    assert ref.r2r4[1:] == pytest.approx([2.00734898, 1.56637132])
+    assert ref.rcov[1:] == pytest.approx([0.60471231, 0.86927398])
+
+
+@pytest.fixture(scope='module')
+def d3_reference():
+    """The reference data of the dftd3 program.
+
+    $ASE_DFTD3_REFERENCE is an .npz file or the source code of dftd3."""
+    if 'ASE_DFTD3_REFERENCE' not in os.environ:
+        pytest.skip('No DFT-D3 reference data: set $ASE_DFTD3_REFERENCE')
+    return D3Reference.read()
+
+
+# Energies of the adenine-thymine stack from the s22 set calculated with
+# version 3.1 of the dftd3 program (see test_dftd3.py):
+@pytest.mark.parametrize('parameters, energy', [
+    (dict(), -0.6681154466652238),
+    (dict(abc=True), -0.6528640090262864),
+    (dict(xc='revpbe'), -1.5274869363442936),
+    (dict(damping='bj'), -1.211193213979179),
+    (dict(damping='bj', abc=True), -1.1959417763402416),
+    (dict(damping='bjm'), -1.4662085277005799),
+    (dict(s6=1.1, sr6=1.1, s8=0.6, sr8=0.9, alpha6=13.0),
+     -1.082846357973487)])
+def test_s22(d3_reference, parameters, energy):
+    atoms = create_s22_system('Adenine-thymine_complex_stack')
+    atoms.calc = NumpyDFTD3(reference=d3_reference, **parameters)
+    # dftd3 3.1 uses a slightly different value of the Bohr radius:
+    assert atoms.get_potential_energy() == pytest.approx(energy, rel=2e-6)
+
+
+def test_diamond(d3_reference):
+    atoms = bulk('C')
+    atoms.calc = NumpyDFTD3(reference=d3_reference)
+    assert atoms.get_potential_energy() == pytest.approx(
+        -0.2160072476277501, rel=2e-6)
+    assert atoms.get_stress()[:3] == pytest.approx(0.0182329043326,
+                                                   rel=2e-6)
+    assert atoms.get_stress()[3:] == pytest.approx(0, abs=1e-12)
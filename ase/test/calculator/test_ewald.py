@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from ase.build import bulk
+from ase.calculators.ewald import Ewald, k_c
+from ase.calculators.lj import LennardJones
+from ase.calculators.mixing import SumCalculator
+
+
+def nacl(a=5.64):
+    atoms = bulk('NaCl', 'rocksalt', a=a, cubic=True)
+    atoms.set_initial_charges([1 if Z == 11 else -1 for Z in atoms.numbers])
+    return atoms
+
+
+@pytest.mark.parametrize('method', ['pme', 'ewald'])
+def test_madelung(method):
+    a = 5.64
+    atoms = nacl(a)
+    atoms.calc = Ewald(method=method, tolerance=1e-10, grid_spacing=0.5,
+                       order=8)
+    madelung = -atoms.get_potential_energy() / 4 / (k_c / (a / 2))
+    assert madelung == pytest.approx(1.747564594633, abs=1e-9)
+    assert abs(atoms.get_forces()).max() < 1e-10
+
+
+def test_ewald_pme():
+    atoms = nacl() * (2, 1, 1)
+    atoms.rattle(0.2, seed=1)
+    cell = atoms.cell @ (np.eye(3) + 0.05 * np.random.RandomState(0).rand(3, 3))
+    atoms.set_cell(cell, scale_atoms=True)
+    # with a net charge
+    atoms.set_initial_charges(0.7 * atoms.get_initial_charges() + 0.1)
+
+    results = []
+    for method in ['ewald', 'pme']:
+        atoms.calc = Ewald(method=method)
+        energy = atoms.get_potential_energy()
+        forces = atoms.get_forces()
+        stress = atoms.get_stress()
+        fn = atoms.calc.calculate_numerical_forces(atoms, 1e-4)
+        sn = atoms.calc.calculate_numerical_stress(atoms, 1e-5)
+        assert forces == pytest.approx(fn, abs=1e-7)
+        assert stress == pytest.approx(sn, abs=1e-7)
+        results.append((energy, forces, stress))
+
+    (e1, f1, s1), (e2, f2, s2) = results
+    assert e1 == pytest.approx(e2, abs=1e-3)
+    assert f1 == pytest.approx(f2, abs=1e-3)
+    assert s1 == pytest.approx(s2, abs=1e-5)
+
+
+def test_ewald_sum_calculator():
+    atoms = nacl()
+    atoms.rattle(0.1, seed=3)
+    ewald = Ewald()
+    lj = LennardJones(sigma=2.5, epsilon=0.01, rc=6.0)
+    atoms.calc = SumCalculator([ewald, lj])
+    energy = atoms.get_potential_energy()
+    forces = atoms.get_forces()
+
+    atoms.calc = Ewald()
+    e1 = atoms.get_potential_energy()
+    f1 = atoms.get_forces()
+    atoms.calc = LennardJones(sigma=2.5, epsilon=0.01, rc=6.0)
+    assert energy == pytest.approx(e1 + atoms.get_potential_energy())
+    assert forces == pytest.approx(f1 + atoms.get_forces())
+
+
+def test_ewald_not_periodic():
+    atoms = nacl()
+    atoms.pbc = [True, True, False]
+    atoms.calc = Ewald()
+    with pytest.raises(ValueError):
+        atoms.get_potential_energy()
@@ -0,0 +1,85 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from ase.build import bulk
+from ase.calculators.emt import EMT
+from ase.calculators.test import numeric_force, numeric_forces, numeric_stress
+
+
+class BatchEMT(EMT):
+    nbatches = 0
+
+    def get_potential_energy_batch(self, images, force_consistent=False):
+        self.nbatches += 1
+        energies = []
+        for atoms in images:
+            atoms.calc = EMT()
+            energies.append(atoms.get_potential_energy(
+                force_consistent=force_consistent))
+        return energies
+
+
+@pytest.fixture
+def atoms():
+    atoms = bulk('Cu', cubic=True) * (2, 1, 1)
+    atoms.rattle(0.05, seed=17)
+    atoms.set_cell(atoms.cell * 1.02, scale_atoms=True)
+    atoms.calc = EMT()
+    return atoms
+
+
+def test_numeric_forces(atoms):
+    positions = atoms.get_positions()
+    forces = numeric_forces(atoms, d=1e-3)
+    assert (atoms.positions == positions).all()
+    for a in range(len(atoms)):
+        for i in range(3):
+            assert forces[a, i] == pytest.approx(
+                numeric_force(atoms, a, i, 1e-3), abs=1e-9)
+
+    # With a large step, the 4-point stencil is much better and the
+    # error estimate tells how bad the 2-point stencil is:
+    f = atoms.get_forces()
+    f2 = numeric_forces(atoms, d=0.05)
+    f4, error = numeric_forces(atoms, d=0.05, stencil=4, error=True)
+    assert abs(f4 - f).max() < 0.1 * abs(f2 - f).max()
+    assert error == pytest.approx(abs(f2 - f), abs=0.1 * error.max())
+
+    with pytest.raises(ValueError):
+        numeric_forces(atoms, error=True)
+
+
+def test_numeric_stress(atoms):
+    stress = atoms.get_stress()
+    s2 = numeric_stress(atoms, d=0.01)
+    s4, error = numeric_stress(atoms, d=0.01, stencil=4, error=True)
+    assert abs(s4 - stress).max() < 0.1 * abs(s2 - stress).max()
+    assert (error >= 0).all() and error.shape == (6,)
+    s, error = numeric_stress(atoms, d=0.01, voigt=False, stencil=4,
+                              error=True)
+    assert s == pytest.approx(atoms.get_stress(voigt=False), abs=1e-5)
+    assert error.shape == (3, 3)
+
+
+@pytest.mark.parametrize('Executor', [ThreadPoolExecutor,
+                                      ProcessPoolExecutor])
+def test_numeric_executor(atoms, Executor):
+    forces = numeric_forces(atoms)
+    stress = numeric_stress(atoms, stencil=4)
+    with Executor(max_workers=2) as executor:
+        assert numeric_forces(atoms, executor=executor) == pytest.approx(
+            forces, abs=1e-9)
+        assert atoms.calc.calculate_numerical_stress(
+            atoms, stencil=4, executor=executor) == pytest.approx(
+                stress, abs=1e-9)
+
+
+def test_numeric_batch(atoms):
+    forces = numeric_forces(atoms, stencil=4)
+    stress = numeric_stress(atoms)
+    atoms.calc = BatchEMT()
+    assert numeric_forces(atoms, stencil=4) == pytest.approx(forces,
+                                                             abs=1e-9)
+    assert numeric_stress(atoms) == pytest.approx(stress, abs=1e-9)
+    assert atoms.calc.nbatches == 2
@@ -130,3 +130,47 @@ def test_bulk_stress():
     pressure = sum(stress[:3]) / 3
 
     assert pressure == reference_pressure
+
+
+def test_mixing_rules():
+    # compare two elements with the sum over all pairs of atoms
+    atoms = Atoms('ArKrAr', positions=[[0, 0, 0], [3.8, 0, 0], [0, 3.9, 0]])
+    sigma = {'Ar': 3.4, 'Kr': 3.6}
+    epsilon = {'Ar': 0.010, 'Kr': 0.014, ('Ar', 'Kr'): 0.011}
+    rc = 10.0
+
+    def lj(r, s, e):
+        return 4 * e * ((s / r) ** 12 - (s / r) ** 6 -
+                        (s / rc) ** 12 + (s / rc) ** 6)
+
+    for mixing in ['lorentz-berthelot', 'geometric']:
+        atoms.calc = LennardJones(sigma=sigma, epsilon=epsilon, rc=rc,
+                                  mixing=mixing)
+        if mixing == 'geometric':
+            s_ArKr = np.sqrt(3.4 * 3.6)
+        else:
+            s_ArKr = 3.5
+        distances = atoms.get_all_distances()
+        energy = (lj(distances[0, 1], s_ArKr, 0.011) +
+                  lj(distances[1, 2], s_ArKr, 0.011) +
+                  lj(distances[0, 2], 3.4, 0.010))
+        assert atoms.get_potential_energy() == pytest.approx(energy,
+                                                             rel=1e-12)
+
+    with pytest.raises(ValueError):
+        atoms.calc = LennardJones(sigma={'Ar': 3.4}, rc=rc)
+        atoms.get_potential_energy()
+
+
+def test_energy_leaves_forces():
+    # an energy request fills in the forces and the stress as well
+    atoms = bulk('Ar', cubic=True).repeat(2)
+    atoms.symbols[::3] = 'Kr'
+    atoms.rattle(0.1, seed=42)
+    kwargs = dict(sigma={'Ar': 3.4, 'Kr': 3.6},
+                  epsilon={'Ar': 0.010, 'Kr': 0.014}, rc=8.0)
+    for smooth in [False, True]:
+        atoms.calc = LennardJones(smooth=smooth, **kwargs)
+        atoms.get_potential_energy()
+        assert not atoms.calc.calculation_required(atoms,
+                                                   ['forces', 'stress'])
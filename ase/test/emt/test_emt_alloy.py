@@ -0,0 +1,30 @@
+import pytest
+
+from ase.build import bulk
+from ase.calculators.emt import EMT
+
+
+@pytest.fixture
+def alloy():
+    atoms = bulk('Cu', cubic=True).repeat((2, 2, 3))
+    atoms.symbols[::3] = 'Au'
+    atoms.symbols[1::4] = 'Pt'
+    atoms.rattle(0.1, seed=7)
+    atoms.calc = EMT()
+    return atoms
+
+
+def test_emt_alloy(alloy):
+    # Reference from the original per-pair loop implementation.
+    assert alloy.get_potential_energy() == pytest.approx(24.316389703318297,
+                                                         abs=1e-10)
+    assert alloy.get_potential_energies().sum() == \
+        pytest.approx(alloy.get_potential_energy(), abs=1e-10)
+    assert alloy.get_stress() == pytest.approx(
+        [-0.36691286, -0.36949985, -0.33324238,
+         -0.00321701, 0.01516758, 0.00554516], abs=1e-8)
+
+    forces = alloy.get_forces()
+    numerical = alloy.calc.calculate_numerical_forces(alloy, d=1e-5)
+    assert abs(forces - numerical).max() < 1e-6
+    assert abs(forces.sum(axis=0)).max() < 1e-10
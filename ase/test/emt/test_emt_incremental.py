@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from ase.build import bulk
+from ase.calculators.emt import EMT
+
+
+@pytest.fixture
+def atoms():
+    atoms = bulk('Cu', cubic=True).repeat((3, 3, 3))
+    atoms.symbols[::5] = 'Au'
+    rng = np.random.RandomState(17)
+    atoms.rattle(0.1, rng=rng)
+    return atoms
+
+
+def full_energy(atoms):
+    atoms = atoms.copy()
+    atoms.calc = EMT()
+    return atoms.get_potential_energy()
+
+
+def test_energy_change_move(atoms):
+    calc = EMT()
+    e0 = full_energy(atoms)
+    new = atoms.positions[7] + [0.3, -0.2, 0.4]
+    de = calc.get_energy_change(atoms, [7], positions=[new])
+    atoms.positions[7] = new
+    assert de == pytest.approx(full_energy(atoms) - e0, abs=1e-10)
+
+
+def test_energy_change_swap(atoms):
+    calc = EMT()
+    e0 = full_energy(atoms)
+    a, b = 0, 1
+    assert atoms.numbers[a] != atoms.numbers[b]
+    numbers = atoms.numbers[[b, a]]
+    de = calc.get_energy_change(atoms, [a, b], numbers=numbers)
+    # The trial swap must leave the calculator state untouched.
+    assert calc.get_energy_change(atoms, [a, b], numbers=numbers) == de
+    atoms.numbers[[a, b]] = numbers
+    assert de == pytest.approx(full_energy(atoms) - e0, abs=1e-10)
+
+
+def test_incremental_energies(atoms):
+    atoms.calc = EMT()
+    atoms.get_potential_energy()
+    rng = np.random.RandomState(42)
+    for step in range(10):
+        a = rng.randint(len(atoms))
+        atoms.positions[a] += rng.normal(scale=0.3, size=3)
+        if step % 3 == 0:
+            atoms.numbers[[a, 0]] = atoms.numbers[[0, a]]
+        energies = atoms.get_potential_energies()
+        energy = atoms.get_potential_energy()
+        ref = atoms.copy()
+        ref.calc = EMT()
+        assert energy == pytest.approx(ref.get_potential_energy(), abs=1e-9)
+        assert energies == pytest.approx(ref.get_potential_energies(),
+                                         abs=1e-9)
+    # Forces trigger a full calculation.
+    forces = atoms.get_forces()
+    assert forces == pytest.approx(ref.get_forces(), abs=1e-10)
+
+
+def test_energy_leaves_forces(atoms):
+    # Callers that ask for the energy and then the forces must not pay
+    # for two full calculations:
+    atoms.calc = EMT()
+    atoms.get_potential_energy()
+    assert 'forces' in atoms.calc.results
+    assert not atoms.calc.calculation_required(atoms, ['forces'])
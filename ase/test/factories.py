@@ -566,7 +566,8 @@ class NoSuchCalculator(Exception):
 
 class Factories:
     all_calculators = set(calculator_names)
-    builtin_calculators = {'eam', 'emt', 'ff', 'lj', 'morse', 'tip3p', 'tip4p'}
+    builtin_calculators = {'eam', 'emt', 'ewald', 'ff', 'lj', 'morse',
+                           'tip3p', 'tip4p'}
     autoenabled_calculators = {'asap'} | builtin_calculators
 
     # TODO: Port calculators to use factories.  As we do so, remove names
@@ -578,7 +579,6 @@ class Factories:
         'crystal',
         'demon',
         'demonnano',
-        'dftd3',
         'dmol',
         'exciting',
         'fleur',
@@ -3,6 +3,7 @@
 # (which is also included in oi.py test case)
 # maintained by James Kermode <james.kermode@gmail.com>
 
+import os
 from pathlib import Path
 import numpy as np
 import pytest
@@ -369,3 +370,80 @@ H        0.00000000      -0.76323900      -0.47704700  0""")
     a = ase.io.read('movemask.xyz')
     assert isinstance(a.constraints[0], FixAtoms)
     assert np.all(a.constraints[0].index == [1, 2])
+
+
+def test_frame_index(images):
+    images = [atoms * (1, 1, n) for atoms in images for n in [1, 2, 3]] * 3
+    ase.io.write('multi.xyz', images, vec_cell=True)
+    with open('multi.xyz', 'rb') as fd:
+        index = extxyz.XYZIndex()
+        index.update(fd, 5)
+        assert len(index) == 5 and not index.complete
+        index.update(fd, blocksize=17)
+        assert index.complete
+        for offset, natoms, nvec in index.frames:
+            fd.seek(offset)
+            assert int(fd.readline()) == natoms
+    assert (index.frames['natoms'] == [len(a) for a in images]).all()
+
+    all_images = ase.io.read('multi.xyz', ':')
+    assert len(all_images) == len(images)
+    for i, s in [(-1, -1), ('12', 12), ('3:20:4', slice(3, 20, 4)),
+                 ('-5:-1', slice(-5, -1))]:
+        assert ase.io.read('multi.xyz', i, index_file='multi.idx') == (
+            all_images[s])
+    assert len(extxyz.XYZIndex.read('multi.idx')) == len(images)
+
+    # Same size, but different content and modification time:
+    ase.io.write('multi.xyz', images[::-1], vec_cell=True)
+    mtime = Path('multi.xyz').stat().st_mtime + 1
+    os.utime('multi.xyz', (mtime, mtime))
+    assert ase.io.read('multi.xyz', '5:6', index_file='multi.idx') == (
+        all_images[-6:-5])
+    assert len(extxyz.XYZIndex.read('multi.idx')) == 7
+
+    # Partial index from file is extended and stored:
+    extxyz._xyz_indices.clear()
+    assert ase.io.read('multi.xyz', index_file='multi.idx') == all_images[0]
+    assert len(extxyz.XYZIndex.read('multi.idx')) == len(images)
+
+
+def test_frame_index_cache(monkeypatch, images):
+    # Only the indices of the most recently read files are kept:
+    monkeypatch.setattr(extxyz, '_xyz_indices', {})
+    monkeypatch.setattr(extxyz, '_max_xyz_indices', 2)
+    keys = []
+    for name in ['a.xyz', 'b.xyz', 'c.xyz', 'a.xyz']:
+        ase.io.write(name, images)
+        assert ase.io.read(name, -1) == images[-1]
+        stat = os.stat(name)
+        keys.append((stat.st_dev, stat.st_ino))
+    assert list(extxyz._xyz_indices) == keys[2:]
+
+
+@pytest.mark.parametrize('extra', ['', ' 1.0', ' x'])
+def test_fast_atom_lines(monkeypatch, extra):
+    # Same result from np.loadtxt() and from the line by line fallback:
+    atoms = molecule('CH3CH2OH')
+    atoms.set_initial_charges(range(len(atoms)))
+    atoms.new_array('ok', np.arange(len(atoms)) % 2 == 0)
+    atoms.new_array('n', np.arange(2 * len(atoms)).reshape((-1, 2)))
+    atoms.new_array('label', np.array(['a' * (i + 1) for i in range(len(atoms))],
+                                      object))
+    atoms.calc = EMT()
+    atoms.get_forces()
+    ase.io.write('fast.xyz', atoms)
+    lines = Path('fast.xyz').read_text().splitlines()
+    lines[2:] = [line + extra for line in lines[2:]]
+    Path('fast.xyz').write_text('\n'.join(lines) + '\n')
+
+    images = []
+    for fast in [True, False]:
+        monkeypatch.setattr(extxyz, 'FAST_LOADTXT', fast)
+        images.append(ase.io.read('fast.xyz'))
+    for a in images:
+        assert a == atoms
+        for name in ['ok', 'n', 'label', 'initial_charges']:
+            assert a.arrays[name].dtype == images[1].arrays[name].dtype
+            assert (a.arrays[name] == atoms.arrays[name]).all()
+        assert a.get_forces() == pytest.approx(atoms.get_forces())
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from ase.build import bulk, molecule
+from ase.calculators.singlepoint import SinglePointCalculator
+from ase.io import iread, read, write
+
+indices = [':', '1:', '::2', '-3:', '1:-1', '::-1', '-2:0:-2', '10:', 0, 3,
+           -1, -2]
+
+
+@pytest.fixture
+def images():
+    images = []
+    for i in range(6):
+        atoms = molecule('CH3CH2OH') if i % 2 else bulk('Cu', cubic=True)
+        atoms.rattle(0.1, seed=i)
+        atoms.calc = SinglePointCalculator(atoms, energy=-i,
+                                           forces=atoms.positions * 0.1)
+        images.append(atoms)
+    return images
+
+
+@pytest.mark.parametrize('index', indices)
+def test_extxyz(images, index):
+    write('images.xyz', images)
+    ref = read('images.xyz', index)
+    result = read('images.xyz', index, workers=2)
+    assert result == ref
+    if isinstance(index, str):
+        for atoms, atoms_ref in zip(result, ref):
+            assert atoms.get_potential_energy() == \
+                atoms_ref.get_potential_energy()
+            assert (atoms.get_forces() == atoms_ref.get_forces()).all()
+
+
+def test_vec_lines(images):
+    with open('images.xyz', 'w') as fd:
+        for atoms in images:
+            fd.write('{}\n\n'.format(len(atoms)))
+            for symbol, pos in zip(atoms.symbols, atoms.positions):
+                fd.write('{} {} {} {}\n'.format(symbol, *pos))
+            if atoms.pbc.any():
+                for i, axis in enumerate(atoms.cell, 1):
+                    fd.write('VEC{} {} {} {}\n'.format(i, *axis))
+    assert read('images.xyz', ':', workers=2) == read('images.xyz', ':')
+
+
+def test_iread(images):
+    write('images.xyz', images)
+    iterator = iread('images.xyz', workers=2)
+    ref = read('images.xyz', ':')
+    assert next(iterator) == ref[0]
+    iterator.close()
+    assert list(iread('images.xyz', '1::2', workers=1)) == ref[1::2]
+
+
+def test_lammps_dump(images):
+    with open('dump.lammpstrj', 'w') as fd:
+        for step, atoms in enumerate(images[::2]):
+            fd.write('ITEM: TIMESTEP\n{}\n'.format(step))
+            fd.write('ITEM: NUMBER OF ATOMS\n{}\n'.format(len(atoms)))
+            fd.write('ITEM: BOX BOUNDS pp pp pp\n')
+            for length in atoms.cell.lengths():
+                fd.write('0.0 {}\n'.format(length))
+            fd.write('ITEM: ATOMS id type x y z fx fy fz\n')
+            for i, (pos, force) in enumerate(zip(atoms.positions,
+                                                 atoms.get_forces())):
+                fd.write('{} 1 {} {} {} {} {} {}\n'.format(i + 1, *pos,
+                                                            *force))
+
+    kwargs = dict(format='lammps-dump-text', specorder=['Cu'])
+    ref = read('dump.lammpstrj', ':', **kwargs)
+    result = read('dump.lammpstrj', ':', workers=2, **kwargs)
+    assert len(result) == 3
+    assert result == ref
+    for atoms, atoms_ref in zip(result, ref):
+        assert (atoms.get_forces() == atoms_ref.get_forces()).all()
+    assert read('dump.lammpstrj', -2, workers=2, **kwargs) == ref[-2]
+
+
+def test_outcar(datadir):
+    filename = datadir / 'vasp' / 'OUTCAR_example_1'
+    ref = read(filename, ':', format='vasp-out')
+    result = read(filename, ':', format='vasp-out', workers=2)
+    assert result == ref
+    assert np.allclose(result[0].get_forces(), ref[0].get_forces())
+
+
+def test_unsupported(images):
+    write('images.traj', images)
+    with pytest.raises(ValueError, match='workers'):
+        read('images.traj', workers=2)
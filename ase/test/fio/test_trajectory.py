@@ -1,6 +1,11 @@
+import subprocess
+import sys
+
+import numpy as np
 import pytest
 
 from ase import Atom, Atoms
+from ase.calculators.singlepoint import SinglePointCalculator
 from ase.io import Trajectory, read
 from ase.constraints import FixBondLength
 from ase.calculators.calculator import PropertyNotImplementedError
@@ -125,3 +130,92 @@ def test_constraint_and_momenta():
         t.write()
     b = read('constraint.traj')
     assert not (b.get_momenta() - a.get_momenta()).any()
+
+
+def test_get_array(trajfile, images):
+    with Trajectory(trajfile) as traj:
+        positions = traj.get_array('positions', slice(0, 9))
+        assert positions.shape == (9, 2, 3)
+        for pos, atoms in zip(positions, images):
+            assert (pos == atoms.positions).all()
+        assert (traj.get_array('positions', -2) == images[-2].positions).all()
+        assert (traj.get_array('positions', [7, 2])[1] ==
+                images[2].positions).all()
+        assert (traj[3:8].get_array('positions')[1:3] ==
+                traj.get_array('positions', slice(4, 6))).all()
+        numbers = traj.get_array('numbers', slice(5, 9))
+        assert (numbers == [atoms.numbers for atoms in images[5:9]]).all()
+        pbc = traj.get_array('pbc')
+        assert (pbc == [atoms.pbc for atoms in images]).all()
+        cell = traj.get_array('cell', slice(None, None, -1))
+        assert cell.shape == (len(images), 3, 3)
+        assert len(traj.get_array('positions', slice(3, 3))) == 0
+
+        # The number of atoms changes at the end:
+        with pytest.raises(ValueError):
+            traj.get_array('positions')
+        with pytest.raises(KeyError):
+            traj.get_array('forces')
+
+
+def test_get_array_calculator():
+    rng = np.random.RandomState(17)
+    images = []
+    with Trajectory('calc.traj', 'w') as traj:
+        for i in range(7):
+            atoms = Atoms('H3', rng.rand(3, 3), momenta=rng.rand(3, 3))
+            atoms.calc = SinglePointCalculator(atoms,
+                                               energy=rng.rand() * 10**i,
+                                               forces=rng.rand(3, 3))
+            traj.write(atoms)
+            images.append(atoms)
+
+    with Trajectory('calc.traj') as traj:
+        energies = traj.get_array('energy')
+        forces = traj.get_array('forces', slice(1, None, 2))
+        momenta = traj.get_array('momenta', slice(None, None, -3))
+    assert (energies == [atoms.get_potential_energy()
+                         for atoms in images]).all()
+    assert (forces == [atoms.get_forces() for atoms in images[1::2]]).all()
+    assert (momenta == [atoms.get_momenta() for atoms in images[::-3]]).all()
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_buffered(images, background):
+    with Trajectory('buffered.traj', 'w', buffersize=4,
+                    background=background) as traj:
+        for atoms in images[:6]:
+            traj.write(atoms)
+        assert len(traj) == 6
+        traj.flush()
+        assert len(read('buffered.traj', ':')) == 6
+        for atoms in images[6:]:
+            traj.write(atoms)
+            if not background:
+                # Only complete batches of images are in the file:
+                nwritten = 6 + (len(traj) - 6) // 4 * 4
+                with Trajectory('buffered.traj') as reader:
+                    assert len(reader) == nwritten
+    assert read('buffered.traj', ':') == images
+
+    with Trajectory('buffered.traj', 'a', buffersize=3, fsync=True,
+                    background=background) as traj:
+        for atoms in images[:4]:
+            traj.write(atoms)
+    assert read('buffered.traj', ':') == images + images[:4]
+
+
+def test_buffered_crash(tmp_path):
+    script = """\
+from ase import Atoms
+from ase.io import Trajectory
+traj = Trajectory('crash.traj', 'w', buffersize=10, background=True)
+for i in range(7):
+    traj.write(Atoms('H', [(0, 0, i)]))
+raise RuntimeError
+"""
+    result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path,
+                            stderr=subprocess.PIPE)
+    assert b'RuntimeError' in result.stderr
+    images = read(tmp_path / 'crash.traj', ':')
+    assert [atoms.positions[0, 2] for atoms in images] == list(range(7))
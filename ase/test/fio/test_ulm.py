@@ -1,4 +1,6 @@
 """Test ase.io.ulm file stuff."""
+import io
+
 import pytest
 import numpy as np
 
@@ -81,3 +83,63 @@ def test_ulm_copy(ulmfile):
     with ulm.open(path) as r:
         assert 'a' not in r
         assert 'y' in r
+
+
+def test_stack(tmp_path):
+    path = tmp_path / 'd.ulm'
+    with ulm.open(path, 'w') as w:
+        for i in range(6):
+            w.write(a=np.arange(6.0).reshape((2, 3)) * i, n=i)
+            if i % 2:
+                w.write(s='x' * i)
+            w.child('c').write(b=np.ones(4, int) * i)
+            w.sync()
+
+    with ulm.open(path) as r:
+        a = r.stack('a')
+        assert a.shape == (6, 2, 3)
+        for i in range(6):
+            assert (a[i] == r[i].a).all()
+        assert (r.stack('a', [5, 3, 1]) == a[5::-2]).all()
+        assert (r.stack('a', [4, 2]) == a[4:1:-2]).all()
+        assert (r.stack('n', range(1, 6, 2)) == [1, 3, 5]).all()
+        assert (r.stack('c.b')[:, 0] == range(6)).all()
+        assert list(r.stack('s', default='')) == ['', 'x', '', 'xxx',
+                                                  '', 'xxxxx']
+        with pytest.raises(KeyError):
+            r.stack('s')
+
+    # Reading from a file without fileno():
+    with ulm.open(io.BytesIO(path.read_bytes())) as r:
+        assert (r.stack('a') == a).all()
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_buffered(ulmfile, background):
+    path = ulmfile.with_name('e.ulm')
+    with ulm.Writer(path, buffersize=50, background=background) as w:
+        for i in range(100):
+            w.write(i=i, a=np.arange(i))
+            w.sync()
+            if i == 60 and not background:
+                with ulm.open(path) as r:
+                    assert len(r) == 50
+                    assert r[49].i == 49
+    with ulm.open(path) as r:
+        assert len(r) == 100
+        for i in range(100):
+            assert r[i].i == i
+            assert (r[i].a == np.arange(i)).all()
+
+
+class BrokenFile(io.BytesIO):
+    def write(self, data):
+        raise OSError('disk full')
+
+
+def test_background_error():
+    w = ulm.Writer(BrokenFile(), background=True)
+    w.write(x=1)
+    w.sync()
+    with pytest.raises(IOError, match='background'):
+        w.close()
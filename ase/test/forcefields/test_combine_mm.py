@@ -145,3 +145,57 @@ def test_combine_mm():
     ec, fc1, fc2, = lj.calculate(ions, dimer, np.array([0, 0, 0]))
 
     assert ecomb - (ea + eb) + ec == 0
+
+
+def test_combine_mm_box():
+    """Counter ions in a periodic box of water, with molecules crossing
+    the cutoff region, against numerical forces and with the two
+    subsystems swapped."""
+
+    import numpy as np
+    import pytest
+    from ase import Atoms
+    from ase import units
+    from ase.calculators.counterions import AtomicCounterIon as ACI
+    from ase.calculators.combine_mm import CombineMM
+    from ase.calculators.tip4p import TIP4P, rOH, angleHOH
+    from ase.calculators.tip4p import epsilon0 as eps4
+    from ase.calculators.tip4p import sigma0 as sig4
+
+    a = angleHOH * np.pi / 180 / 2
+    water = np.array([[0, 0, 0],
+                      [rOH * np.cos(a), rOH * np.sin(a), 0],
+                      [rOH * np.cos(a), -rOH * np.sin(a), 0]])
+    rng = np.random.RandomState(17)
+    L = 3.1 * 3
+    grid = np.indices((3, 3, 3)).reshape((3, -1)).T * 3.1
+    positions = (grid[:, None] + water).reshape((-1, 3))
+    positions += 0.1 * rng.rand(len(positions), 3)
+    ions = grid[[0, 13, 20]] + 1.55
+    atoms = Atoms('Na3' + 'OH2' * 27, np.concatenate([ions, positions]),
+                  cell=[L, L, L], pbc=True)
+
+    sigNa = 1.868 * (1.0 / 2.0)**(1.0 / 6.0) * 2
+    epsNa = 0.00277 * units.kcal / units.mol
+    sigma = np.array([sig4, 0, 0])
+    epsilon = np.array([eps4, 0, 0])
+    rc = 4.5
+
+    atoms.calc = CombineMM([0, 1, 2], 1, 3,
+                           ACI(1, epsNa, sigNa, rc=rc),
+                           TIP4P(rc=rc, width=1.0),
+                           np.array([sigNa]), np.array([epsNa]),
+                           sigma, epsilon, rc=rc, width=1.0)
+    e1 = atoms.get_potential_energy()
+    f1 = atoms.get_forces()
+    fn = atoms.calc.calculate_numerical_forces(atoms, 1e-5)
+    assert abs(f1 - fn).max() < 1e-6
+
+    atoms.calc = CombineMM(list(range(3, len(atoms))), 3, 1,
+                           TIP4P(rc=rc, width=1.0),
+                           ACI(1, epsNa, sigNa, rc=rc),
+                           sigma, epsilon,
+                           np.array([sigNa]), np.array([epsNa]),
+                           rc=rc, width=1.0)
+    assert atoms.get_potential_energy() == pytest.approx(e1, abs=1e-10)
+    assert abs(atoms.get_forces() - f1).max() < 1e-10
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from ase import Atoms
+from ase.calculators.ff import ForceField, get_limits
+from ase.calculators.test import numeric_force
+from ase.utils import ff
+from ase.utils.ff import Morse, Bond, Angle, Dihedral, VdW, Coulomb
+
+
+@pytest.fixture
+def atoms():
+    rng = np.random.RandomState(42)
+    positions = np.array([[0.0, 0.0, 0.0],
+                          [1.4, 0.1, 0.0],
+                          [2.0, 1.3, 0.2],
+                          [3.4, 1.5, -0.3],
+                          [4.1, 0.3, 0.4],
+                          [5.7, 0.6, 0.1]])
+    positions += 0.05 * rng.rand(6, 3)
+    # the last atom interacts with the first one through the boundary
+    return Atoms('C6', positions=positions, cell=[6.5, 8.0, 8.0],
+                 pbc=True)
+
+
+@pytest.fixture
+def terms():
+    return dict(
+        morses=[Morse(0, 1, D=6.1, alpha=1.85, r0=1.43),
+                Morse(5, 0, D=6.1, alpha=1.85, r0=1.43)],
+        bonds=[Bond(1, 2, k=20.0, b0=1.4),
+               Bond(2, 3, k=20.0, b0=1.4, alpha=[0.5], rref=[1.3])],
+        angles=[Angle(0, 1, 2, k=10.0, a0=np.deg2rad(120.0), cos=True),
+                Angle(1, 2, 3, k=8.0, a0=np.deg2rad(110.0), cos=False),
+                Angle(2, 3, 4, k=8.0, a0=np.deg2rad(115.0), cos=True,
+                      alpha=[0.3, 0.4], rref=[1.4, 1.5])],
+        dihedrals=[Dihedral(0, 1, 2, 3, k=0.35),
+                   Dihedral(1, 2, 3, 4, k=0.5, d0=np.deg2rad(170.0)),
+                   Dihedral(2, 3, 4, 5, k=0.5, d0=np.deg2rad(30.0), n=3,
+                            alpha=[0.2, 0.3, 0.4], rref=[1.4, 1.4, 1.4])],
+        vdws=[VdW(0, 3, epsilonij=0.0115, rminij=3.47),
+              VdW(1, 4, epsilonij=0.0115, rminij=3.47)],
+        coulombs=[Coulomb(0, 4, chargeij=0.3),
+                  Coulomb(2, 5, chargeij=-0.2)])
+
+
+def reference(atoms, terms):
+    """Energy, forces and hessian from the single-term functions."""
+    functions = dict(morses='morse', bonds='bond', angles='angle',
+                     dihedrals='dihedral', vdws='vdw', coulombs='coulomb')
+    energy = 0.0
+    forces = np.zeros(3 * len(atoms))
+    hessian = np.zeros((3 * len(atoms), 3 * len(atoms)))
+    for name, termlist in terms.items():
+        prefix = 'get_{}_potential_'.format(functions[name])
+        for term in termlist:
+            energy += getattr(ff, prefix + 'value')(atoms, term)[-1]
+            *indices, g = getattr(ff, prefix + 'gradient')(atoms, term)
+            h = getattr(ff, prefix + 'hessian')(atoms, term)[-1]
+            limits = list(get_limits(indices))
+            for gb1, ge1, lb1, le1 in limits:
+                forces[gb1:ge1] -= g[lb1:le1]
+                for gb2, ge2, lb2, le2 in limits:
+                    hessian[gb1:ge1, gb2:ge2] += h[lb1:le1, lb2:le2]
+    return energy, forces.reshape((-1, 3)), hessian
+
+
+def test_forcefield_terms(atoms, terms):
+    atoms.calc = ForceField(**terms)
+    energy, forces, hessian = reference(atoms, terms)
+
+    assert atoms.get_potential_energy() == pytest.approx(energy, abs=1e-12)
+    assert atoms.get_forces() == pytest.approx(forces, abs=1e-10)
+    H = atoms.calc.get_hessian(atoms)
+    assert H.shape == (18, 18)
+    assert H.toarray() == pytest.approx(hessian, abs=1e-7)
+
+    for a in range(len(atoms)):
+        for i in range(3):
+            f = numeric_force(atoms, a, i, 1e-5)
+            assert atoms.get_forces()[a, i] == pytest.approx(f, abs=1e-6)
+
+
+def test_forcefield_sparse_hessian(atoms, terms):
+    # the alpha and rref parameters scale the hessian away from the
+    # second derivatives of the energy
+    for termlist in terms.values():
+        for term in termlist:
+            if hasattr(term, 'alpha') and not isinstance(term, Morse):
+                term.alpha = term.rref = None
+    atoms.calc = ForceField(**terms)
+    H = atoms.calc.get_hessian(atoms)
+    assert abs(H - H.T).max() < 1e-6
+    # only atoms that share a term are coupled
+    assert H[0:3, 9:12].nnz > 0
+    assert H[3:6, 15:18].nnz == 0
+
+    # finite difference of the forces
+    eps = 1e-5
+    positions = atoms.get_positions()
+    for a in range(len(atoms)):
+        for i in range(3):
+            displaced = positions.copy()
+            displaced[a, i] += eps
+            atoms.positions = displaced
+            fplus = atoms.get_forces().ravel()
+            displaced[a, i] -= 2 * eps
+            atoms.positions = displaced
+            fminus = atoms.get_forces().ravel()
+            row = H[3 * a + i].toarray().ravel()
+            assert row == pytest.approx((fminus - fplus) / (2 * eps),
+                                        abs=1e-4)
+    atoms.positions = positions
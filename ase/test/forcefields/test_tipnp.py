@@ -27,3 +27,36 @@ def test_tipnp():
         dF = dimer.calc.calculate_numerical_forces(dimer) - F
         print(dF)
         assert abs(dF).max() < 2e-6
+
+
+def test_tipnp_box():
+    """Test TIP3P and TIP4P in a periodic box of water molecules."""
+    import numpy as np
+    from ase import Atoms
+    from ase.build import molecule
+    from ase.calculators.tip3p import TIP3P
+    from ase.calculators.tip4p import TIP4P
+
+    rng = np.random.RandomState(42)
+    water = molecule('H2O')[[0, 1, 2]]
+    atoms = Atoms(cell=[9.0] * 3, pbc=True)
+    for position in np.indices((3, 3, 3)).reshape(3, -1).T * 3.0:
+        w = water.copy()
+        w.rotate(rng.rand() * 360, rng.rand(3) - 0.5)
+        w.translate(position + rng.rand(3) * 0.3)
+        atoms += w
+
+    for TIPnP in [TIP3P, TIP4P]:
+        atoms.calc = TIPnP(rc=4.5, width=1.0)
+        energy = atoms.get_potential_energy()
+        F = atoms.get_forces()
+        dF = atoms.calc.calculate_numerical_forces(atoms, d=1e-5) - F
+        assert abs(dF).max() < 1e-6
+        assert abs(F.sum(axis=0)).max() < 1e-10
+
+        # moving a molecule to a periodic image changes nothing
+        shifted = atoms.copy()
+        shifted.positions[3:6] += atoms.cell[0] - atoms.cell[2]
+        shifted.calc = TIPnP(rc=4.5, width=1.0)
+        assert abs(shifted.get_potential_energy() - energy) < 1e-10
+        assert abs(shifted.get_forces() - F).max() < 1e-10
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from ase import Atoms
+from ase.build import bulk, molecule
+from ase.neighborlist import batch_neighbor_list, neighbor_list
+
+
+def pairs(i, j, S):
+    return sorted(zip(i.tolist(), j.tolist(), map(tuple, S.tolist())))
+
+
+@pytest.fixture
+def images():
+    rng = np.random.RandomState(3)
+    images = []
+    for k in range(20):
+        atoms = bulk('Cu', cubic=bool(k % 2)).repeat(rng.randint(1, 3, 3))
+        atoms.rattle(0.2, seed=k)
+        atoms.pbc = rng.rand(3) > 0.3
+        # Atoms outside the cell must be handled as well.
+        atoms.positions += rng.uniform(-3, 3, 3)
+        images.append(atoms)
+    images.append(molecule('CH3CH2OH'))
+    images.append(Atoms())
+    # Large enough to go through primitive_neighbor_list.
+    images.append(bulk('Cu').repeat(5))
+    return images
+
+
+@pytest.mark.parametrize('cutoff', [4.0, {('Cu', 'Cu'): 3.0, (1, 6): 1.2}])
+def test_batch_neighbor_list(images, cutoff):
+    i, j, d, S, first = batch_neighbor_list('ijdS', images, cutoff,
+                                            max_natoms=64)
+    assert len(first) == len(images) + 1
+    assert first[-1] == len(i)
+    for k, atoms in enumerate(images):
+        i1, j1, d1, S1 = neighbor_list('ijdS', atoms, cutoff)
+        n = slice(first[k], first[k + 1])
+        assert pairs(i[n], j[n], S[n]) == pairs(i1, j1, S1)
+        assert np.allclose(np.sort(d[n]), np.sort(d1))
+        assert (np.diff(i[n]) >= 0).all()
+
+
+def test_batch_neighbor_list_single_quantity():
+    i, first = batch_neighbor_list('i', [Atoms()], 2.0)
+    assert i.shape == (0,)
+    assert (first == [0, 0]).all()
+
+
+def test_batch_neighbor_list_no_images():
+    i, j, d, first = batch_neighbor_list('ijd', [], 2.0)
+    assert i.shape == j.shape == d.shape == (0,)
+    assert (first == [0]).all()
+    *_, first = batch_neighbor_list('ij', [], {(1, 1): 1.0})
+    assert (first == [0]).all()
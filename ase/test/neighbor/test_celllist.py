@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from ase.build import bulk, molecule
+from ase.neighborlist import CellList, neighbor_list
+
+
+def pairs(i, j, S):
+    return sorted(zip(i.tolist(), j.tolist(), map(tuple, S.tolist())))
+
+
+@pytest.fixture
+def atoms():
+    atoms = bulk('Cu', cubic=True).repeat((4, 4, 4))
+    atoms.rattle(0.1, seed=42)
+    return atoms
+
+
+@pytest.mark.parametrize('pbc', [True, False, [True, False, True]])
+def test_celllist_matches_neighbor_list(atoms, pbc):
+    atoms.pbc = pbc
+    cl = CellList(atoms.pbc, atoms.cell, 4.0)
+    cl.update(atoms.positions)
+    ref = neighbor_list('ijS', atoms, 4.0)
+    assert pairs(*cl.neighbor_list('ijS')) == pairs(*ref)
+
+
+def test_celllist_chunks(atoms):
+    cl = CellList(atoms.pbc, atoms.cell, 4.0)
+    cl.update(atoms.positions)
+    i, j, d = cl.neighbor_list('ijd')
+    chunks = list(cl.iter_chunks('ijd', chunk_size=100))
+    assert len(chunks) > 1
+    assert sum(len(chunk[0]) for chunk in chunks) == len(i)
+    assert np.allclose(np.sort(np.concatenate([c[2] for c in chunks])),
+                       np.sort(d))
+
+
+def test_celllist_incremental_update(atoms):
+    cl = CellList(atoms.pbc, atoms.cell, 4.0)
+    cl.update(atoms.positions)
+    atoms.positions[[3, 17, 100]] += [2.1, -1.9, 3.3]
+    atoms.positions[200] += 3 * atoms.cell[0]
+    assert cl.update(atoms.positions, moved=[3, 17, 100, 200]) > 0
+    ref = neighbor_list('ijS', atoms, 4.0)
+    assert pairs(*cl.neighbor_list('ijS')) == pairs(*ref)
+
+    # Updating without telling which atoms moved finds them itself.
+    atoms.positions[50] += [5.0, 0.0, 0.0]
+    cl.update(atoms.positions)
+    assert cl.nrebinned == 1
+    ref = neighbor_list('ijS', atoms, 4.0)
+    assert pairs(*cl.neighbor_list('ijS')) == pairs(*ref)
+
+
+def test_celllist_indices(atoms):
+    cl = CellList(atoms.pbc, atoms.cell, 4.0)
+    cl.update(atoms.positions)
+    i, j, S = neighbor_list('ijS', atoms, 4.0)
+    mask = np.isin(i, [0, 7])
+    sub = cl.neighbor_list('ijS', indices=[0, 7])
+    assert pairs(*sub) == pairs(i[mask], j[mask], S[mask])
+
+
+def test_celllist_pair_cutoffs():
+    atoms = molecule('HCOOH')
+    atoms.center(vacuum=5.0)
+    cutoffs = {('H', 'C'): 1.2, (6, 8): 1.4}
+    cl = CellList(atoms.pbc, atoms.cell, cutoffs, numbers=atoms.numbers)
+    cl.update(atoms.positions)
+    i = cl.neighbor_list('i')
+    assert (np.bincount(i) == np.array([1, 3, 1, 0, 1])).all()
@@ -3,7 +3,8 @@ import numpy as np
 import pytest
 from ase import Atoms
 from ase.neighborlist import (NeighborList, PrimitiveNeighborList,
-                              NewPrimitiveNeighborList)
+                              NewPrimitiveNeighborList, get_distance_matrix,
+                              get_distance_indices)
 from ase.build import bulk
 
 
@@ -79,6 +80,23 @@ def test_H2():
     assert nl.nupdates == 2
 
 
+def test_distance_matrix_chain():
+    # Linear chain 0-1-2-3-4-5 with bonds given only in one direction.
+    n = 6
+    graph = np.zeros((n, n), int)
+    graph[np.arange(n - 1), np.arange(1, n)] = 1
+    dm = get_distance_matrix(graph, limit=3)
+    ref = np.abs(np.subtract.outer(np.arange(n), np.arange(n)))
+    ref[ref > 3] = 0
+    assert dm.format == 'csr'
+    assert dm.dtype == np.int8
+    assert (dm.toarray() == ref).all()
+    assert get_distance_indices(dm, 2)[0] == [1, 2]
+    assert get_distance_indices(dm, 2)[3] == [1, 2, 4, 5]
+    # The input is left untouched.
+    assert (dm.toarray() == ref).all()
+
+
 def test_H2_shape_and_type():
     h2 = Atoms('H2', positions=[(0, 0, 0), (0, 0, 1)])
     nl = NeighborList([0.1, 0.1], skin=0.1, bothways=True,
@@ -211,3 +229,33 @@ def test_small_cell_and_large_cutoff():
 
     assert np.all(n0 == n1)
     assert np.all(d0 == d1)
+
+
+@pytest.mark.parametrize('bothways', [False, True])
+def test_incremental_update(bothways):
+    atoms = bulk('Cu', cubic=True).repeat((4, 4, 4))
+    atoms.rattle(0.05, seed=1)
+    rng = np.random.RandomState(7)
+    cutoffs = [1.3] * len(atoms)
+    nl = NeighborList(cutoffs, skin=0.3, bothways=bothways,
+                      primitive=NewPrimitiveNeighborList, incremental=True)
+    nl.update(atoms)
+
+    for step in range(10):
+        moved = rng.choice(len(atoms), 3, replace=False)
+        atoms.positions[moved] += rng.uniform(-1.0, 1.0, (3, 3))
+        assert nl.update(atoms)
+
+        # The list must equal a full rebuild from the positions at which
+        # each row was last built.
+        ref = NewPrimitiveNeighborList(cutoffs, skin=0.3, bothways=bothways)
+        ref.update(atoms.pbc, atoms.cell, nl.nl.positions)
+        for a in range(len(atoms)):
+            i1, o1 = nl.get_neighbors(a)
+            i2, o2 = ref.get_neighbors(a)
+            assert sorted(zip(i1, map(tuple, o1))) == \
+                sorted(zip(i2, map(tuple, o2)))
+
+    assert nl.nl.nfullupdates == 1
+    assert nl.nl.npartialupdates == 10
+    assert nl.nupdates == 11
@@ -214,3 +214,32 @@ def test_neighbor_kernel():
     i = neighbor_list("i", ase.Atoms(), 1.0)
     assert i.dtype == int
     assert i.shape == (0,)
+
+
+@pytest.mark.parametrize('pbc', [True, False, [True, False, True]])
+@pytest.mark.parametrize('cutoff', [3.0, {('Cu', 'Cu'): 2.6, (29, 1): 1.5},
+                                    [1.0, 1.5, 0.7, 1.3] * 27])
+def test_half_neighbor_list(pbc, cutoff):
+    a = bulk('Cu', cubic=True).repeat(3)
+    a.numbers[::5] = 1
+    a.rattle(0.2, seed=3)
+    a.pbc = pbc
+    i, j, S = neighbor_list('ijS', a, cutoff)
+    ih, jh, Sh = neighbor_list('ijS', a, cutoff, bothways=False)
+
+    full = set(zip(i, j, map(tuple, S)))
+    half = set(zip(ih, jh, map(tuple, Sh)))
+    assert len(half) == len(ih) == len(i) // 2
+    assert (ih <= jh).all()
+    assert (np.diff(ih) >= 0).all()
+    assert half <= full
+    mirror = {(b, a_, tuple(-np.array(s))) for a_, b, s in half}
+    assert half | mirror == full
+
+
+def test_half_neighbor_list_self_image():
+    # An atom paired with its own image is listed once.
+    a = ase.Atoms('C', cell=[1, 1, 1], pbc=True)
+    i, j, S = neighbor_list('ijS', a, 1.1, bothways=False)
+    assert len(i) == 3
+    assert (S.sum(axis=1) == 1).all()
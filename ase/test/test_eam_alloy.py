@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from scipy.interpolate import InterpolatedUnivariateSpline
+
+from ase.build import bulk
+from ase.calculators.eam import EAM, SplineTable
+from ase.neighborlist import neighbor_list
+
+
+def test_spline_table():
+    x = np.arange(50) * 0.1
+    y = np.exp(-x) * np.cos(3 * x)
+    reference = InterpolatedUnivariateSpline(x, y, k=3)
+    table = SplineTable(x, y)
+    # includes points outside the grid where both extrapolate
+    points = np.linspace(-0.5, 5.5, 1001)
+    for nu in range(3):
+        assert table(points, nu) == pytest.approx(reference(points, nu),
+                                                  abs=1e-12)
+    assert table(1.234) == pytest.approx(reference(1.234), abs=1e-12)
+
+
+def exponential(k, a=1.0):
+    return lambda r: k * np.exp(-a * r)
+
+
+def d_exponential(k, a=1.0):
+    return lambda r: -a * k * np.exp(-a * r)
+
+
+def pairs(function, ks, a=1.0):
+    return np.array([[function(ks[0], a), function(ks[1], a)],
+                     [function(ks[1], a), function(ks[2], a)]], object)
+
+
+def eam_kwargs(form):
+    kwargs = dict(
+        elements=['Cu', 'Au'], cutoff=5.0, form=form,
+        embedded_energy=np.array([lambda rho: -np.sqrt(rho),
+                                  lambda rho: -1.3 * np.sqrt(rho)]),
+        d_embedded_energy=np.array([lambda rho: -0.5 / np.sqrt(rho),
+                                    lambda rho: -0.65 / np.sqrt(rho)]),
+        phi=pairs(exponential, [10, 15, 20], 2.0),
+        d_phi=pairs(d_exponential, [10, 15, 20], 2.0))
+    if form == 'fs':
+        kwargs['electron_density'] = np.array(
+            [[exponential(1.0), exponential(1.1)],
+             [exponential(1.2), exponential(0.9)]], object)
+        kwargs['d_electron_density'] = np.array(
+            [[d_exponential(1.0), d_exponential(1.1)],
+             [d_exponential(1.2), d_exponential(0.9)]], object)
+    else:
+        kwargs['electron_density'] = np.array([exponential(1.0),
+                                               exponential(1.2)])
+        kwargs['d_electron_density'] = np.array([d_exponential(1.0),
+                                                 d_exponential(1.2)])
+    if form == 'adp':
+        kwargs['d'] = pairs(exponential, [0.1, 0.2, 0.3])
+        kwargs['d_d'] = pairs(d_exponential, [0.1, 0.2, 0.3])
+        kwargs['q'] = pairs(exponential, [0.05, 0.07, 0.02])
+        kwargs['d_q'] = pairs(d_exponential, [0.05, 0.07, 0.02])
+    return kwargs
+
+
+def alloy():
+    atoms = bulk('Cu', cubic=True).repeat((2, 2, 2))
+    atoms.symbols[::3] = 'Au'
+    atoms.rattle(0.1, seed=3)
+    return atoms
+
+
+@pytest.mark.parametrize('form', ['alloy', 'fs', 'adp'])
+def test_eam_alloy_forces(form):
+    atoms = alloy()
+    atoms.calc = EAM(**eam_kwargs(form))
+
+    forces = atoms.get_forces()
+    numerical = atoms.calc.calculate_numerical_forces(atoms, d=1e-5)
+    assert abs(forces - numerical).max() < 1e-6
+    assert abs(forces.sum(axis=0)).max() < 1e-10
+
+
+def test_adp_deprecated_methods():
+    # The per-atom methods of the old implementation still give the
+    # dipoles, quadrupoles and angular forces of the vectorised one.
+    atoms = alloy()
+    calc = EAM(**eam_kwargs('adp'))
+    atoms.calc = calc
+    forces = atoms.get_forces()
+
+    index = calc.index
+    i, j, rvec, r = neighbor_list('ijDd', atoms, calc.cutoff)
+    mu = np.zeros((len(atoms), 3))
+    lam = np.zeros((len(atoms), 3, 3))
+    angular = np.zeros((len(atoms), 3))
+    with pytest.warns(FutureWarning):
+        for a in range(len(atoms)):
+            for b in range(calc.Nelements):
+                use = (i == a) & (index[j] == b)
+                mu[a] += calc.adp_dipole(r[use], rvec[use],
+                                         calc.d[index[a], b])
+                lam[a] += calc.adp_quadrupole(r[use], rvec[use],
+                                              calc.q[index[a], b])
+        for a in range(len(atoms)):
+            for b in range(calc.Nelements):
+                use = (i == a) & (index[j] == b)
+                angular[a] += calc.angular_forces(
+                    mu[a], mu[j[use]], lam[a], lam[j[use]],
+                    r[use], rvec[use], index[a], b)
+
+    assert mu == pytest.approx(calc.mu, abs=1e-12)
+    assert lam == pytest.approx(calc.lam, abs=1e-12)
+
+    # without the angular terms:
+    kwargs = eam_kwargs('adp')
+    kwargs['form'] = 'alloy'
+    atoms.calc = EAM(**kwargs)
+    assert angular == pytest.approx(forces - atoms.get_forces(), abs=1e-10)
+
+
+def test_neighbor_list_rebuilt():
+    # The neighbor list follows changes of the cutoff and the skin:
+    atoms = alloy()
+    calc = EAM(**eam_kwargs('alloy'))
+    calc.get_potential_energy(atoms)
+    for cutoff, skin in [(8.0, 1.0), (8.0, 0.2), (4.0, 0.2)]:
+        calc.cutoff = cutoff
+        calc.parameters.skin = skin
+        calc.reset()
+        kwargs = dict(eam_kwargs('alloy'), cutoff=cutoff, skin=skin)
+        assert calc.get_potential_energy(atoms) == pytest.approx(
+            EAM(**kwargs).get_potential_energy(atoms), abs=1e-10)
@@ -73,3 +73,107 @@ def test_mixingcalc():
     E1, E2 = calc1.get_energy_contributions(atoms1)
     assert np.isclose(E1, E_tot)
     assert np.isclose(E2, E_tot)
+
+
+def test_mixingcalc_components():
+    """Each component is calculated once for all properties, and only
+    if its own inputs changed."""
+    import pytest
+    from ase.build import bulk
+    from ase.calculators.calculator import all_changes
+    from ase.calculators.emt import EMT
+    from ase.calculators.mixing import SumCalculator
+
+    class CountingEMT(EMT):
+        def calculate(self, atoms, properties, system_changes):
+            EMT.calculate(self, atoms, properties, system_changes)
+            self.ncalculations += 1
+
+    class MagneticEMT(CountingEMT):
+        ignored_changes = set()
+
+    calc1 = CountingEMT()
+    calc1.ignored_changes = {'initial_magmoms'}
+    calc2 = MagneticEMT()
+    calc1.ncalculations = calc2.ncalculations = 0
+    atoms = bulk('Cu', cubic=True)
+    atoms.rattle(0.05, seed=2)
+    atoms.calc = SumCalculator([calc1, calc2])
+    atoms.calc.calculate(atoms, ['energy', 'forces'], all_changes)
+    assert calc1.ncalculations == calc2.ncalculations == 1
+
+    atoms.set_initial_magnetic_moments([0.1] * len(atoms))
+    energy = atoms.get_potential_energy()
+    assert calc1.ncalculations == 1
+    assert calc2.ncalculations == 2
+    assert energy == pytest.approx(2 * calc1.get_potential_energy(atoms))
+
+
+def test_mixingcalc_executor():
+    """Components run at the same time on a thread pool."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+    import pytest
+    from ase.build import bulk
+    from ase.calculators.calculator import Calculator
+    from ase.calculators.mixing import LinearCombinationCalculator
+
+    class SlowCalculator(Calculator):
+        implemented_properties = ['energy', 'forces']
+
+        def __init__(self, value):
+            Calculator.__init__(self)
+            self.value = value
+
+        def calculate(self, atoms, properties, system_changes):
+            Calculator.calculate(self, atoms, properties, system_changes)
+            start = time.time()
+            time.sleep(0.2)
+            self.interval = (start, time.time())
+            self.results = {'energy': self.value,
+                            'forces': np.full((len(atoms), 3), self.value)}
+
+    calcs = [SlowCalculator(value) for value in [1.0, 2.0, 3.0]]
+    atoms = bulk('Cu')
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        atoms.calc = LinearCombinationCalculator(calcs, [1.0, 0.5, -1.0],
+                                                 executor=executor)
+        assert atoms.get_potential_energy() == pytest.approx(-1.0)
+        assert atoms.calc.results['energy_contributions'] == [1.0, 2.0, 3.0]
+        assert atoms.get_forces() == pytest.approx(-np.ones((1, 3)))
+    intervals = sorted(calc.interval for calc in calcs)
+    assert any(start2 < end1 for (start1, end1), (start2, end2)
+               in zip(intervals[:-1], intervals[1:]))
+
+
+def test_mixingcalc_own_get_property():
+    """Components with their own get_property() and calculate(atoms),
+    like Castep, are asked for one property at a time."""
+    import numpy as np
+    import pytest
+    from ase.build import bulk
+    from ase.calculators.calculator import Calculator
+    from ase.calculators.emt import EMT
+    from ase.calculators.mixing import SumCalculator
+
+    class OldStyleCalculator(Calculator):
+        implemented_properties = ['energy', 'forces']
+
+        def calculate(self, atoms):
+            self.atoms = atoms.copy()
+            self.results = {'energy': 1.0,
+                            'forces': np.zeros((len(atoms), 3))}
+
+        def get_property(self, name, atoms=None, allow_calculation=True):
+            if atoms is None or self.check_state(atoms):
+                self.calculate(atoms)
+            return self.results[name]
+
+    atoms = bulk('Cu', cubic=True)
+    atoms.rattle(0.05, seed=3)
+    atoms.calc = SumCalculator([EMT(), OldStyleCalculator()])
+    energy = atoms.get_potential_energy()
+    assert energy == pytest.approx(EMT().get_potential_energy(atoms) + 1.0)
+    assert atoms.get_forces() == pytest.approx(EMT().get_forces(atoms))
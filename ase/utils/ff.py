@@ -908,3 +908,303 @@ def rel_pos_pbc(atoms, i, j):
     f = np.floor(np.dot(g, d.T) + 0.5)
     d -= np.dot(atoms.get_cell().T, f).T
     return d
+
+
+# Vectorised evaluation of many terms of the same type.  The terms are
+# packed into arrays with pack_terms() and the get_*_potential_terms()
+# functions below return the values, gradients and hessians of all of
+# them at once.
+
+_term_atoms = ['atomi', 'atomj', 'atomk', 'atoml']
+_term_parameters = {Morse: (2, ['D', 'alpha', 'r0']),
+                    Bond: (2, ['k', 'b0']),
+                    Angle: (3, ['k', 'a0', 'cos']),
+                    Dihedral: (4, ['k', 'd0', 'n']),
+                    VdW: (2, ['Aij', 'Bij']),
+                    Coulomb: (2, ['chargeij'])}
+
+
+def pack_terms(terms):
+    """Pack a list of terms of the same type into arrays.
+
+    Returns a dict with the atom indices of every term as an integer
+    array of shape (nterms, natoms_per_term) under 'indices' and one
+    array per parameter, e.g. 'k' and 'b0' for bonds.  Parameters that
+    are None are stored as NaN.  The optional 'alpha' and 'rref' scaling
+    parameters of bonds, angles and dihedrals are stored as arrays of
+    shape (nterms, natoms_per_term - 1)."""
+    cls = type(terms[0])
+    natoms, names = _term_parameters[cls]
+    table = {'type': cls,
+             'indices': np.array([[getattr(term, name)
+                                   for name in _term_atoms[:natoms]]
+                                  for term in terms], dtype=int)}
+    for name in names:
+        values = [getattr(term, name) for term in terms]
+        if name == 'cos':
+            table[name] = np.array(values, dtype=bool)
+        else:
+            table[name] = np.array([np.nan if value is None else value
+                                    for value in values], dtype=float)
+    if cls in [Bond, Angle, Dihedral]:
+        for name in ['alpha', 'rref']:
+            table[name] = np.full((len(terms), natoms - 1), np.nan)
+            for n, term in enumerate(terms):
+                if getattr(term, name) is not None:
+                    table[name][n] = getattr(term, name)[:natoms - 1]
+    return table
+
+
+def _pair_results(d, e, v, dv, d2v, gradient, hessian, scale=None):
+    """Values, gradients and hessians of pair terms.
+
+    d and e are the distances and unit vectors from atom j to atom i,
+    v, dv and d2v the values and first and second derivatives of the
+    potential with respect to the distance."""
+    g = H = None
+    if gradient:
+        gr = dv[:, np.newaxis] * e
+        g = np.concatenate([gr, -gr], axis=1)
+    if hessian:
+        P = e[:, :, np.newaxis] * e[:, np.newaxis, :]
+        Q = np.eye(3) - P
+        Hr = (d2v[:, np.newaxis, np.newaxis] * P +
+              (dv / d)[:, np.newaxis, np.newaxis] * Q)
+        if scale is not None:
+            Hr *= scale[:, np.newaxis, np.newaxis]
+        H = np.block([[Hr, -Hr], [-Hr, Hr]])
+    return v, g, H
+
+
+def _pair_geometry(atoms, table):
+    indices = table['indices']
+    rij = rel_pos_pbc(atoms, indices[:, 0], indices[:, 1])
+    dij = np.sqrt((rij**2).sum(axis=1))
+    return dij, rij / dij[:, np.newaxis]
+
+
+def _scaling(alpha, rref, distances):
+    """Scaling factors exp(alpha * (rref**2 - r**2)) of hessians."""
+    exponent = np.where(np.isnan(alpha), 0.0,
+                        alpha * (rref**2 - distances**2)).sum(axis=1)
+    return np.exp(exponent)
+
+
+def get_morse_potential_terms(atoms, table, gradient=True, hessian=False):
+    """Values, gradients and hessians of packed Morse terms."""
+    d, e = _pair_geometry(atoms, table)
+    D = table['D']
+    alpha = table['alpha']
+    exp = np.exp(-alpha * (d - table['r0']))
+    v = D * (1.0 - exp)**2
+    dv = 2.0 * D * alpha * exp * (1.0 - exp)
+    d2v = 2.0 * D * alpha**2 * exp * (2.0 * exp - 1.0)
+    return _pair_results(d, e, v, dv, d2v, gradient, hessian)
+
+
+def get_bond_potential_terms(atoms, table, gradient=True, hessian=False):
+    """Values, gradients and hessians of packed harmonic bond terms."""
+    d, e = _pair_geometry(atoms, table)
+    k = table['k']
+    v = 0.5 * k * (d - table['b0'])**2
+    dv = k * (d - table['b0'])
+    scale = _scaling(table['alpha'], table['rref'], d[:, np.newaxis])
+    return _pair_results(d, e, v, dv, k, gradient, hessian, scale)
+
+
+def get_vdw_potential_terms(atoms, table, gradient=True, hessian=False):
+    """Values, gradients and hessians of packed van der Waals terms."""
+    d, e = _pair_geometry(atoms, table)
+    A = table['Aij']
+    B = table['Bij']
+    v = A / d**12 - B / d**6
+    dv = -12.0 * A / d**13 + 6.0 * B / d**7
+    d2v = 156.0 * A / d**14 - 42.0 * B / d**8
+    return _pair_results(d, e, v, dv, d2v, gradient, hessian)
+
+
+def get_coulomb_potential_terms(atoms, table, gradient=True, hessian=False):
+    """Values, gradients and hessians of packed Coulomb terms."""
+    d, e = _pair_geometry(atoms, table)
+    c = table['chargeij']
+    v = c / d
+    dv = -c / d**2
+    d2v = 2.0 * c / d**3
+    return _pair_results(d, e, v, dv, d2v, gradient, hessian)
+
+
+def _outer(a, b):
+    return a[:, :, np.newaxis] * b[:, np.newaxis, :]
+
+
+def get_angle_potential_terms(atoms, table, gradient=True, hessian=False):
+    """Values, gradients and hessians of packed angle terms."""
+    indices = table['indices']
+    k = table['k']
+    a0 = table['a0']
+    cos = table['cos']
+
+    rij = rel_pos_pbc(atoms, indices[:, 0], indices[:, 1])
+    dij = np.sqrt((rij**2).sum(axis=1))
+    eij = rij / dij[:, np.newaxis]
+    rkj = rel_pos_pbc(atoms, indices[:, 2], indices[:, 1])
+    dkj = np.sqrt((rkj**2).sum(axis=1))
+    ekj = rkj / dkj[:, np.newaxis]
+    eijekj = np.clip((eij * ekj).sum(axis=1), -1.0, 1.0)
+
+    a = np.arccos(eijekj)
+    da = a - a0
+    da = np.where(cos, np.cos(a) - np.cos(a0),
+                  da - np.around(da / np.pi) * np.pi)
+    v = 0.5 * k * da**2
+
+    sina = np.sin(a)
+    ok = np.abs(sina) > 0.001
+    # avoid divisions by zero, those terms are set to zero below
+    sina = np.where(ok, sina, 1.0)
+
+    g = H = None
+    if gradient:
+        Qijekj = ekj - eijekj[:, np.newaxis] * eij
+        Qkjeij = eij - eijekj[:, np.newaxis] * ekj
+        factor = np.where(cos, k * da, np.where(ok, -k * da / sina, 0.0))
+        gi = (factor / dij)[:, np.newaxis] * Qijekj
+        gk = (factor / dkj)[:, np.newaxis] * Qkjeij
+        g = np.concatenate([gi, -gi - gk, gk], axis=1)
+
+    if hessian:
+        n = len(k)
+        cosa = np.cos(a)
+        ctga = cosa / sina
+        Pij = _outer(eij, eij)
+        Qij = np.eye(3) - Pij
+        Pkj = _outer(ekj, ekj)
+        Qkj = np.eye(3) - Pkj
+        Pik = _outer(eij, ekj)
+        Pki = _outer(ekj, eij)
+        P = np.eye(3) * eijekj[:, np.newaxis, np.newaxis]
+
+        QijPkjQij = Qij @ Pkj @ Qij
+        QijPkiQkj = Qij @ Pki @ Qkj
+        QkjPijQkj = Qkj @ Pij @ Qkj
+
+        # The cos form differs from the plain form by the factor in
+        # front of the first terms and the sign of the second terms.
+        factor = np.where(cos, 1.0 - 2.0 * cosa * cosa + cosa * np.cos(a0),
+                          1.0)
+        second = np.where(cos, -sina * da, da)
+
+        def block(first, rest, length2):
+            return ((k / sina / length2)[:, np.newaxis, np.newaxis] *
+                    ((factor / sina)[:, np.newaxis, np.newaxis] * first +
+                     second[:, np.newaxis, np.newaxis] *
+                     (-(ctga / sina)[:, np.newaxis, np.newaxis] * first +
+                      rest)))
+
+        Hr = np.zeros((n, 6, 6))
+        Hr[:, :3, :3] = block(QijPkjQij,
+                              Qij @ Pki - (Pij @ Pki) * 2.0 + (Pik + P),
+                              dij * dij)
+        Hr[:, :3, 3:] = block(QijPkiQkj, -(Qij @ Qkj), dij * dkj)
+        Hr[:, 3:, :3] = Hr[:, :3, 3:].transpose(0, 2, 1)
+        Hr[:, 3:, 3:] = block(QkjPijQkj,
+                              Qkj @ Pik - (Pkj @ Pik) * 2.0 + (Pki + P),
+                              dkj * dkj)
+        Hr[~ok] = 0.0
+        Hr *= _scaling(table['alpha'], table['rref'],
+                       np.array([dij, dkj]).T)[:, np.newaxis, np.newaxis]
+        H = np.einsum('ab,nbc,cd->nad', Ax.T, Hr, Ax)
+
+    return v, g, H
+
+
+def _dihedral_angles(rij, rkj, rkl):
+    rmj = np.cross(rij, rkj)
+    rnk = np.cross(rkj, rkl)
+    dmj = np.sqrt((rmj**2).sum(axis=1))
+    dnk = np.sqrt((rnk**2).sum(axis=1))
+    emjenk = np.clip((rmj * rnk).sum(axis=1) / dmj / dnk, -1.0, 1.0)
+    sign = np.sign((rkj * np.cross(rmj, rnk)).sum(axis=1))
+    return sign * np.arccos(emjenk), rmj, rnk, dmj, dnk
+
+
+def _dihedral_gradients(table, rij, rkj, rkl):
+    d, rmj, rnk, dmj, dnk = _dihedral_angles(rij, rkj, rkl)
+    dkj2 = (rkj**2).sum(axis=1)
+    dkj = np.sqrt(dkj2)
+    rijrkj = ((rij * rkj).sum(axis=1) / dkj2)[:, np.newaxis]
+    rkjrkl = ((rkj * rkl).sum(axis=1) / dkj2)[:, np.newaxis]
+
+    dddri = (dkj / dmj**2)[:, np.newaxis] * rmj
+    dddrl = -(dkj / dnk**2)[:, np.newaxis] * rnk
+
+    gx = np.concatenate([dddri,
+                         (rijrkj - 1.0) * dddri - rkjrkl * dddrl,
+                         (rkjrkl - 1.0) * dddrl - rijrkj * dddri,
+                         dddrl], axis=1)
+
+    k = table['k']
+    d0 = table['d0']
+    n = table['n']
+    dd = d - d0
+    dd = dd - np.around(dd / np.pi / 2.0) * np.pi * 2.0
+    factor = np.where(np.isnan(d0), k * np.sin(2.0 * d),
+                      np.where(np.isnan(n), k * dd,
+                               -k * n * np.sin(n * d - d0)))
+    return factor[:, np.newaxis] * gx
+
+
+def get_dihedral_potential_terms(atoms, table, gradient=True, hessian=False):
+    """Values, gradients and hessians of packed dihedral terms.
+
+    Like get_dihedral_potential_hessian(), the hessians are finite
+    differences of the gradients."""
+    indices = table['indices']
+    k = table['k']
+    d0 = table['d0']
+    n = table['n']
+
+    rij = rel_pos_pbc(atoms, indices[:, 0], indices[:, 1])
+    rkj = rel_pos_pbc(atoms, indices[:, 2], indices[:, 1])
+    rkl = rel_pos_pbc(atoms, indices[:, 2], indices[:, 3])
+
+    d = _dihedral_angles(rij, rkj, rkl)[0]
+    dd = d - d0
+    dd = dd - np.around(dd / np.pi / 2.0) * np.pi * 2.0
+    v = np.where(np.isnan(d0), 0.5 * k * (1.0 - np.cos(2.0 * d)),
+                 np.where(np.isnan(n), 0.5 * k * dd**2,
+                          k * (1.0 + np.cos(n * d - d0))))
+
+    g = H = None
+    if gradient or hessian:
+        g = _dihedral_gradients(table, rij, rkj, rkl)
+
+    if hessian:
+        eps = 0.000001
+        H = np.zeros((len(k), 12, 12))
+        # how the three vectors change when each atom moves
+        changes = [(1, 0, 0), (-1, -1, 0), (0, 1, 1), (0, 0, -1)]
+        for x in range(12):
+            step = np.zeros(3)
+            step[x % 3] = eps
+            sij, skj, skl = changes[x // 3]
+            geps = _dihedral_gradients(table, rij + sij * step,
+                                       rkj + skj * step, rkl + skl * step)
+            dg = 0.5 * (geps - g) / eps
+            H[:, x, :] += dg
+            H[:, :, x] += dg
+        distances = np.sqrt(np.array([(rij**2).sum(axis=1),
+                                      (rkj**2).sum(axis=1),
+                                      (rkl**2).sum(axis=1)]).T)
+        H *= _scaling(table['alpha'], table['rref'],
+                      distances)[:, np.newaxis, np.newaxis]
+
+    return v, g, H
+
+
+potential_terms = {Morse: get_morse_potential_terms,
+                   Bond: get_bond_potential_terms,
+                   Angle: get_angle_potential_terms,
+                   Dihedral: get_dihedral_potential_terms,
+                   VdW: get_vdw_potential_terms,
+                   Coulomb: get_coulomb_potential_terms}